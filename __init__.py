@@ -4,6 +4,7 @@ ComfyUI-LLMs-Toolkit: Lightweight LLM API integration for ComfyUI.
 Auto-registration mechanism for all nodes.
 """
 from pathlib import Path
+import importlib.machinery
 import importlib.util
 import sys
 
@@ -13,21 +14,33 @@ NODE_DISPLAY_NAME_MAPPINGS = {}
 
 # Auto-load all nodes from nodes/ directory
 nodes_dir = Path(__file__).parent / "nodes"
+_NODES_PACKAGE = "ComfyUI-LLMs-Toolkit.nodes"
 
 if nodes_dir.exists():
+    # Register nodes/ as a package so sibling modules can use relative imports
+    # (`from .tracing import span`) regardless of alphabetical load order
+    if _NODES_PACKAGE not in sys.modules:
+        pkg_spec = importlib.machinery.ModuleSpec(_NODES_PACKAGE, None, is_package=True)
+        pkg_spec.submodule_search_locations = [str(nodes_dir)]
+        sys.modules[_NODES_PACKAGE] = importlib.util.module_from_spec(pkg_spec)
+
     for py_file in sorted(nodes_dir.glob("*.py")):
         if py_file.stem.startswith("_"):
             continue
         
         try:
-            # Load module
-            module_name = f"ComfyUI-LLMs-Toolkit.nodes.{py_file.stem}"
-            spec = importlib.util.spec_from_file_location(module_name, py_file)
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[module_name] = module
-            # Also register under simple name for inter-module imports
-            sys.modules[py_file.stem] = module
-            spec.loader.exec_module(module)
+            module_name = f"{_NODES_PACKAGE}.{py_file.stem}"
+            module = sys.modules.get(module_name)
+            if module is None:
+                # Load module (may already be loaded as a sibling's dependency)
+                spec = importlib.util.spec_from_file_location(module_name, py_file)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[module_name] = module
+                # Also register under simple name for inter-module imports
+                sys.modules[py_file.stem] = module
+                spec.loader.exec_module(module)
+            else:
+                sys.modules[py_file.stem] = module
             
             # Register node mappings
             if hasattr(module, "NODE_CLASS_MAPPINGS"):
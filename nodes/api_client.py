@@ -7,6 +7,7 @@ Features:
   - Structured error diagnostics with actionable hints
   - SSL compatibility for Chinese API providers
   - Request size logging
+  - Optional SSE streaming with a per-delta callback
 """
 
 import time
@@ -16,9 +17,14 @@ import ssl
 import re
 import urllib.request
 import urllib.error
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, Callable, List, Tuple, Optional
 from dataclasses import dataclass, field
 
+try:
+    from .tracing import span
+except ImportError:
+    from tracing import span
+
 
 # ─── Error Classification ────────────────────────────────────────────────────
 
@@ -97,6 +103,11 @@ def classify_error(
         if request_size_mb > 5:
             err.details.append(f"Payload is large ({request_size_mb:.2f}MB), try compressing images.")
 
+    elif "Invalid JSON output" in error_str:
+        err.error_type = "JSON"
+        err.cause = error_str[:200]
+        err.hint = "Simplify the schema, raise max_tokens or json_retries, or pick a model with JSON mode."
+
     elif "timed out" in error_str.lower() or "timeout" in error_str.lower():
         err.error_type = "TIMEOUT"
         err.cause = f"Request timed out ({elapsed_ms / 1000:.1f}s)"
@@ -177,11 +188,87 @@ def _parse_retry_after(headers) -> Optional[float]:
     return None
 
 
+def _json_default(obj: Any) -> Any:
+    """Serialize payload objects that know their wire form (e.g. ImageRef)."""
+    to_json = getattr(obj, "to_json", None)
+    if callable(to_json):
+        return to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 def _is_retryable(code: int) -> bool:
     """Check if an HTTP status code warrants a retry."""
     return code == 429 or (500 <= code < 600)
 
 
+class StreamAccumulator:
+    """
+    Incremental parser for OpenAI-style SSE chat completion streams.
+
+    Feed it raw lines; it forwards content/reasoning deltas to `on_delta`
+    and assembles a response with the same shape as a non-streaming call.
+    """
+
+    def __init__(self, on_delta: Callable[[str, str], None]):
+        self.on_delta = on_delta
+        self.content: List[str] = []
+        self.reasoning: List[str] = []
+        self.usage: Dict[str, Any] = {}
+        self.finish_reason = None
+        self.meta: Dict[str, Any] = {}
+        self.got_choice = False
+
+    @property
+    def emitted(self) -> bool:
+        return bool(self.content or self.reasoning)
+
+    @property
+    def chunks(self) -> int:
+        return len(self.content)
+
+    def feed(self, raw_line: bytes) -> bool:
+        """Process one line; returns True at the end-of-stream marker."""
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if not line.startswith("data:"):
+            return False
+        body = line[5:].strip()
+        if body == "[DONE]":
+            return True
+        try:
+            chunk = json.loads(body)
+        except json.JSONDecodeError:
+            return False
+        if chunk.get("error"):
+            raise ValueError(f"Stream error | {json.dumps(chunk)[:300]}")
+
+        self.usage = chunk.get("usage") or self.usage
+        if not self.meta:
+            self.meta = {k: chunk[k] for k in ("id", "model", "created") if k in chunk}
+        choices = chunk.get("choices") or []
+        if not choices:
+            return False
+        self.got_choice = True
+        delta = choices[0].get("delta") or {}
+        text = delta.get("content") or ""
+        think = delta.get("reasoning_content") or ""
+        if text or think:
+            self.content.append(text)
+            self.reasoning.append(think)
+            self.on_delta(text, think)
+        self.finish_reason = choices[0].get("finish_reason") or self.finish_reason
+        return False
+
+    def result(self) -> Tuple[str, Dict[str, Any]]:
+        if not self.got_choice:
+            raise ValueError("API response missing 'choices'. Stream ended without any output.")
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(self.content)}
+        if any(self.reasoning):
+            message["reasoning_content"] = "".join(self.reasoning)
+        data = dict(self.meta, usage=self.usage,
+                    choices=[{"index": 0, "message": message, "finish_reason": self.finish_reason}])
+        return message["content"], data
+
+
 class LLMClient:
     """
     Robust HTTP client for OpenAI-compatible chat completions API.
@@ -205,6 +292,7 @@ class LLMClient:
         self.api_key = api_key
         self.max_retries = max_retries
         self.timeout = timeout
+        self.payload_bytes = 0  # size of the last serialized request
         self._ctx = _get_ssl_context()
         
     def _get_headers(self) -> Dict[str, str]:
@@ -233,10 +321,18 @@ class LLMClient:
             body = resp.read().decode("utf-8")
             return json.loads(body)
 
-    def chat(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    def chat(
+        self,
+        payload: Dict[str, Any],
+        on_delta: Optional[Callable[[str, str], None]] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
         """
         Send a chat completion request.
 
+        With `on_delta`, the request is streamed (SSE) and the callback gets
+        (content_delta, reasoning_delta) as chunks arrive; the return value
+        has the same shape as a non-streaming call.
+
         Returns:
             Tuple of (response_content, full_response_data)
 
@@ -244,11 +340,7 @@ class LLMClient:
             Exception with structured error message if all retries fail.
         """
         headers = self._get_headers()
-
-        data_bytes = json.dumps(payload).encode("utf-8")
-        data_size_mb = len(data_bytes) / (1024 * 1024)
-        if data_size_mb > 1:
-            print(f"{self.TAG} Request payload size: {data_size_mb:.2f} MB")
+        data_bytes = self._serialize(payload, stream=on_delta is not None)
 
         last_error = None
 
@@ -257,19 +349,14 @@ class LLMClient:
                 req = urllib.request.Request(
                     self.url, data=data_bytes, headers=headers, method="POST"
                 )
-                with urllib.request.urlopen(
-                    req, timeout=self.timeout, context=self._ctx
-                ) as resp:
-                    body = resp.read().decode("utf-8")
-                    data = json.loads(body)
-
-                    if "choices" not in data or len(data["choices"]) == 0:
-                        raise ValueError(
-                            f"API response missing 'choices'. Response: {json.dumps(data)[:300]}"
-                        )
-
-                    content = data["choices"][0]["message"]["content"]
-                    return content, data
+                with span("http.connect_upload_ttfb", attempt=attempt):
+                    resp = urllib.request.urlopen(
+                        req, timeout=self.timeout, context=self._ctx
+                    )
+                with resp:
+                    if on_delta is not None:
+                        return self._read_stream(resp, on_delta)
+                    return self._read_json(resp)
 
             except urllib.error.HTTPError as e:
                 error_body = e.read().decode("utf-8", errors="replace")
@@ -316,6 +403,68 @@ class LLMClient:
             )
         raise Exception("Unknown error occurred")
 
+    def _serialize(self, payload: Dict[str, Any], stream: bool = False) -> bytes:
+        """Encode the request body (materializing image refs) and record its size."""
+        if stream:
+            payload = dict(payload, stream=True, stream_options={"include_usage": True})
+
+        with span("llm.serialize_payload") as s:
+            data_bytes = json.dumps(payload, default=_json_default).encode("utf-8")
+            s.set(bytes=len(data_bytes))
+        self.payload_bytes = len(data_bytes)
+        data_size_mb = len(data_bytes) / (1024 * 1024)
+        if data_size_mb > 1:
+            print(f"{self.TAG} Request payload size: {data_size_mb:.2f} MB")
+        return data_bytes
+
+    @classmethod
+    def _read_json(cls, resp) -> Tuple[str, Dict[str, Any]]:
+        """Read a complete (non-streaming) chat completion response."""
+        with span("http.read_body") as s:
+            raw = resp.read()
+            s.set(bytes=len(raw))
+        return cls._decode_body(raw)
+
+    @staticmethod
+    def _decode_body(raw: bytes) -> Tuple[str, Dict[str, Any]]:
+        with span("json.decode"):
+            data = json.loads(raw.decode("utf-8"))
+
+        if "choices" not in data or len(data["choices"]) == 0:
+            raise ValueError(
+                f"API response missing 'choices'. Response: {json.dumps(data)[:300]}"
+            )
+
+        content = data["choices"][0]["message"]["content"]
+        return content, data
+
+    def _read_stream(self, resp, on_delta: Callable[[str, str], None]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Consume an SSE chat completion stream, forwarding deltas to `on_delta`.
+
+        Falls back to a regular JSON read when the provider ignores
+        "stream": true. Once output has been forwarded, read errors are not
+        retried (a retry would replay the answer from the start).
+        """
+        if "text/event-stream" not in resp.headers.get("Content-Type", ""):
+            content, data = self._read_json(resp)
+            message = data["choices"][0].get("message", {})
+            on_delta(content or "", message.get("reasoning_content") or "")
+            return content, data
+
+        stream = StreamAccumulator(on_delta)
+        with span("http.read_stream") as s:
+            try:
+                for raw_line in resp:
+                    if stream.feed(raw_line):
+                        break
+            except (TimeoutError, OSError) as e:
+                if stream.emitted:
+                    raise Exception(f"Stream interrupted | {e}") from e
+                raise
+            s.set(chunks=stream.chunks)
+        return stream.result()
+
     @staticmethod
     def _backoff(attempt: int, is_rate_limit: bool = False) -> float:
         """Calculate wait time with exponential backoff + jitter."""
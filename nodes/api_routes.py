@@ -7,93 +7,25 @@ Provides RESTful endpoints for managing LLM provider configurations
 Routes are registered via ComfyUI's PromptServer at startup.
 """
 
-import os
 import json
-import shutil
 import uuid
 import logging
 from pathlib import Path
 from aiohttp import web
 
-# Resolve config paths relative to the plugin root
-_PLUGIN_ROOT = Path(__file__).resolve().parent.parent
-_CONFIG_DIR = _PLUGIN_ROOT / "config"
-_PROVIDERS_FILE = _CONFIG_DIR / "providers.json"
-_DEFAULT_PROVIDERS_FILE = _CONFIG_DIR / "default_providers.json"
+try:
+    from .provider_registry import get_registry
+except ImportError:
+    from provider_registry import get_registry
 
 logger = logging.getLogger("[LLMs_Toolkit.Routes]")
 
 
-# ─── Data Access Layer ───────────────────────────────────────────────────────
-
-def _ensure_providers_file() -> dict:
-    """
-    Ensure providers.json exists. If not, copy from default_providers.json.
-    Returns the parsed providers data with schema migration applied.
-    """
-    _CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-
-    if not _PROVIDERS_FILE.exists():
-        if _DEFAULT_PROVIDERS_FILE.exists():
-            shutil.copy2(_DEFAULT_PROVIDERS_FILE, _PROVIDERS_FILE)
-            logger.info(f"Initialized providers.json from defaults.")
-        else:
-            # Fallback: create empty structure
-            data = {"providers": []}
-            _PROVIDERS_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
-            logger.warning("No default_providers.json found, created empty providers.json.")
-
-    data = _load_providers()
-    
-    # ── Schema Migration ──────────────────────────────────────────────────
-    if _DEFAULT_PROVIDERS_FILE.exists():
-        try:
-            with open(_DEFAULT_PROVIDERS_FILE, "r", encoding="utf-8") as f:
-                default_data = json.load(f)
-                default_providers = {p.get("id"): p for p in default_data.get("providers", []) if p.get("id")}
-                
-            needs_save = False
-            for p in data.get("providers", []):
-                # If it's a system provider (or ID matches a default), ensure it has all default keys
-                if p.get("id") in default_providers:
-                    dp = default_providers[p["id"]]
-                    for key, val in dp.items():
-                        if key not in p:
-                            p[key] = val
-                            needs_save = True
-            
-            if needs_save:
-                _save_providers(data)
-                logger.info("Migrated providers.json schema to include missing default fields.")
-        except Exception as e:
-            logger.error(f"Schema migration failed: {e}")
-
-    return data
-
-
-def _load_providers() -> dict:
-    """Load and return providers data from disk."""
-    try:
-        with open(_PROVIDERS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError) as e:
-        logger.error(f"Failed to load providers.json: {e}")
-        return {"providers": []}
-
-
-def _save_providers(data: dict):
-    """Persist providers data to disk."""
-    _CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    with open(_PROVIDERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
 # ─── API Route Handlers ─────────────────────────────────────────────────────
 
 async def get_providers(request: web.Request) -> web.Response:
     """GET /llm_toolkit/providers — Return all provider configurations."""
-    data = _ensure_providers_file()
-    return web.json_response(data)
+    return web.json_response(get_registry().snapshot())
 
 
 async def save_provider(request: web.Request) -> web.Response:
@@ -118,7 +50,8 @@ async def save_provider(request: web.Request) -> web.Response:
     body.setdefault("models", [])
     body.setdefault("enabled", True)
 
-    data = _ensure_providers_file()
+    registry = get_registry()
+    data = registry.snapshot()
     providers = data.get("providers", [])
 
     # Upsert: find existing by id and replace, or append
@@ -135,7 +68,7 @@ async def save_provider(request: web.Request) -> web.Response:
         providers.append(body)
 
     data["providers"] = providers
-    _save_providers(data)
+    registry.save(data)
 
     logger.info(f"{'Updated' if found else 'Created'} provider: {body.get('name')} ({provider_id})")
     return web.json_response({"status": "ok", "provider": body})
@@ -147,7 +80,8 @@ async def delete_provider(request: web.Request) -> web.Response:
     if not provider_id:
         return web.json_response({"error": "Provider ID is required"}, status=400)
 
-    data = _ensure_providers_file()
+    registry = get_registry()
+    data = registry.snapshot()
     providers = data.get("providers", [])
 
     # Find the provider
@@ -165,7 +99,7 @@ async def delete_provider(request: web.Request) -> web.Response:
 
     providers = [p for p in providers if p.get("id") != provider_id]
     data["providers"] = providers
-    _save_providers(data)
+    registry.save(data)
 
     logger.info(f"Deleted provider: {provider_id}")
     return web.json_response({"status": "ok"})
@@ -218,27 +152,153 @@ async def check_provider(request: web.Request) -> web.Response:
         }, status=502)
 
 
+def _usage_query(request: web.Request) -> dict:
+    """Parse the shared usage filters (start/end are unix seconds)."""
+    query = {}
+    for key in ("start", "end"):
+        value = request.query.get(key)
+        query[key] = int(value) if value not in (None, "") else None
+    query["provider"] = request.query.get("provider") or None
+    query["model"] = request.query.get("model") or None
+    return query
+
+
+async def _flushed_store():
+    """Flush pending usage records; store queries ingest them incrementally."""
+    import asyncio
+    import usage_log
+    import usage_store
+    await asyncio.to_thread(usage_log.get_writer().flush)
+    return usage_store.get_store()
+
+
 async def get_usage_stats(request: web.Request) -> web.Response:
     """GET /llm_toolkit/usage — Return token usage history (last 500 entries)."""
-    from collections import deque
-    usage_file = _CONFIG_DIR / "usage.jsonl"
-    max_entries = 500
-    stats = deque(maxlen=max_entries)
-    
-    if usage_file.exists():
-        try:
-            with open(usage_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    stripped = line.strip()
-                    if stripped:
-                        try:
-                            stats.append(json.loads(stripped))
-                        except json.JSONDecodeError:
-                            continue  # skip corrupted lines
-        except Exception as e:
-            logger.error(f"Failed to read usage stats: {e}")
-            
-    return web.json_response({"status": "ok", "usage": list(stats)})
+    import asyncio
+    try:
+        store = await _flushed_store()
+        page = await asyncio.to_thread(store.records, limit=500)
+    except Exception as e:
+        logger.error(f"Failed to read usage stats: {e}")
+        return web.json_response({"status": "ok", "usage": []})
+    # Oldest first, as before
+    return web.json_response({"status": "ok", "usage": page["records"][::-1]})
+
+
+async def get_usage_summary(request: web.Request) -> web.Response:
+    """GET /llm_toolkit/usage/summary — Totals, rollup series and per-model breakdown."""
+    import asyncio
+    try:
+        query = _usage_query(request)
+    except ValueError:
+        return web.json_response({"error": "start/end must be unix timestamps"}, status=400)
+    granularity = request.query.get("granularity", "hour")
+
+    try:
+        store = await _flushed_store()
+        summary = await asyncio.to_thread(store.summary, granularity=granularity, **query)
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Failed to summarize usage: {e}")
+        return web.json_response({"error": str(e)}, status=500)
+    return web.json_response({"status": "ok", **summary})
+
+
+async def get_usage_records(request: web.Request) -> web.Response:
+    """GET /llm_toolkit/usage/records — Raw records, newest first (limit/offset paginated)."""
+    import asyncio
+    try:
+        query = _usage_query(request)
+        limit = min(max(int(request.query.get("limit", 100)), 1), 1000)
+        offset = max(int(request.query.get("offset", 0)), 0)
+    except ValueError:
+        return web.json_response({"error": "start/end/limit/offset must be integers"}, status=400)
+
+    try:
+        store = await _flushed_store()
+        page = await asyncio.to_thread(store.records, limit=limit, offset=offset, **query)
+    except Exception as e:
+        logger.error(f"Failed to read usage records: {e}")
+        return web.json_response({"error": str(e)}, status=500)
+    return web.json_response({"status": "ok", **page})
+
+
+async def get_traces(request: web.Request) -> web.Response:
+    """GET /llm_toolkit/traces — Return recorded spans as a Chrome trace document."""
+    import tracing
+    trace_id = request.query.get("trace_id") or None
+    try:
+        limit = int(request.query.get("limit", 5000))
+    except ValueError:
+        return web.json_response({"error": "limit must be an integer"}, status=400)
+
+    events = tracing.read_events(trace_id=trace_id, limit=limit)
+    return web.json_response({
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"enabled": tracing.is_enabled(), "file": str(Path(tracing.TRACE_FILE).resolve())}
+    })
+
+
+async def get_profiling(request: web.Request) -> web.Response:
+    """GET /llm_toolkit/profiling — Return node types with profiling enabled."""
+    import profiling
+    return web.json_response({"status": "ok", "nodes": profiling.enabled_nodes()})
+
+
+async def set_profiling(request: web.Request) -> web.Response:
+    """POST /llm_toolkit/profiling — Set node types to profile ({"nodes": [...]}, "*" = all)."""
+    import profiling
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return web.json_response({"error": "Invalid JSON body"}, status=400)
+
+    nodes = body.get("nodes", [])
+    if not isinstance(nodes, list):
+        return web.json_response({"error": "nodes must be a list of node types"}, status=400)
+
+    enabled = profiling.set_enabled_nodes(nodes)
+    logger.info(f"Profiling enabled for: {enabled or 'none'}")
+    return web.json_response({"status": "ok", "nodes": enabled})
+
+
+async def get_profiling_summary(request: web.Request) -> web.Response:
+    """GET /llm_toolkit/profiling/summary — Top CPU hotspots and peak allocations per node type."""
+    import profiling
+    import asyncio
+    node_type = request.query.get("node") or None
+    try:
+        limit = int(request.query.get("limit", 15))
+    except ValueError:
+        return web.json_response({"error": "limit must be an integer"}, status=400)
+
+    summary = await asyncio.to_thread(profiling.summarize, node_type, limit)
+    return web.json_response({"status": "ok", "enabled": profiling.enabled_nodes(), "nodes": summary})
+
+
+async def get_image_stats(request: web.Request) -> web.Response:
+    """GET /llm_toolkit/images/stats — Encoded-image cache hit rate and image store usage."""
+    import image_cache
+    import image_store
+    return web.json_response({
+        "status": "ok",
+        "cache": image_cache.get_image_cache().stats(),
+        "store": image_store.get_store().stats(),
+    })
+
+
+async def get_translation_memory_stats(request: web.Request) -> web.Response:
+    """GET /llm_toolkit/translation_memory/stats — Stored segments and hit rate."""
+    import asyncio
+    import translation_memory
+    try:
+        stats = await asyncio.to_thread(translation_memory.get_translation_memory().stats)
+    except Exception as e:
+        logger.error(f"Failed to read translation memory stats: {e}")
+        return web.json_response({"error": str(e)}, status=500)
+    return web.json_response({"status": "ok", **stats})
 
 
 # ─── Route Registration (decorator-based, same pattern as ComfyUI-Manager) ──
@@ -254,6 +314,38 @@ try:
     async def _route_get_usage(request):
         return await get_usage_stats(request)
 
+    @PromptServer.instance.routes.get("/llm_toolkit/usage/summary")
+    async def _route_get_usage_summary(request):
+        return await get_usage_summary(request)
+
+    @PromptServer.instance.routes.get("/llm_toolkit/usage/records")
+    async def _route_get_usage_records(request):
+        return await get_usage_records(request)
+
+    @PromptServer.instance.routes.get("/llm_toolkit/traces")
+    async def _route_get_traces(request):
+        return await get_traces(request)
+
+    @PromptServer.instance.routes.get("/llm_toolkit/profiling")
+    async def _route_get_profiling(request):
+        return await get_profiling(request)
+
+    @PromptServer.instance.routes.post("/llm_toolkit/profiling")
+    async def _route_set_profiling(request):
+        return await set_profiling(request)
+
+    @PromptServer.instance.routes.get("/llm_toolkit/profiling/summary")
+    async def _route_get_profiling_summary(request):
+        return await get_profiling_summary(request)
+
+    @PromptServer.instance.routes.get("/llm_toolkit/images/stats")
+    async def _route_get_image_stats(request):
+        return await get_image_stats(request)
+
+    @PromptServer.instance.routes.get("/llm_toolkit/translation_memory/stats")
+    async def _route_get_translation_memory_stats(request):
+        return await get_translation_memory_stats(request)
+
     @PromptServer.instance.routes.post("/llm_toolkit/providers")
     async def _route_save_provider(request):
         return await save_provider(request)
@@ -266,6 +358,14 @@ try:
     async def _route_check_provider(request):
         return await check_provider(request)
 
+    def _broadcast_providers_changed(data):
+        # Lets open nodes refresh their provider/model dropdowns
+        PromptServer.instance.send_sync(
+            "llm_toolkit.providers_changed", {"count": len(data.get("providers", []))}
+        )
+
+    get_registry().subscribe(_broadcast_providers_changed)
+
     print("[LLMs_Toolkit] ✓ All API routes registered (including /llm_toolkit/usage)")
 except Exception as e:
     print(f"[LLMs_Toolkit] ✗ Failed to register API routes: {e}")
@@ -0,0 +1,140 @@
+"""
+AsyncLLMClient — aiohttp transport for coroutine node functions.
+
+Newer ComfyUI builds await node functions that are coroutines, so LLM nodes
+can overlap their network waits instead of holding the executor for the
+whole round trip. `async_nodes_enabled()` detects that support; on older
+builds (or with LLM_TOOLKIT_ASYNC=0) the nodes keep their synchronous
+FUNCTION and the urllib-based LLMClient.
+
+The client mirrors LLMClient.chat: same headers, payload serialization,
+retry policy, streaming callback and error strings, so classify_error()
+treats failures from both transports alike.
+"""
+
+import os
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import aiohttp
+
+try:
+    from .api_client import LLMClient, StreamAccumulator, _is_retryable, _parse_retry_after
+    from .tracing import span
+except ImportError:
+    from api_client import LLMClient, StreamAccumulator, _is_retryable, _parse_retry_after
+    from tracing import span
+
+
+def async_nodes_enabled() -> bool:
+    """True when the running ComfyUI awaits coroutine node functions."""
+    if os.environ.get("LLM_TOOLKIT_ASYNC", "").strip().lower() in ("0", "false", "no", "off"):
+        return False
+    try:
+        import execution
+    except Exception:
+        return False
+    return hasattr(execution, "_async_map_node_over_list")
+
+
+class AsyncLLMClient(LLMClient):
+    """
+    LLMClient with an awaitable `chat_async`.
+
+    Usage:
+        client = AsyncLLMClient(base_url, api_key)
+        content, data = await client.chat_async(payload)
+    """
+
+    async def chat_async(
+        self,
+        payload: Dict[str, Any],
+        on_delta: Optional[Callable[[str, str], None]] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Awaitable counterpart of LLMClient.chat (same arguments, result and errors)."""
+        headers = self._get_headers()
+        # Serialization materializes image refs to base64: keep it off the event loop
+        data_bytes = await asyncio.to_thread(self._serialize, payload, on_delta is not None)
+
+        # Per-operation limits, like the socket timeout used by urllib
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        connector = aiohttp.TCPConnector(ssl=self._ctx)
+        last_error = None
+
+        # ComfyUI may run each prompt on a fresh event loop, so the session
+        # lives for one request (retries still reuse its connections).
+        # trust_env: honour HTTP(S)_PROXY like urllib does.
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                         trust_env=True) as session:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with span("http.connect_upload_ttfb", attempt=attempt):
+                        resp = await session.post(self.url, data=data_bytes, headers=headers)
+                    async with resp:
+                        if resp.status >= 400:
+                            error_body = await resp.text(errors="replace")
+                            if _is_retryable(resp.status) and attempt < self.max_retries:
+                                # Respect Retry-After header if present
+                                wait = _parse_retry_after(resp.headers) or \
+                                    self._backoff(attempt, is_rate_limit=(resp.status == 429))
+                                print(
+                                    f"{self.TAG} HTTP {resp.status} Error. "
+                                    f"Retrying {attempt + 1}/{self.max_retries} "
+                                    f"(wait {wait:.1f}s)..."
+                                )
+                                await asyncio.sleep(wait)
+                                continue
+                            raise Exception(f"HTTP {resp.status} | {error_body}")
+
+                        if on_delta is not None:
+                            return await self._read_stream_async(resp, on_delta)
+                        with span("http.read_body") as s:
+                            raw = await resp.read()
+                            s.set(bytes=len(raw))
+                        return self._decode_body(raw)
+
+                except asyncio.TimeoutError as e:
+                    last_error = e
+                    if attempt < self.max_retries:
+                        wait = self._backoff(attempt)
+                        print(f"{self.TAG} Timeout/IO Error. Retrying {attempt + 1}/{self.max_retries} (wait {wait:.1f}s)...")
+                        await asyncio.sleep(wait)
+                        continue
+                    raise Exception(f"TimeoutError | Request hung for over {self.timeout} seconds")
+
+                except (aiohttp.ClientConnectionError, OSError) as e:
+                    last_error = e
+                    if attempt < self.max_retries:
+                        wait = self._backoff(attempt)
+                        print(f"{self.TAG} Connection Error. Retrying {attempt + 1}/{self.max_retries} (wait {wait:.1f}s)...")
+                        await asyncio.sleep(wait)
+                        continue
+                    # Worded like urllib's reasons so classify_error reports NETWORK
+                    raise Exception(f"URLError | Connection error: {e}")
+
+        # All retries exhausted
+        if last_error:
+            raise Exception(f"URLError | {last_error} (Failed after {self.max_retries} retries)")
+        raise Exception("Unknown error occurred")
+
+    async def _read_stream_async(self, resp: aiohttp.ClientResponse,
+                                 on_delta: Callable[[str, str], None]) -> Tuple[str, Dict[str, Any]]:
+        """Async counterpart of LLMClient._read_stream."""
+        if "text/event-stream" not in resp.headers.get("Content-Type", ""):
+            content, data = self._decode_body(await resp.read())
+            message = data["choices"][0].get("message", {})
+            on_delta(content or "", message.get("reasoning_content") or "")
+            return content, data
+
+        stream = StreamAccumulator(on_delta)
+        with span("http.read_stream") as s:
+            try:
+                async for raw_line in resp.content:
+                    if stream.feed(raw_line):
+                        break
+            except (asyncio.TimeoutError, aiohttp.ClientError, OSError) as e:
+                if stream.emitted:
+                    raise Exception(f"Stream interrupted | {e}") from e
+                raise
+            s.set(chunks=stream.chunks)
+        return stream.result()
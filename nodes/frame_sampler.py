@@ -0,0 +1,115 @@
+"""
+Keyframe selection for video batches sent to vision models.
+
+Consecutive video frames are often nearly identical, yet each one costs an
+upload and its own vision tokens. `select_keyframes()` computes a 64-bit
+DCT perceptual hash for every frame of a [B, H, W, C] batch in one
+vectorized pass (grayscale, area-downsampled to 32x32, low 8x8 DCT band
+compared to its median), then:
+
+- drops frames within `threshold` bits (Hamming distance) of the last kept
+  frame, and
+- optionally keeps at most `max_frames`, chosen by farthest-point sampling
+  on the hash distances (the most mutually different frames), in their
+  original order.
+"""
+
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List
+
+import torch
+import torch.nn.functional as F
+
+
+_HASH_SIZE = 32   # grayscale side the hash is computed on
+_HASH_BAND = 8    # low-frequency DCT block kept -> 64 bits
+_LUMA = (0.299, 0.587, 0.114)
+
+
+@dataclass
+class FrameSelection:
+    kept: List[int] = field(default_factory=list)   # frame indices, ascending
+    total: int = 0
+    duplicates: int = 0                              # dropped by the threshold
+    capped: int = 0                                  # dropped by max_frames
+
+    @property
+    def dropped(self) -> int:
+        return self.duplicates + self.capped
+
+    def summary(self) -> str:
+        return (f"kept {len(self.kept)} of {self.total} frame(s): "
+                f"{self.duplicates} near-duplicate, {self.capped} over the keyframe cap")
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n: int, device: str) -> torch.Tensor:
+    """Orthonormal DCT-II basis [n, n] (row k = frequency k)."""
+    k = torch.arange(n, dtype=torch.float32).unsqueeze(1)
+    i = torch.arange(n, dtype=torch.float32).unsqueeze(0)
+    m = torch.cos(math.pi * (2 * i + 1) * k / (2 * n)) * math.sqrt(2 / n)
+    m[0] /= math.sqrt(2)
+    return m.to(device)
+
+
+def perceptual_hashes(frames: torch.Tensor) -> torch.Tensor:
+    """DCT hashes of a [B, H, W, C] (or [H, W, C]) 0..1 batch as a bool tensor [B, 64]."""
+    frames = frames.detach()
+    if frames.dim() == 3:
+        frames = frames.unsqueeze(0)
+    c = frames.shape[-1]
+    x = frames.permute(0, 3, 1, 2).float()
+    if c >= 3:
+        luma = torch.tensor(_LUMA, device=x.device).view(1, 3, 1, 1)
+        x = (x[:, :3] * luma).sum(dim=1, keepdim=True)
+    else:
+        x = x[:, :1]
+    x = F.interpolate(x, size=(_HASH_SIZE, _HASH_SIZE), mode="area").squeeze(1)
+    d = _dct_matrix(_HASH_SIZE, str(x.device))
+    band = (d @ x @ d.T)[:, :_HASH_BAND, :_HASH_BAND].reshape(x.shape[0], -1)
+    # Median over the AC terms only: the DC term would dominate it
+    median = band[:, 1:].median(dim=1, keepdim=True).values
+    return (band > median).cpu()
+
+
+def hamming_matrix(hashes: torch.Tensor) -> torch.Tensor:
+    """Pairwise Hamming distances [B, B] of bool hashes [B, bits]."""
+    h = hashes.float()
+    return (h @ (1 - h).T + (1 - h) @ h.T).round().to(torch.int32)
+
+
+def select_keyframes(frames: torch.Tensor, threshold: int = 0, max_frames: int = 0) -> FrameSelection:
+    """Indices of the frames worth sending (threshold 0 / max_frames 0 disable each step)."""
+    total = frames.shape[0] if frames.dim() == 4 else 1
+    selection = FrameSelection(kept=list(range(total)), total=total)
+    if total <= 1 or (threshold <= 0 and (max_frames <= 0 or max_frames >= total)):
+        return selection
+
+    dist = hamming_matrix(perceptual_hashes(frames))
+
+    if threshold > 0:
+        kept = [0]
+        for i in range(1, total):
+            if dist[i, kept[-1]] > threshold:
+                kept.append(i)
+        selection.duplicates = total - len(kept)
+        selection.kept = kept
+
+    if 0 < max_frames < len(selection.kept):
+        candidates = torch.tensor(selection.kept)
+        sub = dist[candidates][:, candidates]
+        # Farthest-point sampling from the first frame
+        chosen = [0]
+        nearest = sub[0].clone()
+        nearest[0] = -1
+        for _ in range(max_frames - 1):
+            nxt = int(torch.argmax(nearest))
+            chosen.append(nxt)
+            # Chosen frames stay at -1, so ties among identical frames still pick new ones
+            nearest = torch.minimum(nearest, sub[nxt])
+            nearest[nxt] = -1
+        selection.capped = len(selection.kept) - max_frames
+        selection.kept = sorted(int(candidates[j]) for j in chosen)
+    return selection
@@ -0,0 +1,176 @@
+"""
+Glossary — per-request filtering of translator glossaries.
+
+A glossary is one entry per line (`source = target`; `=>`, `->`, `→` and
+tabs work too). `compile_glossary()` parses it once into an Aho-Corasick
+automaton over the case-folded source terms and caches it by a digest of
+the text, so finding the entries relevant to a piece of text costs one
+pass over that text, whatever the size of the glossary.
+
+Terms in space-separated scripts only match on word boundaries ("art"
+does not match "party"); CJK terms match anywhere. Lines without a
+separator are treated as instructions and always kept.
+"""
+
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+_SEPARATOR = re.compile(r"\s*(?:=>|->|→|=|\t)\s*")
+_CACHE_SIZE = 8
+_WORD = re.compile(r"\w")
+# Scripts written without spaces between words: terms match anywhere in them
+_NO_SPACES = re.compile(
+    "[\u0e00-\u0eff\u1000-\u109f\u1780-\u17ff\u3040-\u30ff\u3100-\u312f\u3400-\u4dbf"
+    "\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff66-\uff9f\U00020000-\U0002fa1f]")
+
+
+@dataclass
+class GlossaryEntry:
+    source: str
+    line: str       # the line as written, injected verbatim
+
+
+def parse_glossary(text: str) -> Tuple[List[GlossaryEntry], List[str]]:
+    """(entries, instruction lines) of a glossary text."""
+    entries: List[GlossaryEntry] = []
+    instructions: List[str] = []
+    for raw in (text or "").splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = _SEPARATOR.split(line, maxsplit=1)
+        if len(parts) == 2 and parts[0]:
+            entries.append(GlossaryEntry(parts[0], line))
+        else:
+            instructions.append(line)
+    return entries, instructions
+
+
+def _is_word(ch: str) -> bool:
+    if ch.isascii():
+        return bool(_WORD.match(ch))
+    # Han / Kana / Hangul / Thai are letters too, but those scripts have no spaces between words
+    return (ch.isalnum() or unicodedata.category(ch).startswith("M")) and not _NO_SPACES.match(ch)
+
+
+def _fold(text: str) -> Tuple[str, List[int]]:
+    """Case-folded `text` and, for each folded character, the index of the character it came from.
+
+    Folding can change the length ("İ" -> "i̇", "ß" -> "ss"), so word boundaries
+    are checked against the original characters through this map.
+    """
+    folded: List[str] = []
+    origin: List[int] = []
+    for i, ch in enumerate(text):
+        f = ch.casefold()
+        folded.append(f)
+        origin.extend([i] * len(f))
+    return "".join(folded), origin
+
+
+class Glossary:
+    """Compiled glossary: Aho-Corasick automaton over the entries' source terms."""
+
+    def __init__(self, text: str):
+        self.entries, self.instructions = parse_glossary(text)
+        # goto[state] maps a character to the next state; out[state] lists entry indices
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._lengths: List[int] = []
+        for index, entry in enumerate(self.entries):
+            self._add(entry.source.casefold(), index)
+        self._link()
+
+    def _add(self, term: str, index: int) -> None:
+        state = 0
+        for ch in term:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(index)
+        self._lengths.append(len(term))
+
+    def _link(self) -> None:
+        """Breadth-first failure links; outputs are merged along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def matches(self, text: str) -> List[int]:
+        """Indices of the entries whose source term occurs in `text`, in glossary order."""
+        if not self.entries or not text:
+            return []
+        folded, origin = _fold(text)
+        found = set()
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        state = 0
+        for pos, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                if index in found:
+                    continue
+                start = pos - lengths[index] + 1
+                first, last = origin[start], origin[pos]
+                # Whole words only where the term starts / ends with a word character;
+                # a match that begins or ends inside one folded character is inside a word
+                if _is_word(folded[start]) and (
+                        (start > 0 and origin[start - 1] == first) or (first > 0 and _is_word(text[first - 1]))):
+                    continue
+                if _is_word(ch) and (
+                        (pos + 1 < len(folded) and origin[pos + 1] == last)
+                        or (last + 1 < len(text) and _is_word(text[last + 1]))):
+                    continue
+                found.add(index)
+        return sorted(found)
+
+    def lines(self, matches: List[int]) -> List[str]:
+        """Glossary lines to inject for `matches` (instructions first)."""
+        return self.instructions + [self.entries[i].line for i in matches]
+
+    @property
+    def size(self) -> int:
+        return len(self.entries)
+
+
+_cache: "OrderedDict[str, Glossary]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_glossary(text: str) -> Optional[Glossary]:
+    """Compiled glossary for `text` (cached by content digest), or None when empty."""
+    if not (text or "").strip():
+        return None
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    with _cache_lock:
+        glossary = _cache.get(digest)
+        if glossary is not None:
+            _cache.move_to_end(digest)
+            return glossary
+    glossary = Glossary(text)
+    with _cache_lock:
+        _cache[digest] = glossary
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return glossary
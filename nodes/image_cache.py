@@ -0,0 +1,117 @@
+"""
+EncodedImageCache — LRU cache of resized + encoded images by pixel content.
+
+The same reference image is often prepared again by later runs or by
+several Image Prep nodes in one run. Frames are keyed by a blake2b digest
+of their uint8 pixels (plus mode and size) and the encode settings, so a
+repeated frame skips resize, encode and base64 entirely. Duplicates within
+one call are encoded once.
+
+The budget counts encoded bytes plus any cached data URL
+(LLM_TOOLKIT_IMAGE_CACHE_MB, default 128; 0 disables the cache).
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+def _max_bytes_from_env() -> int:
+    try:
+        return int(float(os.environ.get("LLM_TOOLKIT_IMAGE_CACHE_MB", "128")) * 1024 * 1024)
+    except ValueError:
+        return 128 * 1024 * 1024
+
+
+@dataclass(eq=False)
+class EncodedImage:
+    data: bytes
+    format: str
+    width: int
+    height: int
+    url: Optional[str] = None   # base64 data URL, filled by the first caller that needs it
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + (len(self.url) if self.url else 0)
+
+
+def pixel_digest(pixels: Any, mode: str, size: tuple) -> str:
+    """Digest of raw pixel data (any buffer: numpy frame, bytes)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{mode}:{size[0]}x{size[1]}:".encode("ascii"))
+    h.update(pixels)  # hashlib releases the GIL for large buffers
+    return h.hexdigest()
+
+
+class EncodedImageCache:
+    """Thread-safe LRU map: (pixel digest, settings) -> EncodedImage."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = _max_bytes_from_env() if max_bytes is None else max_bytes
+        self._entries: "OrderedDict[str, EncodedImage]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(digest: str, *settings: Any) -> str:
+        return digest + "|" + "|".join(map(str, settings))
+
+    def get(self, key: str) -> Optional[EncodedImage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: str, entry: EncodedImage) -> EncodedImage:
+        if entry.nbytes > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+_cache: Optional[EncodedImageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> EncodedImageCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EncodedImageCache()
+    return _cache
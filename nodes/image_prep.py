@@ -1,9 +1,82 @@
 import base64
 import json
 import io
+import os
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from PIL import Image
-from typing import Optional, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+import numpy as np
 import torch
+import torch.nn.functional as F
+
+try:
+    from .tracing import span, traced
+    from .profiling import profile_node
+    from .image_store import IMAGE_REF_TYPE, get_store
+    from .image_cache import EncodedImage, get_image_cache, pixel_digest
+    from .token_estimator import image_tokens_for_size
+    from .frame_sampler import select_keyframes
+except ImportError:
+    from tracing import span, traced
+    from profiling import profile_node
+    from image_store import IMAGE_REF_TYPE, get_store
+    from image_cache import EncodedImage, get_image_cache, pixel_digest
+    from token_estimator import image_tokens_for_size
+    from frame_sampler import select_keyframes
+
+# Float elements converted per step: the clamp-scale-round temporary stays
+# cache-sized (4 MB) whatever the batch size
+_CONVERT_CHUNK_ELEMENTS = 1024 * 1024
+
+# uint8 channels -> PIL mode that can map the buffer without copying.
+# RGB is stored padded to RGBX: PIL keeps 4 bytes per pixel internally, so
+# an RGBX view is the only zero-copy layout for 3-channel images.
+_FRAME_MODES = {1: "L", 3: "RGBX", 4: "RGBA"}
+
+# PIL releases the GIL while resizing and encoding, so frames are processed
+# on a shared, bounded pool (results keep input order)
+_ENCODE_WORKERS = max(1, min(8, os.cpu_count() or 1))
+_ENCODE_POOL = ThreadPoolExecutor(max_workers=_ENCODE_WORKERS, thread_name_prefix="llm_image_encode")
+
+_T = TypeVar("_T")
+
+# Long side per fixed quality preset
+_SIZE_MAP = {"High": 1024, "Medium": 768, "Low": 512}
+
+# "Auto" quality: lossy qualities searched (ascending) and resolution limits
+_AUTO_QUALITIES = (30, 40, 50, 60, 70, 75, 80, 85, 90, 95)
+_AUTO_MAX_SIDE = 2048
+_AUTO_MIN_SIDE = 256
+_AUTO_DOWNSCALE = 0.75
+_BASE64_RATIO = 4 / 3
+
+
+@dataclass(frozen=True)
+class _AutoBudget:
+    """Per-image limits for "Auto" quality (max_tokens 0 = no token limit)."""
+    max_bytes: int
+    max_tokens: int = 0
+
+
+@dataclass
+class _StageTimes:
+    """Seconds spent in each per-image stage (summed over images)."""
+    resize: float = 0.0
+    encode: float = 0.0
+    base64: float = 0.0
+
+    @classmethod
+    def total(cls, times: List["_StageTimes"]) -> "_StageTimes":
+        return cls(sum(t.resize for t in times), sum(t.encode for t in times),
+                   sum(t.base64 for t in times))
+
+    def summary(self) -> str:
+        return (f"resize {self.resize * 1000:.0f}ms, encode {self.encode * 1000:.0f}ms, "
+                f"base64 {self.base64 * 1000:.0f}ms")
+
 
 class ImagePrep:
     """
@@ -21,8 +94,23 @@ class ImagePrep:
                 "image_3": ("IMAGE", {"default": None}),
                 "image_4": ("IMAGE", {"default": None}),
                 "format": (["PNG", "JPEG", "WebP", "GIF", "BMP", "TIFF"], {"default": "PNG"}),
-                "quality": (["High", "Medium", "Low"], {"default": "High"}),
-            }
+                "quality": (["High", "Medium", "Low", "Auto"], {"default": "High"}),
+                "max_kb": ("INT", {"default": 400, "min": 16, "max": 20480, "step": 16,
+                                   "tooltip": "Auto quality: target encoded size per image"}),
+                "max_image_tokens": ("INT", {"default": 0, "min": 0, "max": 20000, "step": 85,
+                                             "tooltip": "Auto quality: vision-token budget per image (0 = no limit)"}),
+                "request_limit_mb": ("FLOAT", {"default": 8.0, "min": 0.0, "max": 100.0, "step": 0.5,
+                                               "tooltip": "Auto quality: keep all images of this node under this "
+                                                          "request size as base64 (0 = no limit)"}),
+                "dedupe_threshold": ("INT", {"default": 0, "min": 0, "max": 32,
+                                             "tooltip": "Video batches: drop frames within this many bits "
+                                                        "(of a 64-bit perceptual hash) of the last kept frame "
+                                                        "(0 = off)"}),
+                "max_frames": ("INT", {"default": 0, "min": 0, "max": 256,
+                                       "tooltip": "Video batches: keep at most this many, most different "
+                                                  "frames per input (0 = no limit)"}),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"}
         }
 
     RETURN_TYPES = ("STRING",)
@@ -30,83 +118,396 @@ class ImagePrep:
     FUNCTION = "preprocess"
     CATEGORY = "🚦ComfyUI_LLMs_Toolkit/Image"
 
+    _QUALITY_MAP = {"High": 95, "Medium": 75, "Low": 50}
+
+    @staticmethod
+    def _tensor_to_uint8(tensor: torch.Tensor) -> Tuple[np.ndarray, Optional[str]]:
+        """
+        Convert a [B, H, W, C] (or [H, W, C]) float tensor in 0..1 to one
+        preallocated uint8 array [B, H, W, C'] with a vectorized
+        clamp-scale-round pass, run on the tensor's device (GPU batches are
+        transferred as uint8). Returns the array and the PIL mode that can
+        view its frames (None when a copy is needed); 3-channel input gets an
+        opaque padding channel, see _FRAME_MODES.
+        """
+        frames = tensor.detach()
+        if frames.dim() == 3:
+            frames = frames.unsqueeze(0)
+        b, h, w, c = frames.shape
+        mode = _FRAME_MODES.get(c)
+        out_c = 4 if mode == "RGBX" else c
+        buf = torch.empty((b, h, w, out_c), dtype=torch.uint8)
+        if out_c != c:
+            buf[..., c:] = 255
+
+        # Row blocks through one reused float temporary (no per-frame allocations)
+        rows, out = frames.reshape(b * h, w, c), buf.view(b * h, w, out_c)
+        step = max(1, _CONVERT_CHUNK_ELEMENTS // max(1, w * c))
+        tmp = torch.empty((min(step, b * h), w, c), dtype=torch.float32, device=frames.device)
+        for i in range(0, b * h, step):
+            block = tmp[:min(step, b * h - i)]
+            torch.mul(rows[i:i + step], 255, out=block).clamp_(0, 255).round_()
+            # Values are integral now, so the uint8 cast is exact
+            out[i:i + step, :, :c].copy_(block if block.device.type == "cpu" else block.to(torch.uint8))
+        return buf.numpy(), mode
+
+    @staticmethod
+    def _frames_to_pil(frames: np.ndarray, mode: Optional[str]) -> List[Image.Image]:
+        """PIL images for each frame of a [B, H, W, C] uint8 array (read-only views when `mode` is set)."""
+        if mode is None:
+            # e.g. 2-channel (LA) tensors: keep luminance, copy
+            return [Image.fromarray(np.ascontiguousarray(f[..., 0])) for f in frames]
+        _, h, w, _ = frames.shape
+        return [Image.frombuffer(mode, (w, h), frame, "raw", mode, 0, 1) for frame in frames]
+
     def _tensor_to_pil(self, tensor: torch.Tensor) -> Image.Image:
         """Convert a single [H, W, C] tensor to PIL Image."""
-        numpy_image = tensor.cpu().numpy()
-        if len(numpy_image.shape) == 3 and numpy_image.shape[2] == 1:
-            numpy_image = numpy_image.squeeze(-1)
-        numpy_image = (numpy_image * 255).astype('uint8')
-        return Image.fromarray(numpy_image)
+        return self._frames_to_pil(*self._tensor_to_uint8(tensor))[0]
 
+    @traced("ImagePrep.preprocess")
+    @profile_node
     def preprocess(self, image: Optional[Union[str, Image.Image, torch.Tensor]] = None,
                    image_2: Optional[Union[str, Image.Image, torch.Tensor]] = None,
                    image_3: Optional[Union[str, Image.Image, torch.Tensor]] = None,
                    image_4: Optional[Union[str, Image.Image, torch.Tensor]] = None,
-                   format: str = "PNG", quality: str = "High"):
-        quality_map = {"High": 95, "Medium": 75, "Low": 50}
-        quality_str = quality
-        quality_val = quality_map.get(quality_str, 95)
-        
-        images_to_process = [img for img in [image, image_2, image_3, image_4] if img is not None]
-        
+                   format: str = "PNG", quality: str = "High", max_kb: int = 400,
+                   max_image_tokens: int = 0, request_limit_mb: float = 8.0,
+                   dedupe_threshold: int = 0, max_frames: int = 0, unique_id: str = ""):
+        auto = (max_kb, max_image_tokens, request_limit_mb) if quality == "Auto" else None
+        encoded = self._encode_all([image, image_2, image_3, image_4], format, quality,
+                                   with_url=True, auto=auto, sampling=(dedupe_threshold, max_frames))
+        image_urls = [e.url for e in encoded]
+
+        # If only one image, return as string for backward compatibility? 
+        # Plan says: "ImagePreprocessor output will change from str to List[str]"
+        # To be safe for ComfyUI string passing, let's return a list
+        # We use JSON serialization to avoid ComfyUI auto-batching the list
+        with span("image.serialize_urls", count=len(image_urls)):
+            return (json.dumps(image_urls),)
+
+    def _iter_frames(self, inputs: list, max_side: Optional[Callable[[int, int], int]] = None,
+                     sampling: Tuple[int, int] = (0, 0)) -> Iterator[Tuple[Image.Image, Optional[np.ndarray]]]:
+        """
+        Yield every frame of the connected inputs as (PIL image, uint8 pixels);
+        pixels is the frame's slice of the batch buffer, or None for PIL inputs.
+        Tensor batches are first reduced to their keyframes when `sampling`
+        (dedupe_threshold, max_frames) is set, then downscaled to
+        `max_side(w, h)` in tensor space.
+        """
+        images_to_process = [img for img in inputs if img is not None]
+
         if not images_to_process:
             raise ValueError("At least one image input must be provided.")
 
-        image_urls = []
-
         for img in images_to_process:
             if isinstance(img, torch.Tensor):
-                if len(img.shape) == 4:
-                    for i in range(img.shape[0]):
-                        pil_image = self._tensor_to_pil(img[i])
-                        url = self._process_single_image(pil_image, format, quality_str, quality_val)
-                        image_urls.append(url)
-                else:
-                    pil_image = self._tensor_to_pil(img)
-                    url = self._process_single_image(pil_image, format, quality_str, quality_val)
-                    image_urls.append(url)
+                if img.dim() == 4 and img.shape[0] > 1 and any(sampling):
+                    img = self._sample_frames(img, *sampling)
+                if max_side is not None:
+                    img = self._downscale_batch(img, max_side)
+                # Whole batch in one pass; frames are views into the shared buffer
+                with span("image.to_pil", frames=img.shape[0] if img.dim() == 4 else 1):
+                    pixels, mode = self._tensor_to_uint8(img)
+                    frames = self._frames_to_pil(pixels, mode)
+                yield from zip(frames, pixels if mode is not None else [None] * len(frames))
 
             elif isinstance(img, Image.Image):
                 # Single PIL image
-                url = self._process_single_image(img, format, quality_str, quality_val)
-                image_urls.append(url)
+                yield img, None
             
             else:
                 raise ValueError("Unsupported image type. Expected torch.Tensor or PIL.Image.")
 
-        # If only one image, return as string for backward compatibility? 
-        # Plan says: "ImagePreprocessor output will change from str to List[str]"
-        # To be safe for ComfyUI string passing, let's return a list
-        # We use JSON serialization to avoid ComfyUI auto-batching the list
-        return (json.dumps(image_urls),)
+    @staticmethod
+    def _sample_frames(batch: torch.Tensor, threshold: int, max_frames: int) -> torch.Tensor:
+        """Keep only the keyframes of a [B, H, W, C] batch (see frame_sampler)."""
+        with span("image.sample_frames", frames=batch.shape[0]) as s:
+            selection = select_keyframes(batch, threshold, max_frames)
+            s.set(kept=len(selection.kept), dropped=selection.dropped)
+        if not selection.dropped:
+            return batch
+        print(f"[LLMs_Toolkit] frames: {selection.summary()}")
+        return batch[selection.kept]
+
+    @staticmethod
+    def _downscale_batch(tensor: torch.Tensor, max_side: Callable[[int, int], int]) -> torch.Tensor:
+        """
+        Shrink a [B, H, W, C] (or [H, W, C]) batch so its long side is at most
+        `max_side(w, h)`, with one antialiased bicubic pass over all frames on
+        the tensor's device. Only the small result is then converted to uint8
+        and PIL; batches that already fit are returned unchanged.
+        """
+        h, w = tensor.shape[-3], tensor.shape[-2]
+        limit = max_side(w, h)
+        if max(w, h) <= limit:
+            return tensor
+        scale = limit / max(w, h)
+        size = (max(1, round(h * scale)), max(1, round(w * scale)))
+        with span("image.tensor_resize", src=f"{w}x{h}", dst=f"{size[1]}x{size[0]}"):
+            frames = tensor.detach()
+            squeeze = frames.dim() == 3
+            if squeeze:
+                frames = frames.unsqueeze(0)
+            # [B, H, W, C] viewed as channels-last [B, C, H, W]: no transpose copy
+            out = F.interpolate(frames.permute(0, 3, 1, 2).float(), size=size, mode="bicubic",
+                                align_corners=False, antialias=True)
+            out = out.permute(0, 2, 3, 1)
+            return out[0] if squeeze else out
 
-    def _process_single_image(self, image: Image.Image, format: str, quality_str: str, quality_val: int) -> str:
-        # Resize image
-        size_map = {"High": 1024, "Medium": 768, "Low": 512}
-        max_size = size_map.get(quality_str, 1024)
-        
+    @staticmethod
+    def _frame_digest(image: Image.Image, pixels: Optional[np.ndarray]) -> str:
+        return pixel_digest(pixels if pixels is not None else image.tobytes(), image.mode, image.size)
+
+    def _encode_all(self, inputs: list, format: str, quality: str, with_url: bool,
+                    auto: Optional[Tuple[int, int, float]] = None,
+                    sampling: Tuple[int, int] = (0, 0)) -> List[EncodedImage]:
+        """
+        Resize + encode every frame (plus base64 when `with_url`), in input order.
+        Frames are looked up in the encoded-image cache by pixel digest first;
+        identical frames within the call are encoded once. `auto` is
+        (max_kb, max_image_tokens, request_limit_mb) for "Auto" quality,
+        `sampling` is (dedupe_threshold, max_frames) for video batches.
+        """
+        quality_val = self._QUALITY_MAP.get(quality, 95)
+        start = time.perf_counter()
+        if auto is not None:
+            max_side = lambda w, h: self._auto_side(w, h, auto[1])
+        else:
+            max_side = lambda w, h: _SIZE_MAP.get(quality, 1024)
+        frames = list(self._iter_frames(inputs, max_side, sampling))
+        budget = self._auto_budget(len(frames), *auto) if auto is not None else None
+        cache = get_image_cache()
+
+        with span("image.hash", count=len(frames)):
+            keys = self._map_ordered(
+                lambda frame: cache.key(self._frame_digest(*frame), format, quality, budget), frames)
+
+        results: Dict[str, EncodedImage] = {}
+        todo: Dict[str, int] = {}  # key -> index of the first frame with it
+        for i, key in enumerate(keys):
+            if key in results or key in todo:
+                continue
+            hit = cache.get(key)
+            if hit is None:
+                todo[key] = i
+            elif with_url and hit.url is None:
+                # Encoded earlier by Image Prep (Ref): only base64 is missing
+                results[key] = cache.put(key, EncodedImage(hit.data, hit.format, hit.width, hit.height,
+                                                           self._data_url(hit.data, hit.format)))
+            else:
+                results[key] = hit
+        cached = len(results)
+
+        times = [_StageTimes() for _ in todo]
+
+        def encode(job: Tuple[int, Tuple[str, int]]) -> EncodedImage:
+            j, (key, i) = job
+            if budget is not None:
+                data, width, height, fmt = self._encode_auto(frames[i][0], format, budget, times[j])
+            else:
+                data, width, height = self._encode_single_image(frames[i][0], format, quality,
+                                                                quality_val, times[j])
+                fmt = format
+            entry = EncodedImage(data, fmt, width, height)
+            if with_url:
+                entry.url = self._data_url(data, fmt, times[j])
+            return cache.put(key, entry)
+
+        jobs = list(enumerate(todo.items()))
+        for (_, (key, _)), entry in zip(jobs, self._map_ordered(encode, jobs)):
+            results[key] = entry
+
+        self._log_timings(len(frames), len(todo), cached, time.perf_counter() - start, times)
+        return [results[key] for key in keys]
+
+    @staticmethod
+    def _map_ordered(func: Callable[..., _T], items) -> List[_T]:
+        """Run `func` over items on the encode pool; results in input order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        # Each task gets its own context copy so trace spans nest under the node
+        futures = [_ENCODE_POOL.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [f.result() for f in futures]
+
+    @staticmethod
+    def _log_timings(count: int, encoded: int, cached: int, wall: float, times: List[_StageTimes]) -> None:
+        parts = []
+        if encoded:
+            parts.append(f"{encoded} encoded on {min(encoded, _ENCODE_WORKERS)} worker(s) "
+                         f"({_StageTimes.total(times).summary()})")
+        if cached:
+            parts.append(f"{cached} cached")
+        if count - encoded - cached:
+            parts.append(f"{count - encoded - cached} duplicate")
+        stats = get_image_cache().stats()
+        print(f"[LLMs_Toolkit] prepared {count} image(s) in {wall * 1000:.0f}ms: {', '.join(parts)} | "
+              f"cache {stats['entries']} entries, {stats['bytes'] / (1024 * 1024):.1f}MB, "
+              f"hit rate {stats['hit_rate']:.0%}")
+
+    @staticmethod
+    def _resize(image: Image.Image, max_size: int, times: _StageTimes) -> Image.Image:
+        """Downscale so the long side is at most `max_size`; returns an encoder-ready image."""
         w, h = image.size
+        t0 = time.perf_counter()
         # Only resize if larger than max_size
         if max(w, h) > max_size:
-            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-            # print(f"[LLMs_Toolkit] resize={max_size}px")
+            with span("image.resize", src=f"{w}x{h}", max_size=max_size):
+                # New image rather than thumbnail(): the input may be a shared
+                # batch view or the caller's PIL image
+                scale = max_size / max(w, h)
+                size = (max(1, round(w * scale)), max(1, round(h * scale)))
+                image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        if image.mode == "RGBX":
+            # Padded batch layout; encoders expect plain RGB
+            image = image.convert("RGB")
+        times.resize += time.perf_counter() - t0
+        return image
 
-        # Convert to base64
+    @staticmethod
+    def _save(image: Image.Image, format: str, quality_val: Optional[int], times: _StageTimes) -> bytes:
         buffered = io.BytesIO()
         save_kwargs = {"format": format}
-        if format in ["JPEG", "WebP"]:
+        if format in ["JPEG", "WebP"] and quality_val is not None:
             save_kwargs["quality"] = quality_val
-        
-        image.save(buffered, **save_kwargs)
-        img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-        image_url = f"data:image/{format.lower()};base64,{img_str}"
-        
-        size_kb = buffered.tell() / 1024
+
+        t0 = time.perf_counter()
+        with span("image.encode", format=format, quality=quality_val or 0) as s:
+            image.save(buffered, **save_kwargs)
+            s.set(bytes=buffered.tell())
+        times.encode += time.perf_counter() - t0
+        return buffered.getvalue()
+
+    def _encode_single_image(self, image: Image.Image, format: str, quality_str: str,
+                             quality_val: int, times: Optional[_StageTimes] = None) -> Tuple[bytes, int, int]:
+        """Resize and encode one image; returns (encoded_bytes, width, height)."""
+        times = times if times is not None else _StageTimes()
+        # Resize image (tensor batches arrive already downscaled)
+        image = self._resize(image, _SIZE_MAP.get(quality_str, 1024), times)
+        data = self._save(image, format, quality_val, times)
+
+        size_kb = len(data) / 1024
         print(f"[LLMs_Toolkit] encoded={size_kb:.1f}KB {format} ({image.width}x{image.height})")
-        
-        return image_url
+
+        return data, image.width, image.height
+
+    # ── "Auto" quality ───────────────────────────────────────────────────
+
+    @staticmethod
+    def _auto_budget(count: int, max_kb: int, max_image_tokens: int, request_limit_mb: float) -> _AutoBudget:
+        """Per-image byte budget: `max_kb`, tightened so all images fit the request limit as base64."""
+        max_bytes = max_kb * 1024
+        if request_limit_mb > 0 and count:
+            share = int(request_limit_mb * 1024 * 1024 / _BASE64_RATIO / count)
+            max_bytes = min(max_bytes, share)
+        return _AutoBudget(max(1024, max_bytes), max_image_tokens)
+
+    @staticmethod
+    def _auto_side(width: int, height: int, max_tokens: int) -> int:
+        """Largest long side (<= original, <= _AUTO_MAX_SIDE) whose vision-token cost fits."""
+        long_side = min(max(width, height), _AUTO_MAX_SIDE)
+        if max_tokens <= 0:
+            return long_side
+        while long_side > _AUTO_MIN_SIDE:
+            scale = long_side / max(width, height)
+            if image_tokens_for_size(max(1, round(width * scale)), max(1, round(height * scale))) <= max_tokens:
+                break
+            long_side = int(long_side * 0.9)
+        return max(long_side, min(_AUTO_MIN_SIDE, max(width, height)))
+
+    def _encode_auto(self, image: Image.Image, format: str, budget: _AutoBudget,
+                     times: _StageTimes) -> Tuple[bytes, int, int, str]:
+        """
+        Fit one image into `budget`; returns (encoded_bytes, width, height, format).
+
+        Lossless PNG is kept when it already fits (and PNG is selected);
+        otherwise the highest lossy quality under the byte budget is found by
+        binary search, downscaling step by step when even the lowest quality
+        is too large. Lossy output is WebP for images with alpha or when
+        WebP is selected, JPEG otherwise.
+        """
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        lossy = "WebP" if has_alpha or format == "WebP" else "JPEG"
+        long_side = self._auto_side(image.width, image.height, budget.max_tokens)
+        encodes = 0
+
+        while True:
+            resized = self._resize(image, long_side, times)
+            if lossy == "JPEG" and resized.mode not in ("RGB", "L"):
+                resized = resized.convert("RGB")
+
+            # Lossless first when it has a realistic chance (raw size within 16x of the budget)
+            if format == "PNG" and encodes == 0 and \
+                    resized.width * resized.height * len(resized.getbands()) <= 16 * budget.max_bytes:
+                data = self._save(resized, "PNG", None, times)
+                encodes += 1
+                if len(data) <= budget.max_bytes:
+                    return self._auto_done(data, resized, "PNG", None, budget, encodes)
+
+            best, lo, hi = None, 0, len(_AUTO_QUALITIES) - 1
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                data = self._save(resized, lossy, _AUTO_QUALITIES[mid], times)
+                encodes += 1
+                if len(data) <= budget.max_bytes:
+                    best, lo = (data, _AUTO_QUALITIES[mid]), mid + 1
+                else:
+                    hi = mid - 1
+            if best is not None:
+                return self._auto_done(best[0], resized, lossy, best[1], budget, encodes)
+            if max(resized.size) <= _AUTO_MIN_SIDE:
+                # Best effort: smallest encoding we can make
+                print(f"[LLMs_Toolkit] ⚠ image exceeds the {budget.max_bytes / 1024:.0f}KB budget "
+                      f"even at {resized.width}x{resized.height} q{_AUTO_QUALITIES[0]}")
+                return self._auto_done(data, resized, lossy, _AUTO_QUALITIES[0], budget, encodes)
+            long_side = max(_AUTO_MIN_SIDE, int(max(resized.size) * _AUTO_DOWNSCALE))
+
+    @staticmethod
+    def _auto_done(data: bytes, image: Image.Image, format: str, quality_val: Optional[int],
+                   budget: _AutoBudget, encodes: int) -> Tuple[bytes, int, int, str]:
+        q = f" q{quality_val}" if quality_val is not None else ""
+        print(f"[LLMs_Toolkit] auto: {format}{q} {image.width}x{image.height} = {len(data) / 1024:.1f}KB "
+              f"(budget {budget.max_bytes / 1024:.0f}KB, {encodes} encodes)")
+        return data, image.width, image.height, format
+
+    @staticmethod
+    def _data_url(data: bytes, format: str, times: Optional[_StageTimes] = None) -> str:
+        t0 = time.perf_counter()
+        with span("image.base64"):
+            img_str = base64.b64encode(data).decode("utf-8")
+        if times is not None:
+            times.base64 += time.perf_counter() - t0
+        return f"data:image/{format.lower()};base64,{img_str}"
+
+
+class ImagePrepRef(ImagePrep):
+    """
+    Same preprocessing as ImagePrep, but outputs an LLM_IMAGE_REF handle:
+    the encoded bytes live once in the in-process image store and are turned
+    into base64 only when the LLM request is serialized.
+    """
+
+    RETURN_TYPES = (IMAGE_REF_TYPE,)
+    RETURN_NAMES = ("image_ref",)
+    FUNCTION = "preprocess_ref"
+
+    @traced("ImagePrepRef.preprocess_ref")
+    @profile_node
+    def preprocess_ref(self, image: Optional[Union[str, Image.Image, torch.Tensor]] = None,
+                       image_2: Optional[Union[str, Image.Image, torch.Tensor]] = None,
+                       image_3: Optional[Union[str, Image.Image, torch.Tensor]] = None,
+                       image_4: Optional[Union[str, Image.Image, torch.Tensor]] = None,
+                       format: str = "PNG", quality: str = "High", max_kb: int = 400,
+                       max_image_tokens: int = 0, request_limit_mb: float = 8.0,
+                       dedupe_threshold: int = 0, max_frames: int = 0, unique_id: str = ""):
+        store = get_store()
+        auto = (max_kb, max_image_tokens, request_limit_mb) if quality == "Auto" else None
+        encoded = self._encode_all([image, image_2, image_3, image_4], format, quality,
+                                   with_url=False, auto=auto, sampling=(dedupe_threshold, max_frames))
+        refs = [store.put(e.data, e.format, e.width, e.height) for e in encoded]
+        return (refs,)
 
 
 # Register the node with ComfyUI
-NODE_CLASS_MAPPINGS = {"ImagePrep": ImagePrep}
-NODE_DISPLAY_NAME_MAPPINGS = {"ImagePrep": "Image Prep"}
+NODE_CLASS_MAPPINGS = {"ImagePrep": ImagePrep, "ImagePrepRef": ImagePrepRef}
+NODE_DISPLAY_NAME_MAPPINGS = {"ImagePrep": "Image Prep", "ImagePrepRef": "Image Prep (Ref)"}
@@ -0,0 +1,172 @@
+"""
+ImageStore — in-process, content-addressed store for encoded images.
+
+`Image Prep (Ref)` puts the encoded bytes here once and passes a small
+`ImageRef` handle (ComfyUI type LLM_IMAGE_REF) through the graph instead of a
+JSON string of base64 data URLs. The handle carries the metadata (format,
+dimensions, byte size); base64 is produced only when the request payload is
+serialized.
+
+Lifetime:
+  - every live ImageRef holds a reference on its blob (released by a
+    weakref finalizer when the handle is garbage collected, e.g. when
+    ComfyUI drops the node output from its cache)
+  - unreferenced blobs stay cached and are evicted least recently used
+    first once the store exceeds its byte budget; referenced blobs are
+    never evicted
+"""
+
+import base64
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+try:
+    from .tracing import span
+except ImportError:
+    from tracing import span
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+IMAGE_REF_TYPE = "LLM_IMAGE_REF"
+
+
+@dataclass(eq=False)
+class _Blob:
+    data: bytes
+    format: str
+    width: int
+    height: int
+    refs: int = 0
+
+
+class ImageRef:
+    """Handle to an encoded image held by an ImageStore."""
+
+    __slots__ = ("digest", "format", "width", "height", "nbytes", "_store", "__weakref__")
+
+    def __init__(self, digest: str, format: str, width: int, height: int, nbytes: int,
+                 store: "ImageStore"):
+        self.digest = digest
+        self.format = format
+        self.width = width
+        self.height = height
+        self.nbytes = nbytes
+        self._store = store
+
+    @property
+    def mime(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    def data(self) -> bytes:
+        return self._store.data(self.digest)
+
+    def data_url(self) -> str:
+        """Materialize the base64 data URL (done at request serialization time)."""
+        with span("image.base64", bytes=self.nbytes):
+            encoded = base64.b64encode(self.data()).decode("ascii")
+        return f"data:{self.mime};base64,{encoded}"
+
+    def to_json(self) -> str:
+        """Hook used by LLMClient's JSON encoder."""
+        return self.data_url()
+
+    def __repr__(self) -> str:
+        return (f"<ImageRef {self.format} {self.width}x{self.height} "
+                f"{self.nbytes / 1024:.1f}KB {self.digest[:8]}>")
+
+
+class ImageStore:
+    """Refcounted blob store keyed by the blake2b digest of the encoded bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._blobs: "OrderedDict[str, _Blob]" = OrderedDict()
+        self._bytes = 0
+        # Reentrant: a handle's finalizer may run during GC while the lock is held
+        self._lock = threading.RLock()
+
+    def put(self, data: bytes, format: str, width: int, height: int) -> ImageRef:
+        """Store encoded bytes (deduplicated by content) and return a handle."""
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                blob = self._blobs[digest] = _Blob(data, format, width, height)
+                self._bytes += len(data)
+            else:
+                self._blobs.move_to_end(digest)
+            blob.refs += 1
+            ref = self._handle(digest, blob)
+            self._evict()
+        return ref
+
+    def acquire(self, digest: str) -> Optional[ImageRef]:
+        """New handle for a stored blob, or None if it has been evicted."""
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                return None
+            self._blobs.move_to_end(digest)
+            blob.refs += 1
+            return self._handle(digest, blob)
+
+    def data(self, digest: str) -> bytes:
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                raise KeyError(f"Image {digest[:8]} is no longer in the image store")
+            self._blobs.move_to_end(digest)
+            return blob.data
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "blobs": len(self._blobs),
+                "bytes": self._bytes,
+                "referenced": sum(1 for b in self._blobs.values() if b.refs > 0),
+                "max_bytes": self.max_bytes,
+            }
+
+    # ── Internals ────────────────────────────────────────────────────────
+
+    def _handle(self, digest: str, blob: _Blob) -> ImageRef:
+        ref = ImageRef(digest, blob.format, blob.width, blob.height, len(blob.data), self)
+        weakref.finalize(ref, self._release, digest)
+        return ref
+
+    def _release(self, digest: str) -> None:
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is not None:
+                blob.refs = max(0, blob.refs - 1)
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop unreferenced blobs, least recently used first (caller holds the lock)."""
+        if self._bytes <= self.max_bytes:
+            return
+        for digest in [d for d, b in self._blobs.items() if b.refs == 0]:
+            blob = self._blobs.pop(digest, None)
+            if blob is None:
+                continue
+            self._bytes -= len(blob.data)
+            if self._bytes <= self.max_bytes:
+                break
+
+
+_store: Optional[ImageStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ImageStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ImageStore()
+    return _store
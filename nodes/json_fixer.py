@@ -2,6 +2,11 @@ import json
 import re
 from typing import Tuple
 
+try:
+    from .profiling import profile_node
+except ImportError:
+    from profiling import profile_node
+
 
 class JSONFixer:
     """
@@ -29,6 +34,7 @@ class JSONFixer:
     FUNCTION = "fix"
     CATEGORY = "🚦ComfyUI_LLMs_Toolkit/JSON"
 
+    @profile_node
     def fix(self, text: str) -> Tuple[str]:
         """
         Attempt to fix malformed JSON.
@@ -3,6 +3,11 @@ import os
 import signal
 import sys
 
+try:
+    from .profiling import profile_node
+except ImportError:
+    from profiling import profile_node
+
 # Global counter: key=file_path, value=current_index
 _JSON_ITER_COUNTERS = {}
 
@@ -42,6 +47,7 @@ class JSONIterator:
         # Always re-run so the counter can advance each execution
         return float("NaN")
 
+    @profile_node
     def iterate(self, file_path, start_index, auto_next, reset_iterator):
         global _JSON_ITER_COUNTERS
 
@@ -0,0 +1,464 @@
+"""
+StreamingJSONValidator — incremental JSON / JSON-schema check of LLM output.
+
+Used by the adapter's JSON mode as an `on_delta` sink: every streamed delta
+is pushed through a small push-down parser, and the first character that
+makes the output impossible to complete as valid JSON (or as a document
+matching the schema) raises JSONStreamError. The exception propagates out
+of the HTTP read loop, which closes the connection, so a bad generation is
+abandoned after a few tokens instead of running to max_tokens.
+
+Accepted around the document: leading whitespace, a `<think>...</think>`
+block and a Markdown code fence. Anything after the closing bracket is
+ignored; `close()` returns just the JSON text.
+
+Schema subset checked while streaming:
+  type, enum, const, properties, required, additionalProperties,
+  items, minItems/maxItems, minLength/maxLength,
+  minimum/maximum/exclusiveMinimum/exclusiveMaximum
+Other keywords ($ref, anyOf, pattern, ...) are not enforced.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+class JSONStreamError(ValueError):
+    """The streamed output can no longer become valid JSON for the schema."""
+
+    def __init__(self, reason: str, position: int):
+        super().__init__(f"Invalid JSON output at char {position}: {reason}")
+        self.reason = reason
+        self.position = position
+
+
+def load_schema(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a schema from a node input. Accepts a bare JSON schema or OpenAI's
+    `{"name": ..., "schema": {...}}` wrapper; empty text means no schema.
+    Raises ValueError with a readable message on bad input.
+    """
+    if not text or not text.strip():
+        return None
+    try:
+        schema = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON schema is not valid JSON: {e}")
+    if not isinstance(schema, dict):
+        raise ValueError("JSON schema must be a JSON object.")
+    if isinstance(schema.get("schema"), dict) and "name" in schema:
+        schema = schema["schema"]
+    return schema
+
+
+_WHITESPACE = " \t\r\n"
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_STRING_SPECIAL = re.compile(r'["\\\x00-\x1f]')
+_FENCE_PREFIX = re.compile(r"`{0,3}|```[A-Za-z]*\s*")
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+
+# Number grammar as a DFA: state -> [(char class, next state)]
+_DIGITS = "0123456789"
+_NUMBER_DFA = {
+    "start": [("-", "minus"), ("0", "zero"), ("123456789", "int")],
+    "minus": [("0", "zero"), ("123456789", "int")],
+    "zero": [(".", "dot"), ("eE", "e")],
+    "int": [(_DIGITS, "int"), (".", "dot"), ("eE", "e")],
+    "dot": [(_DIGITS, "frac")],
+    "frac": [(_DIGITS, "frac"), ("eE", "e")],
+    "e": [("+-", "esign"), (_DIGITS, "exp")],
+    "esign": [(_DIGITS, "exp")],
+    "exp": [(_DIGITS, "exp")],
+}
+_NUMBER_END = frozenset({"zero", "int", "frac", "exp"})
+_NUMBER_CHARS = frozenset(_DIGITS + "+-.eE")
+
+_LITERALS = {"t": ("true", True), "f": ("false", False), "n": ("null", None)}
+
+
+def _json_type(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    return "object"
+
+
+class _Frame:
+    """An open object or array."""
+
+    __slots__ = ("kind", "schema", "state", "keys", "key", "count")
+
+    def __init__(self, kind: str, schema: Dict[str, Any]):
+        self.kind = kind
+        self.schema = schema
+        # object: key_or_end, key, colon, value, comma_or_end
+        # array:  value_or_end, value, comma_or_end
+        self.state = "key_or_end" if kind == "object" else "value_or_end"
+        self.keys: set = set()
+        self.key = ""
+        self.count = 0
+
+
+class StreamingJSONValidator:
+    """
+    Callable `on_delta(text, reasoning)` sink that validates text as it arrives.
+
+    Usage:
+        validator = StreamingJSONValidator(schema)
+        client.chat(payload, on_delta=validator)   # raises JSONStreamError early
+        document = validator.close()               # raises if incomplete
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Any]] = None):
+        self.schema = schema or {}
+        self.complete = False
+        self.consumed = 0              # characters received
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._preamble = ""
+        self._in_think = False
+        self._doc: List[str] = []
+        self._pos = 0                  # offset of the character being parsed
+
+        # Scalar token in progress
+        self._token: Optional[str] = None   # "string" | "number" | "literal"
+        self._token_schema: Dict[str, Any] = {}
+        self._is_key = False
+        self._chars: List[str] = []
+        self._escape: Optional[str] = None  # "" after a backslash, hex digits while in \uXXXX
+        self._number_state = "start"
+        self._literal = ""
+
+    # ── Public API ───────────────────────────────────────────────────────
+
+    def __call__(self, text: str, reasoning: str = "") -> None:
+        if text:
+            self.feed(text)
+
+    def feed(self, text: str) -> None:
+        if self.complete:
+            self.consumed += len(text)
+            return
+        doc_from = 0 if self._started else None
+        i, n = 0, len(text)
+        while i < n and not self.complete:
+            self._pos = self.consumed + i
+            if not self._started:
+                i = self._feed_preamble(text, i)
+                if self._started:
+                    doc_from = i - 1
+                continue
+            if self._token == "string":
+                i = self._feed_string(text, i)
+                continue
+            c = text[i]
+            if self._token == "number":
+                if c in _NUMBER_CHARS:
+                    self._feed_number(c)
+                    i += 1
+                    continue
+                self._finish_number()
+                continue   # re-read c as structure
+            if self._token == "literal":
+                self._feed_literal(c)
+            else:
+                self._feed_structure(c)
+            i += 1
+        if doc_from is not None:
+            self._doc.append(text[doc_from:i])
+        self.consumed += n
+
+    def close(self) -> str:
+        """Check the output is a complete document and return its JSON text."""
+        if not self.complete:
+            where = "before any JSON" if not self._started else "inside an unfinished document"
+            raise JSONStreamError(f"output ended {where} (max_tokens reached?)", self.consumed)
+        return "".join(self._doc)
+
+    # ── Preamble: whitespace, <think> block, code fence ──────────────────
+
+    def _feed_preamble(self, text: str, i: int) -> int:
+        c = text[i]
+        if self._in_think:
+            # Only the tail is needed to spot the closing tag
+            self._preamble = (self._preamble + c)[-len(_THINK_CLOSE):]
+            if self._preamble == _THINK_CLOSE:
+                self._in_think = False
+                self._preamble = ""
+            return i + 1
+        if c in "{[":
+            head = self._preamble.strip()
+            if head and not _FENCE_PREFIX.fullmatch(head):
+                self._fail("text before the JSON document")
+            self._started = True
+            self._start_value(c, self.schema)
+            return i + 1
+        self._preamble += c
+        head = self._preamble.lstrip()
+        if head == _THINK_OPEN:
+            self._in_think = True
+            self._preamble = ""
+        elif head and not (_THINK_OPEN.startswith(head) or _FENCE_PREFIX.fullmatch(head)):
+            self._fail("output does not start with JSON")
+        return i + 1
+
+    # ── Structure ────────────────────────────────────────────────────────
+
+    def _feed_structure(self, c: str) -> None:
+        if c in _WHITESPACE:
+            return
+        frame = self._stack[-1]
+        state = frame.state
+        if frame.kind == "object":
+            if state in ("key_or_end", "key") and c == '"':
+                self._begin_string({}, is_key=True)
+            elif state == "colon" and c == ":":
+                frame.state = "value"
+            elif state == "value":
+                self._start_value(c, self._property_schema(frame))
+            elif state == "comma_or_end" and c == ",":
+                frame.state = "key"
+            elif state in ("key_or_end", "comma_or_end") and c == "}":
+                self._close_object(frame)
+            else:
+                expected = {"key_or_end": "'\"' or '}'", "key": "'\"'", "colon": "':'",
+                            "comma_or_end": "',' or '}'"}[state]
+                self._fail(f"expected {expected}, got {c!r}")
+        else:
+            if state in ("value_or_end", "value") and not (state == "value_or_end" and c == "]"):
+                frame.count += 1
+                limit = frame.schema.get("maxItems")
+                if isinstance(limit, int) and frame.count > limit:
+                    self._fail(f"array has more than {limit} items")
+                items = frame.schema.get("items")
+                self._start_value(c, items if isinstance(items, dict) else {})
+            elif state == "comma_or_end" and c == ",":
+                frame.state = "value"
+            elif state in ("value_or_end", "comma_or_end") and c == "]":
+                self._close_array(frame)
+            else:
+                self._fail(f"expected ',' or ']', got {c!r}")
+
+    def _start_value(self, c: str, schema: Dict[str, Any]) -> None:
+        if self._stack:
+            self._stack[-1].state = "comma_or_end"
+        if c == "{":
+            self._check_type("object", schema)
+            self._stack.append(_Frame("object", schema))
+        elif c == "[":
+            self._check_type("array", schema)
+            self._stack.append(_Frame("array", schema))
+        elif c == '"':
+            self._check_type("string", schema)
+            self._begin_string(schema, is_key=False)
+        elif c == "-" or c in _DIGITS:
+            self._check_type("number", schema)
+            self._token, self._token_schema = "number", schema
+            self._chars = [c]
+            self._number_state = "minus" if c == "-" else ("zero" if c == "0" else "int")
+        elif c in _LITERALS:
+            word, value = _LITERALS[c]
+            self._check_type(_json_type(value), schema)
+            self._token, self._token_schema = "literal", schema
+            self._literal = c
+        else:
+            self._fail(f"expected a value, got {c!r}")
+
+    def _close_object(self, frame: _Frame) -> None:
+        missing = [k for k in frame.schema.get("required", []) if k not in frame.keys]
+        if missing:
+            self._fail(f"missing required key(s) {', '.join(map(repr, missing))}")
+        self._pop()
+
+    def _close_array(self, frame: _Frame) -> None:
+        limit = frame.schema.get("minItems")
+        if isinstance(limit, int) and frame.count < limit:
+            self._fail(f"array has fewer than {limit} items")
+        self._pop()
+
+    def _pop(self) -> None:
+        self._stack.pop()
+        if not self._stack:
+            self.complete = True
+
+    def _value_done(self) -> None:
+        self._token = None
+        if not self._stack:
+            self.complete = True
+
+    # ── Scalars ──────────────────────────────────────────────────────────
+
+    def _begin_string(self, schema: Dict[str, Any], is_key: bool) -> None:
+        self._token, self._token_schema, self._is_key = "string", schema, is_key
+        self._chars = []
+        self._escape = None
+
+    def _feed_string(self, text: str, i: int) -> int:
+        """Consume string content in chunks up to the next quote, backslash or control char."""
+        if self._escape is not None:
+            self._feed_escape(text[i])
+            return i + 1
+        m = _STRING_SPECIAL.search(text, i)
+        end = m.start() if m else len(text)
+        if end > i:
+            self._chars.append(text[i:end])
+            self._check_string_prefix()
+        if m is None:
+            return end
+        c = text[end]
+        if c == "\\":
+            self._escape = ""
+        elif c == '"':
+            self._finish_string()
+        else:
+            self._fail("unescaped control character in string")
+        return end + 1
+
+    def _feed_escape(self, c: str) -> None:
+        if self._escape == "":
+            if c == "u":
+                self._escape = "u"
+                return
+            if c not in _ESCAPES:
+                self._fail(f"invalid escape '\\{c}'")
+            self._chars.append(_ESCAPES[c])
+            self._escape = None
+        else:
+            if c not in "0123456789abcdefABCDEF":
+                self._fail("invalid \\u escape")
+            self._escape += c
+            if len(self._escape) == 5:
+                self._chars.append(chr(int(self._escape[1:], 16)))
+                self._escape = None
+        if self._escape is None:
+            self._check_string_prefix()
+
+    def _string_value(self) -> str:
+        value = "".join(self._chars)
+        try:
+            # Join 😀-style surrogate pairs
+            return value.encode("utf-16", "surrogatepass").decode("utf-16")
+        except UnicodeError:
+            return value
+
+    def _check_string_prefix(self) -> None:
+        if self._is_key:
+            frame = self._stack[-1]
+            if frame.schema.get("additionalProperties") is False:
+                prefix = "".join(self._chars)
+                if not any(k.startswith(prefix) for k in frame.schema.get("properties", {})):
+                    self._fail(f"unexpected key starting with {prefix[:40]!r}")
+            return
+        schema = self._token_schema
+        limit = schema.get("maxLength")
+        if isinstance(limit, int) and sum(map(len, self._chars)) > limit:
+            self._fail(f"string longer than {limit} characters")
+        options = self._allowed_values(schema)
+        if options is not None:
+            prefix = "".join(self._chars)
+            if not any(isinstance(v, str) and v.startswith(prefix) for v in options):
+                self._fail(f"string {prefix[:40]!r} is not one of the allowed values")
+
+    def _finish_string(self) -> None:
+        value = self._string_value()
+        if self._is_key:
+            frame = self._stack[-1]
+            properties = frame.schema.get("properties", {})
+            if frame.schema.get("additionalProperties") is False and value not in properties:
+                self._fail(f"unexpected key {value!r}")
+            frame.keys.add(value)
+            frame.key = value
+            frame.state = "colon"
+            self._token = None
+            return
+        limit = self._token_schema.get("minLength")
+        if isinstance(limit, int) and len(value) < limit:
+            self._fail(f"string shorter than {limit} characters")
+        self._check_enum(value)
+        self._value_done()
+
+    def _feed_number(self, c: str) -> None:
+        for chars, nxt in _NUMBER_DFA[self._number_state]:
+            if c in chars:
+                self._number_state = nxt
+                self._chars.append(c)
+                return
+        self._fail(f"invalid number '{''.join(self._chars)}{c}'")
+
+    def _finish_number(self) -> None:
+        text = "".join(self._chars)
+        if self._number_state not in _NUMBER_END:
+            self._fail(f"invalid number {text!r}")
+        value = json.loads(text)
+        schema = self._token_schema
+        types = schema.get("type")
+        if (types == "integer" or types == ["integer"]) and not float(value).is_integer():
+            self._fail(f"expected an integer, got {text}")
+        bounds = (("minimum", lambda v, b: v >= b), ("maximum", lambda v, b: v <= b),
+                  ("exclusiveMinimum", lambda v, b: v > b), ("exclusiveMaximum", lambda v, b: v < b))
+        for key, ok in bounds:
+            bound = schema.get(key)
+            if isinstance(bound, (int, float)) and not isinstance(bound, bool) and not ok(value, bound):
+                self._fail(f"{text} violates {key} {bound}")
+        self._check_enum(value)
+        self._value_done()
+
+    def _feed_literal(self, c: str) -> None:
+        word, value = _LITERALS[self._literal[0]]
+        self._literal += c
+        if not word.startswith(self._literal):
+            self._fail(f"invalid literal {self._literal!r}")
+        if self._literal == word:
+            self._check_enum(value)
+            self._value_done()
+
+    # ── Schema helpers ───────────────────────────────────────────────────
+
+    @staticmethod
+    def _allowed_values(schema: Dict[str, Any]) -> Optional[List[Any]]:
+        if "const" in schema:
+            return [schema["const"]]
+        enum = schema.get("enum")
+        return enum if isinstance(enum, list) else None
+
+    def _check_enum(self, value: Any) -> None:
+        options = self._allowed_values(self._token_schema)
+        if options is None:
+            return
+        # bool is an int subclass in Python; JSON keeps them apart
+        if not any(value == v and _json_type(value) == _json_type(v) for v in options):
+            self._fail(f"{json.dumps(value, ensure_ascii=False)[:40]} is not one of the allowed values")
+
+    def _check_type(self, actual: str, schema: Dict[str, Any]) -> None:
+        types = schema.get("type")
+        if isinstance(types, str):
+            types = [types]
+        if isinstance(types, list):
+            allowed = set(types)
+            if "integer" in allowed:
+                allowed.add("number")
+            if actual not in allowed:
+                self._fail(f"expected {' or '.join(types)}, got {actual}")
+        options = self._allowed_values(schema)
+        if options is not None and actual not in {_json_type(v) for v in options}:
+            self._fail(f"a {actual} is not one of the allowed values")
+
+    @staticmethod
+    def _property_schema(frame: _Frame) -> Dict[str, Any]:
+        properties = frame.schema.get("properties", {})
+        if frame.key in properties:
+            return properties[frame.key]
+        extra = frame.schema.get("additionalProperties")
+        return extra if isinstance(extra, dict) else {}
+
+    def _fail(self, reason: str) -> None:
+        raise JSONStreamError(reason, self._pos)
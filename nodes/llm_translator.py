@@ -3,39 +3,120 @@ LLM Translator — Unix-philosophy translation node.
 
 Do One Thing and Do It Well: translate text via LLM API.
 Reuses the shared LLMClient for robustness.
+
+Long text is split into token-bounded chunks on paragraph / sentence /
+subtitle-cue boundaries (text_chunker), translated concurrently with a
+bounded number of requests in flight, and reassembled in order. A failed
+chunk is retried on its own.
+
+With the translation memory on, text is cut into sentence-level segments
+first: segments translated before (same language, glossary and model) are
+served from config/translation_memory.db, and only the rest are packed
+into chunks, each segment wrapped in a numbered <seg> tag so the reply can
+be split back and stored per segment.
+
+LoRA tags, weights, subtitle timings, code and URLs are replaced with
+placeholders before sending (protected_spans) and restored afterwards.
+SubRip files are split into cues (text_chunker.split_srt) and only the cue
+texts are sent, batched in numbered <seg> tags.
+
+LLMMultiTranslator translates one text into several languages with one
+structured-output request per group of languages, and falls back to the
+per-language path when a grouped reply does not parse.
 """
 
-import os
+import re
+import sqlite3
+import json as json_lib
+import asyncio
+import contextvars
+import threading
 import time
-import json
-from typing import Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
 try:
     from .api_client import LLMClient
+    from .profiling import profile_node
+    from .stream_preview import StreamPreview
+    from .provider_registry import get_registry
+    from .async_client import AsyncLLMClient, async_nodes_enabled
+    from .token_estimator import ContextWindowError, context_window, count_text, fit_messages
+    from .text_chunker import Chunk, is_srt, split_segments, split_srt, split_text
+    from .protected_spans import Protected, protect
+    from .glossary import compile_glossary
+    from .json_stream import StreamingJSONValidator
+    from .response_format import json_request, supported_formats
+    from .translation_memory import (TranslationMemory, get_translation_memory,
+                                     glossary_digest, segment_key)
 except ImportError:
     from api_client import LLMClient
+    from profiling import profile_node
+    from stream_preview import StreamPreview
+    from provider_registry import get_registry
+    from async_client import AsyncLLMClient, async_nodes_enabled
+    from token_estimator import ContextWindowError, context_window, count_text, fit_messages
+    from text_chunker import Chunk, is_srt, split_segments, split_srt, split_text
+    from protected_spans import Protected, protect
+    from glossary import compile_glossary
+    from json_stream import StreamingJSONValidator
+    from response_format import json_request, supported_formats
+    from translation_memory import (TranslationMemory, get_translation_memory,
+                                    glossary_digest, segment_key)
+
+
+_CHUNK_RETRIES = 2  # extra attempts for a failed chunk (on top of the client's HTTP retries)
+_MAX_TOKENS = 4096
+_CHUNK_TOKENS = 1500   # default chunk size, also used by the multi-target fallback
+
+_SEGMENT_INSTRUCTION = (
+    "\n\nThe text is split into numbered <seg id=\"N\">...</seg> elements. Translate the content "
+    "of every element and output each one in the same tags with the same id, in order."
+)
+_SEG = re.compile(r'<seg id="(\d+)">(.*?)</seg>', re.S)
+_PARTIAL_PLACEHOLDER = re.compile(r"⟦\s*\d*\s*\Z")   # a placeholder cut off at the end of a delta
+_FENCE = re.compile(r"\A\s*```[^\n`]*\n(.*?)\n?[ \t]*```\s*\Z", re.S)   # a reply wrapped in a code fence
+_PLACEHOLDER_INSTRUCTION = (
+    "\n\nPlaceholders like ⟦1⟧ stand for text that must not be translated: keep every one exactly "
+    "as written, where it belongs in the translation."
+)
+
+# Multi-target grouping: estimated output tokens per language and the share
+# of max_tokens one grouped reply may fill
+_OUTPUT_RATIO = 1.5
+_JSON_OVERHEAD = 16
+_GROUP_BUDGET = 0.8
+
+
+TARGET_LANGUAGES = [
+    "English",
+    "Chinese (Simplified)",
+    "Chinese (Traditional)",
+    "Japanese",
+    "Korean",
+    "French",
+    "German",
+    "Spanish",
+    "Russian",
+    "Italian",
+    "Portuguese",
+    "Dutch",
+    "Arabic"
+]
 
 
 def get_providers_data():
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "providers.json")
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            return json.load(f).get("providers", [])
-    except Exception as e:
-        print(f"[LLMs_Toolkit] Error reading providers.json: {e}")
-        return []
+    return get_registry().providers()
 
 def get_enabled_providers():
-    providers = get_providers_data()
-    enabled = [p["name"] for p in providers if p.get("enabled", False)]
+    enabled = [p["name"] for p in get_registry().providers(enabled_only=True, enabled_default=False)]
     return enabled if enabled else ["None"]
 
 def get_all_models():
-    providers = get_providers_data()
     models = []
-    for p in providers:
-        if p.get("enabled", False):
-            models.extend(p.get("models", []))
+    for p in get_registry().providers(enabled_only=True, enabled_default=False):
+        models.extend(p.get("models", []))
     # Deduplicate and keep order
     return list(dict.fromkeys(models)) if models else ["None"]
 
@@ -60,21 +141,7 @@ class LLMTranslator:
                     "default": "",
                     "placeholder": "✏️ Paste the text you want to translate here.\nSupports plain text, prompts, subtitles, or any multi-line content.\nLeave empty to skip."
                 }),
-                "target_language": ([
-                    "English",
-                    "Chinese (Simplified)",
-                    "Chinese (Traditional)",
-                    "Japanese",
-                    "Korean",
-                    "French",
-                    "German",
-                    "Spanish",
-                    "Russian",
-                    "Italian",
-                    "Portuguese",
-                    "Dutch",
-                    "Arabic"
-                ], {
+                "target_language": (TARGET_LANGUAGES, {
                     "default": "English"
                 }),
             },
@@ -85,14 +152,37 @@ class LLMTranslator:
                     "default": "",
                     "placeholder": "📖 Optional: Define domain-specific terms to ensure consistent translation.\nFormat — one entry per line:\n  LoRA = LoRA\n  Checkpoint = 检查点\n  Workflow = 工作流\nThe LLM will strictly follow these mappings."
                 }),
-            }
+                "stream": ("BOOLEAN", {
+                    "default": False,
+                    "label": "Stream Preview",
+                    "tooltip": "Show the translation on the node while tokens arrive"
+                }),
+                "chunk_tokens": ("INT", {
+                    "default": _CHUNK_TOKENS, "min": 0, "max": 16000, "step": 100,
+                    "tooltip": "Split longer text into chunks of about this many tokens "
+                               "(paragraph / sentence / subtitle boundaries). 0 = one request"
+                }),
+                "concurrency": ("INT", {
+                    "default": 4, "min": 1, "max": 16,
+                    "tooltip": "Maximum number of chunk requests in flight"
+                }),
+                "use_memory": ("BOOLEAN", {
+                    "default": True,
+                    "label": "Translation Memory",
+                    "tooltip": "Reuse stored translations of sentences seen before "
+                               "(config/translation_memory.db); only new ones are sent"
+                }),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"}
         }
 
     RETURN_TYPES = ("STRING",)
     RETURN_NAMES = ("translated_text",)
-    FUNCTION = "translate"
+    # Coroutine entry point where ComfyUI supports it, so network waits overlap
+    FUNCTION = "translate_async" if async_nodes_enabled() else "translate"
     CATEGORY = "🚦ComfyUI_LLMs_Toolkit/Utility"
 
+    @profile_node
     def translate(
         self,
         provider: str,
@@ -100,78 +190,825 @@ class LLMTranslator:
         text: str,
         target_language: str,
         llm_config: Dict[str, Any] = None,
-        glossary: str = ""
+        glossary: str = "",
+        stream: bool = False,
+        chunk_tokens: int = _CHUNK_TOKENS,
+        concurrency: int = 4,
+        use_memory: bool = True,
+        unique_id: str = ""
     ) -> Tuple[str]:
         """Execute translation. Returns error text on failure instead of crashing."""
         if not text.strip():
             return ("",)
 
         start_time = time.time()
-        
+        try:
+            plan = self._prepare(provider, model, text, target_language, llm_config, glossary,
+                                 chunk_tokens, use_memory)
+            if isinstance(plan, str):
+                return (plan,)
+
+            # Call API via shared client
+            preview = StreamPreview.create(unique_id) if stream else None
+            client = self._client(LLMClient, plan.config)
+            try:
+                translated = self._run_plan(client, plan, concurrency, preview)
+            finally:
+                if preview is not None:
+                    preview.close()
+            return self._done(text, target_language, translated, start_time, plan)
+
+        except Exception as e:
+            return self._failed(e, start_time)
+
+    @profile_node
+    async def translate_async(
+        self,
+        provider: str,
+        model: str,
+        text: str,
+        target_language: str,
+        llm_config: Dict[str, Any] = None,
+        glossary: str = "",
+        stream: bool = False,
+        chunk_tokens: int = _CHUNK_TOKENS,
+        concurrency: int = 4,
+        use_memory: bool = True,
+        unique_id: str = ""
+    ) -> Tuple[str]:
+        """Coroutine variant of `translate` using the aiohttp transport."""
+        if not text.strip():
+            return ("",)
+
+        start_time = time.time()
+        try:
+            # Memory lookup (SQLite), token counting and glossary compilation stay off the event loop
+            plan = await asyncio.to_thread(self._prepare, provider, model, text, target_language, llm_config,
+                                           glossary, chunk_tokens, use_memory)
+            if isinstance(plan, str):
+                return (plan,)
+
+            preview = StreamPreview.create(unique_id) if stream else None
+            client = self._client(AsyncLLMClient, plan.config)
+            try:
+                translated = await self._run_plan_async(client, plan, concurrency, preview)
+            finally:
+                if preview is not None:
+                    preview.close()
+            return await asyncio.to_thread(self._done, text, target_language, translated, start_time, plan)
+
+        except Exception as e:
+            return self._failed(e, start_time)
+
+    # ── Chunked translation ──────────────────────────────────────────────
+
+    def _run_plan(self, client: LLMClient, plan: "_Plan", concurrency: int,
+                  preview: Optional[StreamPreview]) -> str:
+        """Send the plan's jobs (then one-segment retries) and return the reassembled text."""
+        jobs, progress = plan.jobs, _ChunkProgress(len(plan.jobs), preview)
+        while jobs:
+            if len(jobs) == 1 and not jobs[0].marked:
+                sink = _SpanPreview.wrap(plan.guards[jobs[0].segments[0]], preview)
+                results = [plan.parse(jobs[0], self._chat_chunk(client, jobs[0].payload, 0, 1, sink))]
+            else:
+                results = self._translate_chunks(client, plan, jobs, concurrency, progress)
+            jobs, progress = plan.absorb(jobs, results), None
+        return plan.finish()
+
+    async def _run_plan_async(self, client: AsyncLLMClient, plan: "_Plan", concurrency: int,
+                              preview: Optional[StreamPreview]) -> str:
+        jobs, progress = plan.jobs, _ChunkProgress(len(plan.jobs), preview)
+        while jobs:
+            if len(jobs) == 1 and not jobs[0].marked:
+                sink = _SpanPreview.wrap(plan.guards[jobs[0].segments[0]], preview)
+                raw = await self._chat_chunk_async(client, jobs[0].payload, 0, 1, sink)
+                results = [plan.parse(jobs[0], raw)]
+            else:
+                results = await self._translate_chunks_async(client, plan, jobs, concurrency, progress)
+            jobs, progress = plan.absorb(jobs, results), None
+        # finish() writes new segments to the memory
+        return await asyncio.to_thread(plan.finish)
+
+    def _translate_chunks(self, client: LLMClient, plan: "_Plan", jobs: List["_Job"], concurrency: int,
+                          progress: Optional["_ChunkProgress"]) -> List[Optional[List[str]]]:
+        n = len(jobs)
+        workers = max(1, min(concurrency, n))
+        if n > 1:
+            print(f"[LLM Translator] {n} chunks, concurrency {workers}")
+
+        def run(i: int) -> Optional[List[str]]:
+            parsed = plan.parse(jobs[i], self._chat_chunk(client, jobs[i].payload, i, n))
+            if progress is not None:
+                progress.done(i, plan.display(jobs[i], parsed))
+            return parsed
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm_translate") as pool:
+            # Each task gets its own context copy so trace spans nest under this node
+            futures = [pool.submit(contextvars.copy_context().run, run, i) for i in range(n)]
+            try:
+                return [f.result() for f in futures]
+            except BaseException:
+                # One chunk failed for good: don't start the ones still queued
+                for f in futures:
+                    f.cancel()
+                raise
+
+    async def _translate_chunks_async(self, client: AsyncLLMClient, plan: "_Plan", jobs: List["_Job"],
+                                      concurrency: int, progress: Optional["_ChunkProgress"]
+                                      ) -> List[Optional[List[str]]]:
+        n = len(jobs)
+        workers = max(1, min(concurrency, n))
+        limit = asyncio.Semaphore(workers)
+        if n > 1:
+            print(f"[LLM Translator] {n} chunks, concurrency {workers}")
+
+        async def run(i: int) -> Optional[List[str]]:
+            async with limit:
+                parsed = plan.parse(jobs[i], await self._chat_chunk_async(client, jobs[i].payload, i, n))
+            if progress is not None:
+                progress.done(i, plan.display(jobs[i], parsed))
+            return parsed
+
+        tasks = [asyncio.ensure_future(run(i)) for i in range(n)]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    def _chat_chunk(self, client: LLMClient, payload: Dict[str, Any], index: int, total: int,
+                    on_delta: Optional[Callable[..., None]] = None) -> str:
+        """Translate one chunk, retrying it alone when the request fails."""
+        for attempt in range(_CHUNK_RETRIES + 1):
+            try:
+                content, data = client.chat(payload, on_delta=on_delta)
+                return self._checked(content, data, index, total)
+            except Exception as e:
+                if attempt == _CHUNK_RETRIES:
+                    raise self._chunk_error(e, index, total) from e
+                self._log_retry(e, index, total, attempt)
+
+    async def _chat_chunk_async(self, client: AsyncLLMClient, payload: Dict[str, Any], index: int, total: int,
+                                on_delta: Optional[Callable[..., None]] = None) -> str:
+        for attempt in range(_CHUNK_RETRIES + 1):
+            try:
+                content, data = await client.chat_async(payload, on_delta=on_delta)
+                return self._checked(content, data, index, total)
+            except Exception as e:
+                if attempt == _CHUNK_RETRIES:
+                    raise self._chunk_error(e, index, total) from e
+                self._log_retry(e, index, total, attempt)
+
+    @staticmethod
+    def _checked(content: str, data: Dict[str, Any], index: int, total: int) -> str:
+        choices = data.get("choices") or [{}]
+        if choices[0].get("finish_reason") == "length":
+            # Not retried (it would stop at the same place), but never silent
+            where = f"chunk {index + 1}/{total}" if total > 1 else "translation"
+            print(f"[LLM Translator] ⚠ {where} was cut off at max_tokens; lower chunk_tokens")
+        return content or ""
+
+    @staticmethod
+    def _log_retry(e: Exception, index: int, total: int, attempt: int) -> None:
+        where = f"chunk {index + 1}/{total}" if total > 1 else "request"
+        print(f"[LLM Translator] {where} failed ({str(e)[:120]}), "
+              f"retrying {attempt + 1}/{_CHUNK_RETRIES}")
+
+    @staticmethod
+    def _chunk_error(e: Exception, index: int, total: int) -> Exception:
+        return Exception(f"Chunk {index + 1}/{total}: {e}") if total > 1 else e
+
+    # ── Helpers (shared by the sync and async paths) ─────────────────────
+
+    @staticmethod
+    def _prepare(
+        provider: str,
+        model: str,
+        text: str,
+        target_language: str,
+        llm_config: Optional[Dict[str, Any]],
+        glossary: str,
+        chunk_tokens: int = 0,
+        use_memory: bool = False
+    ) -> Union[str, "_Plan"]:
+        """Return the translation plan, or the error text for a configuration problem."""
+        config = LLMTranslator._config(provider, model, llm_config)
+        if isinstance(config, str):
+            return config
+
+        # Build system instruction
+        system_instruction = (
+            f"You are a professional translator. Translate the following text into {target_language}. "
+            "Maintain the original tone, style, and formatting. "
+            "Output ONLY the translated text, no explanations."
+        )
+        # Glossary entries are added per request, only those whose terms occur in it
+
+        memory = get_translation_memory()
+        plan = _Plan(config, system_instruction, target_language, glossary,
+                     memory if use_memory and memory.enabled else None)
+        try:
+            plan.build(text, chunk_tokens)
+        except ContextWindowError as e:
+            return f"[Translation Error] {e}"
+        return plan
+
+    @staticmethod
+    def _config(provider: str, model: str, llm_config: Optional[Dict[str, Any]]) -> Union[str, Dict[str, Any]]:
+        """Connection settings, or the error text for a configuration problem."""
         # Build configuration (Use provided llm_config if connected, otherwise lookup from providers.json)
         if llm_config is None:
-            providers_data = get_providers_data()
-            selected_provider = next((p for p in providers_data if p["name"] == provider), None)
+            selected_provider = get_registry().get_by_name(provider)
             
             if not selected_provider:
-                return (f"[Translation Error] Provider '{provider}' not found in configuration.",)
+                return f"[Translation Error] Provider '{provider}' not found in configuration."
                 
             api_key = selected_provider.get("apiKey", "")
             base_url = selected_provider.get("apiHost", "")
             
             if not api_key:
-                return (f"[Translation Error] API Key is missing for provider '{provider}'.",)
+                return f"[Translation Error] API Key is missing for provider '{provider}'."
                 
-            config = {
+            return {
                 "base_url": base_url,
                 "api_key": api_key,
                 "model": model
             }
-        else:
-            config = llm_config
+        return llm_config
 
-        # Build system instruction
-        system_instruction = (
-            f"You are a professional translator. Translate the following text into {target_language}. "
-            "Maintain the original tone, style, and formatting. "
-            "Output ONLY the translated text, no explanations."
+    @staticmethod
+    def _client(client_cls, config: Dict[str, Any]) -> LLMClient:
+        return client_cls(
+            base_url=config.get("base_url", ""),
+            api_key=config.get("api_key", ""),
+            max_retries=3,
+            timeout=60,
         )
-        if glossary.strip():
-            system_instruction += f"\n\nGlossary (Strictly follow):\n{glossary}"
 
-        # Build payload
+    @staticmethod
+    def _done(text: str, target_language: str, translated_text: str, start_time: float,
+              plan: "_Plan") -> Tuple[str]:
+        elapsed = int((time.time() - start_time) * 1000)
+        parts = f", {len(plan.jobs)} chunks" if len(plan.jobs) > 1 else ""
+        print(f"[LLM Translator] {len(text)} chars -> {target_language} ({elapsed}ms{parts})")
+        if plan.terms is not None:
+            print(f"[LLM Translator] glossary: {len(plan.terms_sent)} of {plan.terms.size} entries "
+                  f"matched the text")
+        if plan.protected:
+            print(f"[LLM Translator] {plan.protected} protected span(s) kept out of the request"
+                  + (f", {plan.damaged} segment(s) lost a placeholder (spans appended)" if plan.damaged else ""))
+        if plan.memory is not None:
+            line = f"[LLM Translator] memory: {plan.hits}/{plan.lookups} segment(s) served locally"
+            try:
+                stats = plan.memory.stats()
+                line += f" | {stats['entries']} stored, hit rate {stats['hit_rate']:.0%}"
+            except sqlite3.Error:
+                pass   # totals are informational; the translation is done
+            print(line)
+        return (translated_text,)
+
+    @staticmethod
+    def _failed(e: Exception, start_time: float) -> Tuple[str]:
+        elapsed = int((time.time() - start_time) * 1000)
+        print(f"[LLM Translator] ✗ Translation failed ({elapsed}ms): {e}")
+        return (f"[Translation Error] {str(e)[:200]}",)
+
+
+def _outer(source: str, translated: str) -> str:
+    """`translated` with the leading and trailing whitespace of `source` (indentation, line breaks)."""
+    if not source.strip():
+        return translated
+    lead = source[:len(source) - len(source.lstrip())]
+    trail = source[len(source.rstrip()):]
+    return lead + translated.strip() + trail
+
+
+@dataclass
+class _Job:
+    """One request: the segments it translates and its payload."""
+    segments: List[int]
+    payload: Dict[str, Any]
+    marked: bool = False     # segments wrapped in <seg id="N"> tags
+
+
+class _Plan:
+    """
+    Segments of one translation, what the memory already knows, and the
+    requests for the rest. Without a memory the segments are the
+    token-bounded chunks and every job is one plain chunk.
+    """
+
+    def __init__(self, config: Dict[str, Any], system: str, language: str, glossary: str,
+                 memory: Optional[TranslationMemory]):
+        self.config = config
+        self.model = config.get("model", "")
+        self.system = system
+        self.language = language
+        self.glossary = glossary_digest(glossary)
+        self.terms = compile_glossary(glossary)
+        self.terms_sent: set = set()   # glossary entries used by any request
+        self.memory = memory
+        self.window = context_window(self.model)
+        self.segments: List[Chunk] = []
+        self.keys: List[Optional[str]] = []
+        self.guards: List[Protected] = []
+        self.translations: List[Optional[str]] = []   # protected form, placeholders kept
+        self.jobs: List[_Job] = []
+        self.hits = 0
+        self.lookups = 0
+        self.protected = 0          # spans kept out of the requests
+        self.damaged = 0            # segments whose reply lost a placeholder
+        self._fresh: set = set()    # segment indices translated by this run
+        self._first: Dict[str, int] = {}   # memory key -> index of the segment actually sent
+
+    def build(self, text: str, chunk_tokens: int) -> None:
+        """Split, protect, look up the memory and pack the misses (raises ContextWindowError)."""
+        srt = is_srt(text)
+        if srt:
+            self.segments = split_srt(text)
+        elif self.memory is None:
+            self.segments = split_text(text, chunk_tokens)
+        else:
+            self.segments = split_segments(text)
+        self.guards = [protect(s.text) for s in self.segments]
+        self.protected = sum(len(g.spans) for g in self.guards)
+        # Segments with nothing to translate (cue numbers, LoRA tags only, blank) are kept as they are
+        self.translations = [None if g.translatable else g.text for g in self.guards]
+
+        if self.memory is None and not srt:
+            self.keys = [None] * len(self.segments)
+            self.jobs = [self._job([i]) for i, t in enumerate(self.translations) if t is None]
+            return
+
+        # Keys are computed on the protected text, so segments differing only in spans share one
+        self.keys = [segment_key(g.text, self.language, self.glossary, self.model)
+                     if self.memory is not None and t is None else None
+                     for g, t in zip(self.guards, self.translations)]
+        wanted = [k for k in self.keys if k is not None]
+        found = self.memory.lookup(wanted) if self.memory is not None else {}
+        for i, key in enumerate(self.keys):
+            if key in found:
+                self.translations[i] = found[key]
+        self.lookups = len(wanted)
+        self.hits = sum(1 for k in wanted if k in found)
+
+        # Translate each distinct missing segment once
+        first: Dict[Any, int] = {}
+        for i, key in enumerate(self.keys):
+            if self.translations[i] is None:
+                first.setdefault(key if key is not None else i, i)
+        pending = list(first.values())
+        self._first = {key: i for key, i in first.items() if isinstance(key, str)}
+
+        groups: List[List[int]] = []
+        tokens = 0
+        for i in pending:
+            cost = count_text(self.guards[i].text)
+            if groups and (chunk_tokens <= 0 or tokens + cost <= chunk_tokens):
+                groups[-1].append(i)
+                tokens += cost
+            else:
+                groups.append([i])
+                tokens = cost
+        self.jobs = [self._job(g) for g in groups]
+
+    def _job(self, segments: List[int]) -> _Job:
+        marked = len(segments) > 1
+        if marked:
+            system = self.system + _SEGMENT_INSTRUCTION
+            content = "\n".join(f'<seg id="{n}">{self.guards[i].text}</seg>'
+                                for n, i in enumerate(segments, 1))
+        else:
+            system, content = self.system, self.guards[segments[0]].text
+        if any(self.guards[i].spans for i in segments):
+            system += _PLACEHOLDER_INSTRUCTION
+        if self.terms is not None:
+            matched = self.terms.matches("\n".join(self.guards[i].text for i in segments))
+            self.terms_sent.update(matched)
+            lines = self.terms.lines(matched)
+            if lines:
+                system += "\n\nGlossary (Strictly follow):\n" + "\n".join(lines)
         messages = [
-            {"role": "system", "content": system_instruction},
-            {"role": "user", "content": text}
+            {"role": "system", "content": system},
+            {"role": "user", "content": content}
         ]
+        # Reject oversized text before uploading it; shrink max_tokens to the space left
+        messages, max_tokens, _ = fit_messages(messages, _MAX_TOKENS, self.window)
         payload = {
-            "model": config.get("model", ""),
+            "model": self.model,
             "messages": messages,
             "temperature": 0.3,
-            "max_tokens": 4096
+            "max_tokens": max_tokens
         }
+        return _Job(segments, payload, marked)
+
+    def parse(self, job: _Job, reply: str) -> Optional[List[str]]:
+        """Per-segment translations from a reply, or None when the tags do not line up."""
+        if not job.marked:
+            source = self.guards[job.segments[0]].text
+            fenced = _FENCE.match(reply) if "```" not in source else None
+            return [(fenced.group(1) if fenced else reply).strip()]
+        parts = {int(n): body.strip() for n, body in _SEG.findall(reply)}
+        if sorted(parts) != list(range(1, len(job.segments) + 1)):
+            return None
+        return [parts[n] for n in range(1, len(job.segments) + 1)]
+
+    def display(self, job: _Job, parsed: Optional[List[str]]) -> str:
+        """Preview text of a finished job."""
+        if parsed is None:
+            return ""
+        return "".join(self.guards[i].restore(_outer(self.guards[i].text, t))[0] + self.segments[i].sep
+                       for i, t in zip(job.segments, parsed))
+
+    def absorb(self, jobs: List[_Job], results: List[Optional[List[str]]]) -> List[_Job]:
+        """Record parsed results; returns one-segment retries for replies that could not be split."""
+        retry: List[_Job] = []
+        for job, parsed in zip(jobs, results):
+            if parsed is None:
+                retry.extend(self._job([i]) for i in job.segments)
+                continue
+            for i, text in zip(job.segments, parsed):
+                self.translations[i] = text
+                self._fresh.add(i)
+        if retry:
+            print(f"[LLM Translator] {len(retry)} segment(s) came back without matching tags, "
+                  f"translating them one by one")
+        return retry
+
+    def finish(self) -> str:
+        """Fill repeated segments, store new translations, and reassemble the text."""
+        new: Dict[str, Tuple[str, str, str, str, str]] = {}
+        restored: List[str] = []
+        for i in sorted(self._fresh):
+            key = self.keys[i]
+            # A translation that lost a placeholder is used, but not remembered
+            if key is not None and self.translations[i] and self.guards[i].restore(self.translations[i])[1]:
+                new.setdefault(key, (key, self.guards[i].text, self.translations[i], self.language, self.model))
+        for i, key in enumerate(self.keys):
+            if self.translations[i] is None:
+                # Repeats copy their first occurrence, stored or not
+                source = self._first.get(key)
+                self.translations[i] = (self.translations[source] or "") if source is not None else ""
+            text, intact = self.guards[i].restore(_outer(self.guards[i].text, self.translations[i]))
+            if not intact:
+                self.damaged += 1
+            restored.append(text)
+        if self.memory is not None and new:
+            self.memory.store(new.values())
+        return "".join(t + s.sep for s, t in zip(self.segments, restored))
+
+
+class _ChunkProgress:
+    """Forwards finished chunks to the stream preview in source order."""
+
+    def __init__(self, total: int, preview: Optional[StreamPreview]):
+        self._preview = preview
+        self._results: List[Optional[str]] = [None] * total
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def done(self, index: int, text: str) -> None:
+        if self._preview is None:
+            return
+        with self._lock:
+            self._results[index] = text
+            while self._next < len(self._results) and self._results[self._next] is not None:
+                self._preview(self._results[self._next])
+                self._next += 1
+
+
+class _SpanPreview:
+    """
+    Stream sink that puts protected spans back into the deltas of a
+    one-request translation, so the preview never shows ⟦n⟧ placeholders.
+    The tail of a delta that may be the start of a placeholder is held
+    back until the next delta completes (or rules out) it.
+    """
+
+    def __init__(self, guard: Protected, preview: StreamPreview):
+        self._guard = guard
+        self._preview = preview
+        self._pending = ""
+
+    @classmethod
+    def wrap(cls, guard: Protected, preview: Optional[StreamPreview]) -> Optional[Callable[..., None]]:
+        if preview is None or not guard.spans:
+            return preview
+        return cls(guard, preview)
+
+    def __call__(self, text: str, reasoning: str = "") -> None:
+        text = self._pending + text
+        partial = _PARTIAL_PLACEHOLDER.search(text)
+        cut = partial.start() if partial else len(text)
+        text, self._pending = text[:cut], text[cut:]
+        if text or reasoning:
+            self._preview(self._guard.fill(text), reasoning)
+
 
-        # Call API via shared client
+class LLMMultiTranslator(LLMTranslator):
+    """
+    Translate one text into several languages at once.
+
+    Languages are grouped so each group's estimated output fits one reply;
+    a group is one request whose JSON reply maps language -> translation
+    (validated while it streams). Languages fully covered by the
+    translation memory are served locally, and a group whose request or
+    reply fails falls back to translating each of its languages on its own,
+    with the plan (and memory lookup) already prepared for it.
+    """
+
+    SLOTS = 6
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        base = super().INPUT_TYPES()
+        required = {k: base["required"][k] for k in ("provider", "model", "text")}
+        required["language_1"] = (TARGET_LANGUAGES, {"default": "English"})
+        optional = {f"language_{i}": (["None"] + TARGET_LANGUAGES, {"default": "None"})
+                    for i in range(2, cls.SLOTS + 1)}
+        optional.update({k: base["optional"][k] for k in ("llm_config", "glossary", "concurrency", "use_memory")})
+        return {"required": required, "optional": optional, "hidden": base["hidden"]}
+
+    RETURN_TYPES = ("STRING",) * SLOTS + ("STRING",)
+    RETURN_NAMES = tuple(f"translation_{i}" for i in range(1, SLOTS + 1)) + ("translations_json",)
+    FUNCTION = "translate_multi_async" if async_nodes_enabled() else "translate_multi"
+
+    @profile_node
+    def translate_multi(
+        self,
+        provider: str,
+        model: str,
+        text: str,
+        language_1: str,
+        llm_config: Dict[str, Any] = None,
+        glossary: str = "",
+        concurrency: int = 4,
+        use_memory: bool = True,
+        unique_id: str = "",
+        **languages: str
+    ) -> Tuple[str, ...]:
+        """Execute translation into every selected language (error text per failed language)."""
+        start_time = time.time()
         try:
-            client = LLMClient(
-                base_url=config.get("base_url", ""),
-                api_key=config.get("api_key", ""),
-                max_retries=3,
-                timeout=60,
-            )
-            translated_text, _ = client.chat(payload)
+            job = self._multi_prepare(provider, model, text, [language_1] + self._slots(languages),
+                                      llm_config, glossary, use_memory)
+        except Exception as e:
+            return self._multi_result(self._failed(e, start_time)[0])
+        if not isinstance(job, _MultiJob):
+            return self._multi_result(job)
+
+        client = self._client(LLMClient, job.config)
 
-            elapsed = int((time.time() - start_time) * 1000)
-            print(f"[LLM Translator] {len(text)} chars -> {target_language} ({elapsed}ms)")
+        def run(group: List[str]) -> None:
+            try:
+                job.accept(group, self._chat_group(client, job, group))
+            except Exception as e:
+                job.reject(group, e)
 
-            return (translated_text.strip(),)
+        def single(lang: str) -> str:
+            # The plan prepared for this language, so the memory is looked up once
+            plan, started = job.plans[lang], time.time()
+            try:
+                return self._done(text, lang, self._run_plan(client, plan, concurrency, None), started, plan)[0]
+            except Exception as e:
+                return self._failed(e, started)[0]
 
+        _map_bounded(run, job.groups, concurrency)
+        fallback = job.fallback_languages()
+        # One language at a time: _run_plan already keeps `concurrency` chunk requests in flight
+        job.results.update((lang, single(lang)) for lang in fallback)
+        return self._multi_done(job, start_time)
+
+    @profile_node
+    async def translate_multi_async(
+        self,
+        provider: str,
+        model: str,
+        text: str,
+        language_1: str,
+        llm_config: Dict[str, Any] = None,
+        glossary: str = "",
+        concurrency: int = 4,
+        use_memory: bool = True,
+        unique_id: str = "",
+        **languages: str
+    ) -> Tuple[str, ...]:
+        """Coroutine variant of `translate_multi` using the aiohttp transport."""
+        start_time = time.time()
+        try:
+            job = await asyncio.to_thread(self._multi_prepare, provider, model, text,
+                                          [language_1] + self._slots(languages), llm_config, glossary, use_memory)
         except Exception as e:
-            elapsed = int((time.time() - start_time) * 1000)
-            print(f"[LLM Translator] ✗ Translation failed ({elapsed}ms): {e}")
-            return (f"[Translation Error] {str(e)[:200]}",)
+            return self._multi_result(self._failed(e, start_time)[0])
+        if not isinstance(job, _MultiJob):
+            return self._multi_result(job)
+
+        client = self._client(AsyncLLMClient, job.config)
+
+        async def run(group: List[str]) -> None:
+            try:
+                document = await self._chat_group_async(client, job, group)
+                await asyncio.to_thread(job.accept, group, document)
+            except Exception as e:
+                job.reject(group, e)
+
+        await _gather_bounded(run, job.groups, concurrency)
+        fallback = job.fallback_languages()
+
+        async def single(lang: str) -> str:
+            plan, started = job.plans[lang], time.time()
+            try:
+                translated = await self._run_plan_async(client, plan, concurrency, None)
+                return (await asyncio.to_thread(self._done, text, lang, translated, started, plan))[0]
+            except Exception as e:
+                return self._failed(e, started)[0]
+
+        for lang in fallback:
+            job.results[lang] = await single(lang)
+        return self._multi_done(job, start_time)
+
+    # ── Helpers ──────────────────────────────────────────────────────────
+
+    def _slots(self, languages: Dict[str, str]) -> List[str]:
+        return [languages.get(f"language_{i}", "None") for i in range(2, self.SLOTS + 1)]
+
+    def _multi_prepare(self, provider: str, model: str, text: str, slots: List[str],
+                       llm_config: Optional[Dict[str, Any]], glossary: str,
+                       use_memory: bool) -> Union["_MultiJob", str, Dict[str, str]]:
+        """The job for the selected languages; a dict of final results or an error text when no request is needed."""
+        wanted = list(dict.fromkeys(lang for lang in slots if lang and lang != "None"))
+        job_slots = [lang if lang in wanted else None for lang in slots]
+        if not text.strip():
+            return {"slots": job_slots, "results": {lang: "" for lang in wanted}}
+        if not protect(text).translatable:
+            return {"slots": job_slots, "results": {lang: text for lang in wanted}}
+        config = self._config(provider, model, llm_config)
+        if isinstance(config, str):
+            return config
+
+        job = _MultiJob(config, text, job_slots, glossary, _response_formats(provider, llm_config))
+        for lang in wanted:
+            # One plan (and one memory lookup) per language; a fallback runs this same plan
+            plan = self._prepare(provider, model, text, lang, llm_config, glossary, _CHUNK_TOKENS, use_memory)
+            if isinstance(plan, str):
+                job.results[lang] = plan
+            elif plan.memory is not None and not plan.jobs:
+                # Fully covered by the memory: no request
+                job.results[lang] = plan.finish()
+                job.from_memory += 1
+            else:
+                job.plans[lang] = plan
+        job.build()
+        return job
+
+    def _chat_group(self, client: LLMClient, job: "_MultiJob", group: List[str]) -> Dict[str, str]:
+        validator = StreamingJSONValidator(job.schema(group))
+        client.chat(job.payload(group), on_delta=validator)
+        return json_lib.loads(validator.close())
+
+    async def _chat_group_async(self, client: AsyncLLMClient, job: "_MultiJob", group: List[str]) -> Dict[str, str]:
+        validator = StreamingJSONValidator(job.schema(group))
+        await client.chat_async(job.payload(group), on_delta=validator)
+        return json_lib.loads(validator.close())
+
+    def _multi_done(self, job: "_MultiJob", start_time: float) -> Tuple[str, ...]:
+        elapsed = int((time.time() - start_time) * 1000)
+        print(f"[LLM Translator] {len(job.text)} chars -> {len(job.results)} languages ({elapsed}ms): "
+              f"{job.from_memory} from memory, {len(job.groups)} grouped request(s), "
+              f"{len(job.fallback_languages())} per-language")
+        return self._multi_result({"slots": job.slots, "results": job.results})
+
+    def _multi_result(self, outcome: Union[str, Dict[str, Any]]) -> Tuple[str, ...]:
+        if isinstance(outcome, str):
+            return (outcome,) * self.SLOTS + (json_lib.dumps({"error": outcome}, ensure_ascii=False),)
+        results = outcome["results"]
+        texts = [results.get(lang, "") if lang else "" for lang in outcome["slots"]]
+        return tuple(texts) + (json_lib.dumps(results, ensure_ascii=False),)
+
+
+class _MultiJob:
+    """Languages of one multi-target run, their request groups and results."""
+
+    def __init__(self, config: Dict[str, Any], text: str, slots: List[Optional[str]], glossary: str,
+                 formats: tuple):
+        self.config = config
+        self.model = config.get("model", "")
+        self.text = text
+        self.slots = slots
+        self.formats = formats
+        self.terms = compile_glossary(glossary)
+        self.guard = protect(text)
+        self.window = context_window(self.model)
+        self.plans: Dict[str, _Plan] = {}   # languages still to translate
+        self.results: Dict[str, str] = {}
+        self.groups: List[List[str]] = []
+        self.oversized: List[str] = []
+        self.failed: List[str] = []
+        self.from_memory = 0
+        self._lock = threading.Lock()
+
+    def build(self) -> None:
+        """Group the remaining languages by estimated output tokens."""
+        per_language = int(count_text(self.guard.text) * _OUTPUT_RATIO) + _JSON_OVERHEAD
+        budget = int(_MAX_TOKENS * _GROUP_BUDGET)
+        for lang in self.plans:
+            if per_language > budget:
+                self.oversized.append(lang)   # needs chunking: per-language path
+            elif self.groups and per_language * (len(self.groups[-1]) + 1) <= budget:
+                self.groups[-1].append(lang)
+            else:
+                self.groups.append([lang])
+
+    def schema(self, group: List[str]) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {lang: {"type": "string"} for lang in group},
+            "required": list(group),
+            "additionalProperties": False,
+        }
+
+    def payload(self, group: List[str]) -> Dict[str, Any]:
+        response_format, instruction = json_request("json_schema", self.schema(group), self.formats)
+        system = (
+            f"You are a professional translator. Translate the user's text into each of these languages: "
+            f"{', '.join(group)}. Maintain the original tone, style, and formatting. "
+            "Reply with a JSON object whose keys are exactly these language names and whose values are "
+            f"the translations.\n{instruction}"
+        )
+        if self.guard.spans:
+            system += _PLACEHOLDER_INSTRUCTION
+        if self.terms is not None:
+            lines = self.terms.lines(self.terms.matches(self.guard.text))
+            if lines:
+                system += "\n\nGlossary (Strictly follow):\n" + "\n".join(lines)
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": self.guard.text}
+        ]
+        messages, max_tokens, _ = fit_messages(messages, _MAX_TOKENS, self.window)
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.3,
+            "max_tokens": max_tokens
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+        return payload
+
+    def accept(self, group: List[str], document: Dict[str, str]) -> None:
+        with self._lock:
+            for lang in group:
+                translated = str(document[lang]).strip()
+                self.results[lang] = self.guard.restore(_outer(self.guard.text, translated))[0]
+                plan = self.plans.get(lang)
+                # One-segment texts (typical prompts) also go into the memory, in protected form
+                if plan.memory is not None and len(plan.jobs) == 1 \
+                        and len(plan.jobs[0].segments) == 1 \
+                        and plan.guards[plan.jobs[0].segments[0]].text.strip() == self.guard.text.strip():
+                    plan.absorb(plan.jobs, [[translated]])
+                    plan.finish()
+
+    def reject(self, group: List[str], e: Exception) -> None:
+        print(f"[LLM Translator] grouped request for {', '.join(group)} failed ({str(e)[:120]}), "
+              f"falling back to one request per language")
+        with self._lock:
+            self.failed.extend(group)
+
+    def fallback_languages(self) -> List[str]:
+        return self.oversized + self.failed
+
+
+def _response_formats(provider: str, llm_config: Optional[Dict[str, Any]]) -> tuple:
+    """Structured-output formats the provider accepts (same table as the adapter)."""
+    if llm_config is not None:
+        return supported_formats(llm_config.get("provider", "custom"))
+    record = get_registry().get_by_name(provider) or {}
+    return supported_formats(record.get("id", "custom"), record.get("responseFormats"))
+
+
+def _map_bounded(func: Callable[[Any], Any], items: List[Any], workers: int) -> List[Any]:
+    """func over items with at most `workers` threads, results in order."""
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items))),
+                            thread_name_prefix="llm_translate") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [f.result() for f in futures]
+
+
+async def _gather_bounded(func: Callable[[Any], Awaitable[Any]], items: List[Any], workers: int) -> List[Any]:
+    limit = asyncio.Semaphore(max(1, workers))
+
+    async def run(item: Any) -> Any:
+        async with limit:
+            return await func(item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
 
 
 # ComfyUI Node Registration
-NODE_CLASS_MAPPINGS = {"LLMTranslator": LLMTranslator}
-NODE_DISPLAY_NAME_MAPPINGS = {"LLMTranslator": "LLM Translator"}
+NODE_CLASS_MAPPINGS = {"LLMTranslator": LLMTranslator, "LLMMultiTranslator": LLMMultiTranslator}
+NODE_DISPLAY_NAME_MAPPINGS = {"LLMTranslator": "LLM Translator", "LLMMultiTranslator": "LLM Multi Translator"}
@@ -0,0 +1,312 @@
+"""
+ConversationMemory — bounded, thread-safe multi-turn history per node.
+
+Each session (one per node `unique_id`) keeps its messages in order with a
+digest multiset, so "have we already stored this message?" is an O(1) lookup
+instead of a scan comparing full contents (including image arrays).
+
+Images are identified by content hash and never stored: a stored message
+keeps a short text placeholder instead of the base64 data URL. An image is
+sent only on the turn that introduces it; later turns see the placeholder.
+
+Bounds:
+  - per session: estimated tokens (oldest non-system turns are dropped first)
+  - globally:    total estimated tokens and session count, evicting the
+                 least recently used sessions
+
+Optional compaction: once a session grows past a token threshold, older
+turns are summarized in the background into one synthetic system message
+while the most recent turns stay verbatim, keeping per-turn input roughly
+constant instead of growing until trimming silently drops context.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+try:
+    from .token_estimator import count_message
+except ImportError:
+    from token_estimator import count_message
+
+
+DEFAULT_SESSION_TOKENS = 8000
+DEFAULT_TOTAL_TOKENS = 200_000
+DEFAULT_MAX_SESSIONS = 256
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+IMAGE_PLACEHOLDER = "[Image {n} was provided earlier in the conversation and is not repeated]"
+
+# Summaries run off the request path, one at a time
+_COMPACTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm_memory_compact")
+
+
+def image_digest(url: Any) -> str:
+    """
+    Content hash of an image URL (the base64 payload for data URLs). Image
+    store handles already carry a digest of their encoded bytes.
+    """
+    digest = getattr(url, "digest", None)
+    if isinstance(digest, str):
+        return digest
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _compact(message: Dict[str, Any]):
+    """
+    Return (digest, stored_message, image_hashes) for a message.
+
+    The stored message has every image part replaced by a text placeholder,
+    so history never holds base64 blobs.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(message.get("role", "")).encode("utf-8"))
+    content = message.get("content", "")
+    if isinstance(content, str):
+        h.update(b"\x00s")
+        h.update(content.encode("utf-8"))
+        return h.hexdigest(), message, []
+
+    stored_parts: List[Dict[str, Any]] = []
+    image_hashes: List[str] = []
+    for part in content or []:
+        ptype = part.get("type", "")
+        h.update(b"\x00" + ptype.encode("utf-8") + b"\x00")
+        if ptype == "text":
+            h.update(part.get("text", "").encode("utf-8"))
+            stored_parts.append(part)
+        elif ptype == "image_url":
+            img_hash = image_digest(part.get("image_url", {}).get("url", ""))
+            h.update(img_hash.encode("ascii"))
+            image_hashes.append(img_hash)
+            stored_parts.append({"type": "text", "text": IMAGE_PLACEHOLDER.format(n=len(image_hashes))})
+        else:
+            h.update(repr(part).encode("utf-8"))
+            stored_parts.append(part)
+    stored = dict(message, content=stored_parts) if image_hashes else message
+    return h.hexdigest(), stored, image_hashes
+
+
+def message_digest(message: Dict[str, Any]) -> str:
+    """Stable identity of a chat message (role + text + image content hashes)."""
+    return _compact(message)[0]
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """Plain-text view of a message (images become a marker)."""
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        part.get("text", "") if part.get("type") == "text" else "[image]"
+        for part in content or []
+    )
+
+
+@dataclass(eq=False)
+class _Entry:
+    message: Dict[str, Any]
+    digest: str
+    tokens: int
+    summary: bool = False
+    images: List[str] = field(default_factory=list)
+
+    @property
+    def pinned(self) -> bool:
+        """System prompts survive trimming and compaction; summaries do not."""
+        return self.message.get("role") == "system" and not self.summary
+
+
+@dataclass
+class _Session:
+    entries: Deque[_Entry] = field(default_factory=deque)
+    digests: Dict[str, int] = field(default_factory=dict)
+    tokens: int = 0
+    compacting: bool = False
+
+    def add(self, entry: _Entry) -> None:
+        self.entries.append(entry)
+        self.digests[entry.digest] = self.digests.get(entry.digest, 0) + 1
+        self.tokens += entry.tokens
+
+    def remove(self, entry: _Entry) -> None:
+        self.entries.remove(entry)
+        self._forget(entry)
+
+    def _forget(self, entry: _Entry) -> None:
+        count = self.digests.get(entry.digest, 0) - 1
+        if count > 0:
+            self.digests[entry.digest] = count
+        else:
+            self.digests.pop(entry.digest, None)
+        self.tokens -= entry.tokens
+
+
+class ConversationMemory:
+    """Per-session chat history with O(1) dedupe, token budgets and LRU eviction."""
+
+    def __init__(
+        self,
+        session_tokens: int = DEFAULT_SESSION_TOKENS,
+        total_tokens: int = DEFAULT_TOTAL_TOKENS,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+    ):
+        self.session_tokens = session_tokens
+        self.total_tokens = total_tokens
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.RLock()
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def apply(self, session_id: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge new messages into the session (skipping known ones) and return
+        the history to send. Messages of the current turn keep their images;
+        older ones carry placeholders.
+        """
+        compacted = [(msg, _compact(msg)) for msg in messages]  # hash outside the lock
+        with self._lock:
+            session = self._touch(session_id)
+            current: Dict[str, Dict[str, Any]] = {}
+            for msg, (digest, stored, images) in compacted:
+                current[digest] = msg
+                if digest not in session.digests:
+                    self._add(session, _Entry(stored, digest, count_message(stored), images=images))
+            self._enforce_limits(session_id)
+            return [current.get(e.digest, e.message) for e in session.entries]
+
+    def append(self, session_id: str, message: Dict[str, Any]) -> None:
+        """Record a message unconditionally (e.g. the assistant's reply)."""
+        with self._lock:
+            session = self._touch(session_id)
+            digest, stored, images = _compact(message)
+            self._add(session, _Entry(stored, digest, count_message(stored), images=images))
+            self._enforce_limits(session_id)
+
+    def history(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return [e.message for e in session.entries] if session else []
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._total -= session.tokens
+
+    # ── Compaction ───────────────────────────────────────────────────────
+
+    def compact_async(
+        self,
+        session_id: str,
+        threshold: int,
+        keep_recent: int,
+        summarize: Callable[[List[Dict[str, Any]]], str],
+    ) -> bool:
+        """
+        If the session exceeds `threshold` tokens, summarize everything but
+        the pinned system prompt and the last `keep_recent` messages in the
+        background. Returns True when a compaction was scheduled.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.compacting or session.tokens <= threshold:
+                return False
+            movable = [e for e in session.entries if not e.pinned]
+            older = movable[:-keep_recent] if keep_recent > 0 else movable
+            if len(older) < 2:
+                return False
+            session.compacting = True
+
+        def run() -> None:
+            summary_text: Optional[str] = None
+            try:
+                summary_text = summarize([e.message for e in older])
+            except Exception as e:
+                print(f"[LLMs_Toolkit] Memory compaction failed for {session_id}: {e}")
+            finally:
+                self._finish_compaction(session_id, older, summary_text)
+
+        _COMPACTOR.submit(run)
+        return True
+
+    def _finish_compaction(self, session_id: str, older: List[_Entry],
+                           summary_text: Optional[str]) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.compacting = False
+            if not summary_text or not summary_text.strip():
+                return
+
+            # Entries may have been trimmed meanwhile; replace what is still there
+            present = {id(e) for e in session.entries}
+            still_there = [e for e in older if id(e) in present]
+            if not still_there:
+                return
+            position = list(session.entries).index(still_there[0])
+            before = session.tokens
+            for entry in still_there:
+                session.remove(entry)
+                self._total -= entry.tokens
+
+            message = {"role": "system", "content": SUMMARY_PREFIX + summary_text.strip()}
+            entry = _Entry(message, message_digest(message), count_message(message), summary=True)
+            session.entries.insert(position, entry)
+            session.digests[entry.digest] = session.digests.get(entry.digest, 0) + 1
+            session.tokens += entry.tokens
+            self._total += entry.tokens
+            print(f"[LLMs_Toolkit] Memory compacted {len(still_there)} messages for {session_id}: "
+                  f"{before} -> {session.tokens} tokens")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(s.entries) for s in self._sessions.values()),
+                "images": len({h for s in self._sessions.values() for e in s.entries for h in e.images}),
+                "tokens": self._total,
+            }
+
+    # ── Internals (caller holds the lock) ────────────────────────────────
+
+    def _touch(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _add(self, session: _Session, entry: _Entry) -> None:
+        session.add(entry)
+        self._total += entry.tokens
+
+    def _enforce_limits(self, session_id: str) -> None:
+        session = self._sessions[session_id]
+
+        # Per-session budget: drop the oldest non-system turns, keep the newest message
+        while session.tokens > self.session_tokens and len(session.entries) > 1:
+            victim = next((e for e in session.entries if not e.pinned), None)
+            if victim is None or victim is session.entries[-1]:
+                break
+            session.remove(victim)
+            self._total -= victim.tokens
+
+        # Global budget: evict least recently used sessions (never the active one)
+        while (self._total > self.total_tokens or len(self._sessions) > self.max_sessions) \
+                and len(self._sessions) > 1:
+            oldest_id = next(iter(self._sessions))
+            if oldest_id == session_id:
+                break
+            evicted = self._sessions.pop(oldest_id)
+            self._total -= evicted.tokens
+            print(f"[LLMs_Toolkit] Memory evicted idle session {oldest_id} ({evicted.tokens} tokens)")
@@ -1,45 +1,50 @@
 import time
 import re
 import json as json_lib
-import urllib.request
-import urllib.error
-import ssl
-import os
-import threading
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Dict, Any, List, Union, Optional
-import base64
-from io import BytesIO
-from PIL import Image
-import torch
 
 try:
     from .api_client import LLMClient, classify_error, log_error
+    from .tracing import span, traced
+    from .profiling import profile_node
+    from .memory_store import ConversationMemory, message_text
+    from .usage_log import get_writer as get_usage_writer
+    from .stream_preview import StreamPreview
+    from .image_store import IMAGE_REF_TYPE, ImageRef
+    from .provider_registry import get_registry
+    from .async_client import AsyncLLMClient, async_nodes_enabled
+    from .json_stream import JSONStreamError, StreamingJSONValidator, load_schema
+    from .response_format import json_request, supported_formats
+    from .token_estimator import ContextWindowError, count_text, fit_messages
+    from .token_estimator import context_window as model_context_window
 except ImportError:
     from api_client import LLMClient, classify_error, log_error
-
-
-# Load Providers from JSON config
-_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "config")
-_PROVIDERS_FILE = os.path.join(_CONFIG_DIR, "providers.json")
-
-_PROVIDER_CACHE = {"mtime": 0, "data": []}
-_USAGE_LOCK = threading.Lock()
-_USAGE_MAX_LINES = 5000
-
-def _get_providers() -> List[Dict[str, Any]]:
-    try:
-        if os.path.exists(_PROVIDERS_FILE):
-            mtime = os.path.getmtime(_PROVIDERS_FILE)
-            if mtime != _PROVIDER_CACHE["mtime"]:
-                with open(_PROVIDERS_FILE, "r", encoding="utf-8") as f:
-                    data = json_lib.load(f)
-                    providers = data.get("providers", [])
-                    _PROVIDER_CACHE["data"] = [p for p in providers if p.get("enabled", True)]
-                    _PROVIDER_CACHE["mtime"] = mtime
-            return _PROVIDER_CACHE["data"]
-    except Exception as e:
-        print(f"[LLMs_Toolkit] Failed to load providers.json: {e}")
-    return []
+    from tracing import span, traced
+    from profiling import profile_node
+    from memory_store import ConversationMemory, message_text
+    from usage_log import get_writer as get_usage_writer
+    from stream_preview import StreamPreview
+    from image_store import IMAGE_REF_TYPE, ImageRef
+    from provider_registry import get_registry
+    from async_client import AsyncLLMClient, async_nodes_enabled
+    from json_stream import JSONStreamError, StreamingJSONValidator, load_schema
+    from response_format import json_request, supported_formats
+    from token_estimator import ContextWindowError, count_text, fit_messages
+    from token_estimator import context_window as model_context_window
+
+
+# Memory compaction: recent messages kept verbatim, and the summarizer prompt
+_COMPACTION_KEEP_RECENT = 4
+_SUMMARY_INSTRUCTION = (
+    "Summarize the conversation below for your own future reference. "
+    "Keep facts, names, numbers, decisions, user preferences and open questions. "
+    "Be concise (at most 200 words). Output only the summary."
+)
 
 
 # ─── Message Building ────────────────────────────────────────────────────────
@@ -52,9 +57,14 @@ _STRING_CONTENT_PROVIDERS = frozenset({
 
 def _build_content(
     prompt: str,
-    image_url: Optional[Union[str, List[str]]] = None
+    image_url: Optional[Union[str, List[Union[str, ImageRef]]]] = None
 ) -> Union[str, List[Dict[str, Any]]]:
-    """Build user message content (multimodal or text-only)."""
+    """
+    Build user message content (multimodal or text-only).
+
+    ImageRef entries are kept as-is in the `url` field and materialized to a
+    data URL when LLMClient serializes the payload.
+    """
     # Fast path: no image → just return the string
     if not image_url:
         return prompt
@@ -64,7 +74,7 @@ def _build_content(
     # Normalize to list
     urls = image_url if isinstance(image_url, list) else [image_url]
     for url in urls:
-        if isinstance(url, str) and url.startswith("data:image"):
+        if isinstance(url, ImageRef) or (isinstance(url, str) and url.startswith("data:image")):
             content.append({
                 "type": "image_url",
                 "image_url": {"url": url}
@@ -99,6 +109,39 @@ def _build_messages(
     return messages
 
 
+@dataclass
+class _Generation:
+    """Outcome of one request; `error` holds the user-facing message on failure."""
+    text: str = ""
+    reasoning: str = ""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class _Call:
+    """A validated, fully built request plus what is needed to process its reply."""
+    payload: Dict[str, Any]
+    base_url: str
+    api_key: str
+    provider_name: str
+    model: str
+    prompt_tokens: int  # local estimate, used when the API reports no usage
+    start: float
+    stream: bool
+    enable_memory: bool
+    memory_compaction: bool
+    compaction_threshold: int
+    compaction_model: str
+    unique_id: str
+    json_schema: Optional[Dict[str, Any]] = None  # {} = any JSON, None = JSON mode off
+    json_retries: int = 0
+
+    def validator(self) -> Optional[StreamingJSONValidator]:
+        return StreamingJSONValidator(self.json_schema) if self.json_schema is not None else None
+
+
 # ─── ComfyUI Node ────────────────────────────────────────────────────────────
 
 class OpenAICompatibleLoader:
@@ -114,10 +157,8 @@ class OpenAICompatibleLoader:
 
     @classmethod
     def INPUT_TYPES(cls):
-        providers = _get_providers()
-        
         # Only include enabled providers in the dropdown
-        enabled_providers = [p for p in providers if p.get("enabled", True)]
+        enabled_providers = get_registry().providers(enabled_only=True)
         
         provider_names = [p['name'] for p in enabled_providers]
         provider_names.append("LLM_CONFIG (from input)")
@@ -139,9 +180,26 @@ class OpenAICompatibleLoader:
             "optional": {
                 "llm_config": ("LLM_CONFIG",),  # Keep for backward compatibility
                 "prep_img": ("STRING", {"default": "", "forceInput": True}),
+                "image_ref": (IMAGE_REF_TYPE,),
                 "temperature": ("FLOAT", {"default": 0.7, "min": 0.0, "max": 2.0}),
                 "max_tokens": ("INT", {"default": 2048, "min": 1, "max": 4096}),
+                "context_window": ("INT", {"default": 0, "min": 0, "max": 10_000_000, "step": 1024,
+                                           "tooltip": "Model context size in tokens (0 = look up the model; unknown models are not checked)"}),
                 "enable_memory": ("BOOLEAN", {"default": False, "label": "Enable Memory"}),
+                "memory_compaction": ("BOOLEAN", {"default": False, "label": "Compact Memory",
+                                                  "tooltip": "Summarize older turns once memory exceeds the threshold"}),
+                "compaction_threshold": ("INT", {"default": 3000, "min": 500, "max": 100000, "step": 100,
+                                                 "tooltip": "Estimated history tokens that trigger a summary"}),
+                "compaction_model": ("STRING", {"default": "",
+                                                "tooltip": "Cheap model used for summaries (empty = same model)"}),
+                "stream": ("BOOLEAN", {"default": False, "label": "Stream Preview",
+                                       "tooltip": "Show partial output on the node while tokens arrive"}),
+                "response_format": (["text", "json_object", "json_schema"], {"default": "text",
+                                    "tooltip": "JSON modes validate the output while it streams and retry as soon as it goes wrong"}),
+                "json_schema": ("STRING", {"default": "", "multiline": True,
+                                           "tooltip": "JSON schema for the reply (used by both JSON modes)"}),
+                "json_retries": ("INT", {"default": 2, "min": 0, "max": 5,
+                                         "tooltip": "Extra attempts when the output stops being valid JSON"}),
                 "seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff})
             },
             "hidden": {"unique_id": "UNIQUE_ID"}
@@ -149,10 +207,11 @@ class OpenAICompatibleLoader:
 
     RETURN_TYPES = ("STRING", "STRING")
     RETURN_NAMES = ("response", "reasoning")
-    FUNCTION = "generate"
+    # Coroutine entry point where ComfyUI supports it, so network waits overlap
+    FUNCTION = "generate_async" if async_nodes_enabled() else "generate"
     CATEGORY = "🚦ComfyUI_LLMs_Toolkit/LLM"
 
-    _MEMORY_STORE = {}
+    _MEMORY_STORE = ConversationMemory()
 
     # ── Logging ──────────────────────────────────────────────────────────
 
@@ -190,9 +249,8 @@ class OpenAICompatibleLoader:
     @staticmethod
     def _log_usage(provider_name: str, model: str, in_tok: int, out_tok: int,
                    start: float, status: str = "ok") -> None:
-        """Append usage stats to config/usage.jsonl (thread-safe, auto-rotated)."""
+        """Queue usage stats for config/usage.jsonl (written and rotated in the background)."""
         try:
-            usage_file = os.path.join(_CONFIG_DIR, "usage.jsonl")
             elapsed_ms = int((time.time() - start) * 1000)
             record = {
                 "timestamp": int(time.time()),
@@ -204,24 +262,7 @@ class OpenAICompatibleLoader:
                 "elapsed_ms": elapsed_ms,
                 "status": status
             }
-            line = json_lib.dumps(record, ensure_ascii=False) + "\n"
-
-            with _USAGE_LOCK:
-                # Auto-rotate: if file exceeds max lines, keep the last half
-                if os.path.exists(usage_file):
-                    try:
-                        with open(usage_file, "r", encoding="utf-8") as f:
-                            lines = f.readlines()
-                        if len(lines) >= _USAGE_MAX_LINES:
-                            keep = lines[len(lines) // 2:]
-                            with open(usage_file, "w", encoding="utf-8") as f:
-                                f.writelines(keep)
-                            print(f"[LLMs_Toolkit] Usage log rotated: {len(lines)} -> {len(keep)} entries")
-                    except Exception:
-                        pass  # rotation failure is non-critical
-
-                with open(usage_file, "a", encoding="utf-8") as f:
-                    f.write(line)
+            get_usage_writer().write(record)
         except Exception as e:
             print(f"[LLMs_Toolkit] Failed to write usage log: {e}")
 
@@ -232,25 +273,30 @@ class OpenAICompatibleLoader:
     ) -> List[Dict[str, Any]]:
         """Manage conversation history per node instance."""
         if not enable:
-            if unique_id in self._MEMORY_STORE:
-                del self._MEMORY_STORE[unique_id]
+            self._MEMORY_STORE.clear(unique_id)
             return messages
 
-        history = self._MEMORY_STORE.setdefault(unique_id, [])
+        return self._MEMORY_STORE.apply(unique_id, messages)
 
-        for msg in messages:
-            if not any(
-                h["role"] == msg["role"] and h["content"] == msg["content"]
-                for h in history
-            ):
-                history.append(msg)
-                
-        # Limit history to prevent unbounded growth
-        if len(history) > 40:
-            history = history[-40:]
-            self._MEMORY_STORE[unique_id] = history
-
-        return list(history)
+    @staticmethod
+    def _make_summarizer(base_url: str, api_key: str, model: str):
+        """Build the background summarizer used for memory compaction."""
+        def summarize(messages: List[Dict[str, Any]]) -> str:
+            transcript = "\n".join(
+                f"{m.get('role', 'user').capitalize()}: {message_text(m)}" for m in messages
+            )
+            payload = {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": _SUMMARY_INSTRUCTION},
+                    {"role": "user", "content": transcript},
+                ],
+                "temperature": 0.2,
+                "max_tokens": 512,
+            }
+            text, _ = LLMClient(base_url, api_key, max_retries=1, timeout=60).chat(payload)
+            return text
+        return summarize
 
     # ── Result helpers ───────────────────────────────────────────────────
 
@@ -274,17 +320,14 @@ class OpenAICompatibleLoader:
         }
 
     def _get_provider_config(self, provider_choice: str) -> Optional[Dict[str, Any]]:
-        """Find the provider config by its dropdown label."""
-            
-        providers = _get_providers()
-        for p in providers:
-            label = p['name']
-            if label == provider_choice:
-                return p
-        return None
+        """Find the enabled provider config by its dropdown label."""
+        p = get_registry().get_by_name(provider_choice)
+        return p if p is not None and p.get("enabled", True) else None
 
     # ── Main entry ───────────────────────────────────────────────────────
 
+    @traced("OpenAICompatibleLoader.generate")
+    @profile_node
     def generate(
         self,
         provider: str = "",
@@ -294,12 +337,140 @@ class OpenAICompatibleLoader:
         llm_config: Optional[Dict[str, Any]] = None,
         temperature: float = 0.7,
         max_tokens: int = 2048,
+        context_window: int = 0,
         prep_img: Optional[str] = None,
+        image_ref: Optional[List[ImageRef]] = None,
         enable_memory: bool = False,
+        memory_compaction: bool = False,
+        compaction_threshold: int = 3000,
+        compaction_model: str = "",
+        stream: bool = False,
+        response_format: str = "text",
+        json_schema: str = "",
+        json_retries: int = 2,
         seed: int = 0,
         unique_id: str = ""
     ) -> dict:
         """Main generation entry point with graceful degradation."""
+        gen = self._run(
+            provider=provider, model=model, prompt=prompt, system_prompt=system_prompt,
+            llm_config=llm_config, temperature=temperature, max_tokens=max_tokens,
+            context_window=context_window,
+            prep_img=prep_img, image_ref=image_ref, enable_memory=enable_memory,
+            memory_compaction=memory_compaction, compaction_threshold=compaction_threshold,
+            compaction_model=compaction_model, stream=stream, response_format=response_format,
+            json_schema=json_schema, json_retries=json_retries, unique_id=unique_id,
+        )
+        if gen.error is not None:
+            return self._error_result(gen.error)
+        return self._success(gen.text, gen.reasoning, gen.input_tokens, gen.output_tokens)
+
+    @traced("OpenAICompatibleLoader.generate")
+    @profile_node
+    async def generate_async(
+        self,
+        provider: str = "",
+        model: str = "",
+        prompt: str = "",
+        system_prompt: Optional[str] = None,
+        llm_config: Optional[Dict[str, Any]] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        context_window: int = 0,
+        prep_img: Optional[str] = None,
+        image_ref: Optional[List[ImageRef]] = None,
+        enable_memory: bool = False,
+        memory_compaction: bool = False,
+        compaction_threshold: int = 3000,
+        compaction_model: str = "",
+        stream: bool = False,
+        response_format: str = "text",
+        json_schema: str = "",
+        json_retries: int = 2,
+        seed: int = 0,
+        unique_id: str = ""
+    ) -> dict:
+        """Coroutine variant of `generate` using the aiohttp transport."""
+        gen = await self._run_async(
+            provider=provider, model=model, prompt=prompt, system_prompt=system_prompt,
+            llm_config=llm_config, temperature=temperature, max_tokens=max_tokens,
+            context_window=context_window,
+            prep_img=prep_img, image_ref=image_ref, enable_memory=enable_memory,
+            memory_compaction=memory_compaction, compaction_threshold=compaction_threshold,
+            compaction_model=compaction_model, stream=stream, response_format=response_format,
+            json_schema=json_schema, json_retries=json_retries, unique_id=unique_id,
+        )
+        if gen.error is not None:
+            return self._error_result(gen.error)
+        return self._success(gen.text, gen.reasoning, gen.input_tokens, gen.output_tokens)
+
+    # ── Request pipeline (shared by the sync and async paths) ────────────
+
+    def _run(self, **kwargs) -> _Generation:
+        """Run one request end to end; errors come back in `_Generation.error`."""
+        call = self._prepare(**kwargs)
+        if isinstance(call, _Generation):
+            return call
+        client = LLMClient(call.base_url, call.api_key)
+        for attempt in range(call.json_retries + 1):
+            validator = call.validator()
+            try:
+                with self._sending(call, client, validator) as on_delta:
+                    response_content, data = client.chat(call.payload, on_delta=on_delta)
+                document = validator.close() if validator is not None else None
+                return self._complete(call, response_content, data, document)
+            except JSONStreamError as e:
+                if attempt < call.json_retries:
+                    self._log_json_retry(e, attempt, call.json_retries)
+                    continue
+                return self._failed(call, client, e)
+            except Exception as e:
+                return self._failed(call, client, e)
+
+    async def _run_async(self, **kwargs) -> _Generation:
+        """Awaitable `_run`: building the request runs in a worker thread, the HTTP call on the loop."""
+        call = await asyncio.to_thread(self._prepare, **kwargs)
+        if isinstance(call, _Generation):
+            return call
+        client = AsyncLLMClient(call.base_url, call.api_key)
+        for attempt in range(call.json_retries + 1):
+            validator = call.validator()
+            try:
+                with self._sending(call, client, validator) as on_delta:
+                    response_content, data = await client.chat_async(call.payload, on_delta=on_delta)
+                document = validator.close() if validator is not None else None
+                return self._complete(call, response_content, data, document)
+            except JSONStreamError as e:
+                if attempt < call.json_retries:
+                    self._log_json_retry(e, attempt, call.json_retries)
+                    continue
+                return self._failed(call, client, e)
+            except Exception as e:
+                return self._failed(call, client, e)
+
+    def _prepare(
+        self,
+        provider: str = "",
+        model: str = "",
+        prompt: str = "",
+        system_prompt: Optional[str] = None,
+        llm_config: Optional[Dict[str, Any]] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        context_window: int = 0,
+        prep_img: Optional[str] = None,
+        image_ref: Optional[List[ImageRef]] = None,
+        enable_memory: bool = False,
+        memory_compaction: bool = False,
+        compaction_threshold: int = 3000,
+        compaction_model: str = "",
+        stream: bool = False,
+        response_format: str = "text",
+        json_schema: str = "",
+        json_retries: int = 2,
+        unique_id: str = ""
+    ) -> Union[_Call, _Generation]:
+        """Resolve config, validate and build the payload; a `_Generation` means a validation error."""
 
         # ── Configuration Resolution ──────────────────────────────────
         _FROM_INPUT = "LLM_CONFIG (from input)"
@@ -309,14 +480,15 @@ class OpenAICompatibleLoader:
         actual_model = "" if model in ("Custom Input", "Custom/手动输入", _FROM_INPUT, "") else model
         provider_id = "custom"
         provider_name = "Custom Endpoint"
+        p_config = None
 
         if provider == _FROM_INPUT:
             # Mode 1: All config comes from LLM_CONFIG input node
             if not llm_config:
-                return self._error_result(
+                return _Generation(error=(
                     'Provider is set to "LLM_CONFIG (from input)" but no LLM_CONFIG node is connected. '
                     'Please connect a LLMs Loader node or select a different provider.'
-                )
+                ))
             api_key = llm_config.get("api_key", "")
             base_url = llm_config.get("base_url", "")
             actual_model = llm_config.get("model", "") or actual_model
@@ -333,32 +505,46 @@ class OpenAICompatibleLoader:
 
         # ── Input validation (fail fast, don't waste API quota) ──────
         if not prompt or not prompt.strip():
-            return self._error_result("Prompt is empty. Please enter content to generate.")
+            return _Generation(error="Prompt is empty. Please enter content to generate.")
         if not api_key or not api_key.strip():
-            return self._error_result(
+            return _Generation(error=(
                 "API Key is missing. Please configure it in the [⚙️ LLMs] settings "
                 "or provide a Custom API Key."
-            )
+            ))
         if not base_url or not base_url.strip():
-            return self._error_result(
-                "Base URL is missing. Please configure it in the settings."
-            )
+            return _Generation(error="Base URL is missing. Please configure it in the settings.")
         if not actual_model or not actual_model.strip():
-            return self._error_result(
-                "No Model selected. Please select a model or provide a Custom Model."
-            )
+            return _Generation(error="No Model selected. Please select a model or provide a Custom Model.")
+
+        # ── Structured output ────────────────────────────────────────
+        schema = None
+        format_field = None
+        if response_format in ("json_object", "json_schema"):
+            try:
+                schema = load_schema(json_schema) or {}
+            except ValueError as e:
+                return _Generation(error=str(e))
+            if response_format == "json_schema" and not schema:
+                return _Generation(error='response_format is "json_schema" but the json_schema input is empty.')
+            supported = supported_formats(provider_id, (p_config or {}).get("responseFormats"))
+            format_field, instruction = json_request(response_format, schema, supported)
+            system_prompt = f"{system_prompt}\n\n{instruction}" if system_prompt else instruction
 
         # ── Parse image input ────────────────────────────────────────
         image_input = None
         if prep_img and prep_img.strip():
-            stripped = prep_img.strip()
-            if stripped.startswith("["):
-                try:
-                    image_input = json_lib.loads(stripped)
-                except Exception:
+            with span("prep_img.parse", chars=len(prep_img)):
+                stripped = prep_img.strip()
+                if stripped.startswith("["):
+                    try:
+                        image_input = json_lib.loads(stripped)
+                    except Exception:
+                        image_input = stripped
+                else:
                     image_input = stripped
-            else:
-                image_input = stripped
+        if image_ref:
+            urls = image_input if isinstance(image_input, list) else ([image_input] if image_input else [])
+            image_input = urls + list(image_ref)
 
         # ── Logging ──────────────────────────────────────────────────
         print(f"{self.TAG} Using config: {provider_name} / {actual_model}")
@@ -367,9 +553,10 @@ class OpenAICompatibleLoader:
         )
 
         # ── Build messages ───────────────────────────────────────────
-        content = _build_content(prompt, image_input)
-        messages = _build_messages(content, system_prompt, provider_name)
-        messages = self._apply_memory(messages, enable_memory, unique_id)
+        with span("messages.build", memory=enable_memory):
+            content = _build_content(prompt, image_input)
+            messages = _build_messages(content, system_prompt, provider_name)
+            messages = self._apply_memory(messages, enable_memory, unique_id)
 
         # ── o1/o3 System Role Downgrade (Compatibility) ──────────────
         if re.search(r'\bo[1-3](?:-mini|-preview)?\b', actual_model):
@@ -379,6 +566,15 @@ class OpenAICompatibleLoader:
                     messages.insert(i + 1, {"role": "assistant", "content": "Understood, I will follow your instructions."})
                     break
 
+        # ── Context window: trim history / clamp max_tokens before upload ──
+        window = context_window or model_context_window(actual_model)
+        with span("context.fit", window=window or 0) as fit_span:
+            try:
+                messages, max_tokens, prompt_tokens = fit_messages(messages, max_tokens, window)
+            except ContextWindowError as e:
+                return _Generation(error=str(e))
+            fit_span.set(prompt_tokens=prompt_tokens, max_tokens=max_tokens)
+
         # ── Build payload (clean, standard fields) ────────────
         payload = {
             "model": actual_model,
@@ -386,63 +582,235 @@ class OpenAICompatibleLoader:
             "temperature": temperature,
             "max_tokens": max_tokens,
         }
+        if format_field:
+            payload["response_format"] = format_field
         
         # Seed enables ComfyUI to bypass cache when changed (e.g., set to 'random')
         # However, we DO NOT inject it into the API payload to comply with CONTRIBUTING.md
         # and prevent 400 Bad Request errors from strict APIs (like qwen3).
 
-        # Calculate request size for diagnostics
-        payload_bytes = json_lib.dumps(payload).encode("utf-8")
-        request_size_mb = len(payload_bytes) / (1024 * 1024)
+        return _Call(
+            payload=payload, base_url=base_url, api_key=api_key,
+            provider_name=provider_name, model=actual_model, prompt_tokens=prompt_tokens, start=start,
+            stream=stream, enable_memory=enable_memory, memory_compaction=memory_compaction,
+            compaction_threshold=compaction_threshold, compaction_model=compaction_model,
+            unique_id=unique_id, json_schema=schema, json_retries=json_retries,
+        )
 
-        # ── Make API call ────────────────────────────────────────────
-        try:
-            client = LLMClient(base_url, api_key)
-            response_content, data = client.chat(payload)
-
-            # Extract reasoning content (DeepSeek/R1)
-            reasoning_content = ""
-            if "choices" in data and len(data["choices"]) > 0:
-                msg_dict = data["choices"][0].get("message", {})
-                if "reasoning_content" in msg_dict and msg_dict["reasoning_content"]:
-                    reasoning_content = msg_dict["reasoning_content"]
-
-            # Fallback: Extract <think> tags from text if no native field
-            if not reasoning_content:
+    @staticmethod
+    @contextmanager
+    def _sending(call: _Call, client: LLMClient,
+                 validator: Optional[StreamingJSONValidator] = None):
+        """
+        Span around the API call; yields the `on_delta` callback (or None):
+        the stream preview and/or the JSON validator, which makes the request
+        stream even without a preview. The client serializes the payload once
+        (materializing image refs), so its size is reported afterwards.
+        """
+        preview = StreamPreview.create(call.unique_id) if call.stream else None
+        sinks = [s for s in (preview, validator) if s is not None]
+        if len(sinks) > 1:
+            def on_delta(text: str, reasoning: str = "") -> None:
+                for sink in sinks:
+                    sink(text, reasoning)
+        else:
+            on_delta = sinks[0] if sinks else None
+        with span("llm.chat", provider=call.provider_name, model=call.model,
+                  stream=on_delta is not None, json=validator is not None) as chat_span:
+            try:
+                yield on_delta
+            finally:
+                if preview is not None:
+                    preview.close()
+                chat_span.set(payload_mb=round(client.payload_bytes / (1024 * 1024), 3))
+
+    def _complete(self, call: _Call, response_content: str, data: Dict[str, Any],
+                  document: Optional[str] = None) -> _Generation:
+        """
+        Post-process a successful reply: reasoning, usage, logging and memory.
+        In JSON mode `document` is the validated JSON, which replaces the text
+        (dropping any code fence around it).
+        """
+        # Extract reasoning content (DeepSeek/R1)
+        reasoning_content = ""
+        if "choices" in data and len(data["choices"]) > 0:
+            msg_dict = data["choices"][0].get("message", {})
+            if "reasoning_content" in msg_dict and msg_dict["reasoning_content"]:
+                reasoning_content = msg_dict["reasoning_content"]
+
+        # Fallback: Extract <think> tags from text if no native field
+        if not reasoning_content:
+            with span("postprocess.think", chars=len(response_content)):
                 pattern = r'<think>(.*?)</think>'
                 match = re.search(pattern, response_content, re.DOTALL)
                 if match:
                     reasoning_content = match.group(1).strip()
                     response_content = response_content.replace(match.group(0), "").strip()
 
-            if reasoning_content:
-                print(f"[LLMs_Toolkit] 🧠 Reasoning content captured ({len(reasoning_content)} chars): \n{reasoning_content[:150]}...\n")
+        if document is not None:
+            response_content = document
+
+        if reasoning_content:
+            print(f"[LLMs_Toolkit] 🧠 Reasoning content captured ({len(reasoning_content)} chars): \n{reasoning_content[:150]}...\n")
+
+        # Extract real token usage from API response (prefer actual over estimate)
+        usage = data.get("usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0) or call.prompt_tokens
+        output_tokens = usage.get("completion_tokens", 0) or \
+            count_text(response_content) + count_text(reasoning_content)
+
+        self._log_done(response_content, input_tokens, output_tokens, call.start)
+        self._log_usage(call.provider_name, call.model, input_tokens, output_tokens, call.start)
+
+        # Save assistant response to memory if enabled
+        if call.enable_memory and call.unique_id:
+            self._MEMORY_STORE.append(call.unique_id, {"role": "assistant", "content": response_content})
+            if call.memory_compaction:
+                self._MEMORY_STORE.compact_async(
+                    call.unique_id, call.compaction_threshold, _COMPACTION_KEEP_RECENT,
+                    self._make_summarizer(call.base_url, call.api_key,
+                                          call.compaction_model.strip() or call.model),
+                )
 
-            # Extract real token usage from API response (prefer actual over estimate)
-            usage = data.get("usage", {})
-            input_tokens = usage.get("prompt_tokens", 0) or len(prompt)
-            output_tokens = usage.get("completion_tokens", 0)
+        return _Generation(response_content, reasoning_content, input_tokens, output_tokens)
 
-            self._log_done(response_content, input_tokens, output_tokens, start)
-            self._log_usage(provider_name, actual_model, input_tokens, output_tokens, start)
-            
-            # Save assistant response to memory if enabled
-            if enable_memory and unique_id:
-                history = self._MEMORY_STORE.get(unique_id, [])
-                history.append({"role": "assistant", "content": response_content})
-                
-            return self._success(response_content, reasoning_content, input_tokens, output_tokens)
+    def _log_json_retry(self, e: JSONStreamError, attempt: int, retries: int) -> None:
+        print(f"{self.TAG} Aborted invalid JSON output ({e.reason}, char {e.position}). "
+              f"Retrying {attempt + 1}/{retries}...")
 
-        except Exception as e:
-            elapsed_ms = int((time.time() - start) * 1000)
-            err = classify_error(e, provider_name, actual_model, request_size_mb, elapsed_ms)
-            log_error(err, provider_name, actual_model, request_size_mb, elapsed_ms)
-            self._log_usage(provider_name, actual_model, 0, 0, start, status="error")
+    def _failed(self, call: _Call, client: LLMClient, e: Exception) -> _Generation:
+        elapsed_ms = int((time.time() - call.start) * 1000)
+        request_size_mb = client.payload_bytes / (1024 * 1024)
+        err = classify_error(e, call.provider_name, call.model, request_size_mb, elapsed_ms)
+        log_error(err, call.provider_name, call.model, request_size_mb, elapsed_ms)
+        self._log_usage(call.provider_name, call.model, 0, 0, call.start, status="error")
+
+        # Graceful degradation: return error text instead of crashing
+        return _Generation(error=err.user_message())
+
+
+class OpenAICompatibleBatch(OpenAICompatibleLoader):
+    """
+    Batch variant of the adapter: list inputs run as concurrent requests.
+
+    Every input arrives as a list. The batch is as long as the longest of
+    `prompt` / `prep_img` / `image_ref`; shorter lists (including single
+    widget values) are cycled to that length. Outputs keep input order, and
+    a failed item yields the usual "[Error] ..." text instead of failing the
+    whole batch.
+    """
+
+    _BATCH_FIELDS = ("llm_config", "prep_img", "image_ref", "temperature", "max_tokens",
+                     "context_window", "response_format", "json_schema", "json_retries")
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        base = super().INPUT_TYPES()
+        optional = {k: v for k, v in base["optional"].items() if k in cls._BATCH_FIELDS}
+        optional["concurrency"] = ("INT", {"default": 4, "min": 1, "max": 32,
+                                           "tooltip": "Maximum number of requests in flight"})
+        optional["seed"] = base["optional"]["seed"]
+        return {"required": base["required"], "optional": optional, "hidden": base["hidden"]}
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("responses", "reasonings")
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = "generate_batch"
+
+    @traced("OpenAICompatibleBatch.generate_batch")
+    @profile_node
+    def generate_batch(
+        self,
+        provider: List[str],
+        model: List[str],
+        prompt: List[str],
+        system_prompt: Optional[List[str]] = None,
+        llm_config: Optional[List[Dict[str, Any]]] = None,
+        temperature: Optional[List[float]] = None,
+        max_tokens: Optional[List[int]] = None,
+        context_window: Optional[List[int]] = None,
+        prep_img: Optional[List[str]] = None,
+        image_ref: Optional[List[List[ImageRef]]] = None,
+        response_format: Optional[List[str]] = None,
+        json_schema: Optional[List[str]] = None,
+        json_retries: Optional[List[int]] = None,
+        concurrency: Optional[List[int]] = None,
+        seed: Optional[List[int]] = None,
+        unique_id: Optional[List[str]] = None
+    ) -> dict:
+        """Run every prompt concurrently and return results in input order."""
+        prompts = prompt or []
+        images = prep_img or []
+        refs = image_ref or []
+        n = max(len(prompts), len(images), len(refs))
+        if n == 0:
+            return {"ui": {"text": ["⚠ Error:\nNo prompts to run."]}, "result": ([], [])}
+
+        def pick(values, i, default):
+            return values[i % len(values)] if values else default
+
+        jobs = [
+            dict(
+                provider=pick(provider, i, ""),
+                model=pick(model, i, ""),
+                prompt=pick(prompts, i, ""),
+                system_prompt=pick(system_prompt, i, None),
+                llm_config=pick(llm_config, i, None),
+                temperature=pick(temperature, i, 0.7),
+                max_tokens=pick(max_tokens, i, 2048),
+                context_window=pick(context_window, i, 0),
+                prep_img=pick(images, i, None),
+                image_ref=pick(refs, i, None),
+                response_format=pick(response_format, i, "text"),
+                json_schema=pick(json_schema, i, ""),
+                json_retries=pick(json_retries, i, 2),
+            )
+            for i in range(n)
+        ]
+
+        def run_one(index: int, job: Dict[str, Any]) -> _Generation:
+            with span("batch.item", index=index):
+                try:
+                    return self._run(**job)
+                except Exception as e:  # never let one item sink the batch
+                    return _Generation(error=f"{type(e).__name__}: {e}")
+
+        workers = max(1, min(int(pick(concurrency, 0, 4)), n))
+        print(f"{self.TAG} Batch: {n} requests, concurrency {workers}")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm_batch") as pool:
+            # Each task gets its own context copy so trace spans nest under this node
+            futures = [pool.submit(contextvars.copy_context().run, run_one, i, job)
+                       for i, job in enumerate(jobs)]
+            results = [f.result() for f in futures]
+
+        return self._batch_result(results)
+
+    @staticmethod
+    def _batch_result(results: List[_Generation]) -> dict:
+        in_tok = sum(r.input_tokens for r in results)
+        out_tok = sum(r.output_tokens for r in results)
+        failed = [(i, r.error) for i, r in enumerate(results) if r.error is not None]
+
+        lines = [f"Token Usage:\nInput: {in_tok}\nOutput: {out_tok}",
+                 f"Items: {len(results)} ({len(failed)} failed)"]
+        if failed:
+            lines.append("⚠ Errors:")
+            lines.extend(f"#{i + 1}: {msg.splitlines()[0][:80]}" for i, msg in failed[:5])
+            if len(failed) > 5:
+                lines.append(f"... and {len(failed) - 5} more")
 
-            # Graceful degradation: return error text instead of crashing
-            return self._error_result(err.user_message())
+        texts = [f"[Error] {r.error}" if r.error is not None else r.text for r in results]
+        reasonings = ["" if r.error is not None else r.reasoning for r in results]
+        return {"ui": {"text": ["\n".join(lines)]}, "result": (texts, reasonings)}
 
 
 # ComfyUI node registration
-NODE_CLASS_MAPPINGS = {"OpenAICompatibleLoader": OpenAICompatibleLoader}
-NODE_DISPLAY_NAME_MAPPINGS = {"OpenAICompatibleLoader": "OpenAI Compatible Adapter"}
+NODE_CLASS_MAPPINGS = {
+    "OpenAICompatibleLoader": OpenAICompatibleLoader,
+    "OpenAICompatibleBatch": OpenAICompatibleBatch,
+}
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "OpenAICompatibleLoader": "OpenAI Compatible Adapter",
+    "OpenAICompatibleBatch": "OpenAI Compatible Batch",
+}
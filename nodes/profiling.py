@@ -0,0 +1,242 @@
+"""
+Profiling — opt-in cProfile + tracemalloc hooks for node execution.
+
+Enable per node type, without patching code:
+  - env:      LLM_TOOLKIT_PROFILE=ImagePrep,JSONFixer   (or "*" for all nodes)
+  - settings: POST /llm_toolkit/profiling {"nodes": ["ImagePrep"]}
+              (persisted to config/profiling.json)
+
+Each profiled execution writes, under config/profiles/<NodeType>/:
+  - <stamp>.prof  pstats-compatible CPU profile (snakeviz, `python -m pstats`)
+  - <stamp>.json  wall time, peak traced memory and top allocation sites
+
+GET /llm_toolkit/profiling/summary aggregates the stored profiles into the
+top CPU hotspots and peak allocations per node type.
+"""
+
+import os
+import io
+import json
+import time
+import glob
+import pstats
+import cProfile
+import threading
+import inspect
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "config")
+PROFILE_DIR = os.path.join(_CONFIG_DIR, "profiles")
+_SETTINGS_FILE = os.path.join(_CONFIG_DIR, "profiling.json")
+
+_KEEP_PER_NODE = 20      # stored executions per node type
+_TOP_N = 15
+
+# cProfile and tracemalloc are process-global: profile one execution at a time
+_PROFILE_LOCK = threading.Lock()
+
+
+def _parse_nodes(value: str) -> set:
+    return {n.strip() for n in value.split(",") if n.strip()}
+
+
+def _load_settings() -> set:
+    try:
+        if os.path.exists(_SETTINGS_FILE):
+            with open(_SETTINGS_FILE, "r", encoding="utf-8") as f:
+                return set(json.load(f).get("nodes", []))
+    except Exception as e:
+        print(f"[LLMs_Toolkit] Failed to load profiling.json: {e}")
+    return set()
+
+
+_ENV_NODES = _parse_nodes(os.environ.get("LLM_TOOLKIT_PROFILE", ""))
+_enabled_nodes = _ENV_NODES | _load_settings()
+
+
+def is_enabled(node_type: str) -> bool:
+    return bool(_enabled_nodes) and ("*" in _enabled_nodes or node_type in _enabled_nodes)
+
+
+def enabled_nodes() -> List[str]:
+    return sorted(_enabled_nodes)
+
+
+def set_enabled_nodes(nodes: Iterable[str]) -> List[str]:
+    """Replace the settings toggle (env-enabled nodes always stay on) and persist it."""
+    global _enabled_nodes
+    selected = {str(n).strip() for n in nodes if str(n).strip()}
+    os.makedirs(_CONFIG_DIR, exist_ok=True)
+    with open(_SETTINGS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"nodes": sorted(selected)}, f, indent=2, ensure_ascii=False)
+    _enabled_nodes = _ENV_NODES | selected
+    return enabled_nodes()
+
+
+# ─── Decorator ───────────────────────────────────────────────────────────────
+
+def profile_node(func):
+    """
+    Wrap a node FUNCTION with cProfile + tracemalloc when profiling is enabled
+    for the node's class. Costs one set lookup otherwise.
+
+    Coroutine functions are supported; their profile also contains whatever
+    else the event loop ran while the node was awaiting.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            node_type = type(self).__name__
+            if not is_enabled(node_type) or not _PROFILE_LOCK.acquire(blocking=False):
+                return await func(self, *args, **kwargs)
+            try:
+                with _profiled(node_type, func.__name__):
+                    return await func(self, *args, **kwargs)
+            finally:
+                _PROFILE_LOCK.release()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        node_type = type(self).__name__
+        if not is_enabled(node_type) or not _PROFILE_LOCK.acquire(blocking=False):
+            return func(self, *args, **kwargs)
+        try:
+            with _profiled(node_type, func.__name__):
+                return func(self, *args, **kwargs)
+        finally:
+            _PROFILE_LOCK.release()
+    return wrapper
+
+
+@contextmanager
+def _profiled(node_type: str, func_name: str):
+    owns_tracemalloc = not tracemalloc.is_tracing()
+    if owns_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    base_current, _ = tracemalloc.get_traced_memory()
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+    finally:
+        wall_ms = (time.perf_counter() - start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        if owns_tracemalloc:
+            tracemalloc.stop()
+        try:
+            _write_profile(node_type, func_name, profiler, wall_ms,
+                           peak - base_current, before, after)
+        except Exception as e:
+            print(f"[LLMs_Toolkit] Failed to write profile for {node_type}: {e}")
+
+
+def _write_profile(node_type: str, func_name: str, profiler: cProfile.Profile,
+                   wall_ms: float, peak_bytes: int,
+                   before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> None:
+    node_dir = os.path.join(PROFILE_DIR, node_type)
+    os.makedirs(node_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+    base = os.path.join(node_dir, stamp)
+
+    profiler.dump_stats(base + ".prof")
+
+    skip = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    growth = after.filter_traces(skip).compare_to(before.filter_traces(skip), "lineno")
+    top_alloc = [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count_diff,
+        }
+        for stat in growth[:_TOP_N] if stat.size_diff > 0
+    ]
+
+    summary = {
+        "node": node_type,
+        "function": func_name,
+        "timestamp": int(time.time()),
+        "wall_ms": round(wall_ms, 1),
+        "peak_kb": round(peak_bytes / 1024, 1),
+        "top_cpu": _top_functions(pstats.Stats(profiler), _TOP_N),
+        "top_alloc": top_alloc,
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"[LLMs_Toolkit] profiled {node_type}.{func_name}: {wall_ms:.0f}ms, "
+          f"peak {peak_bytes / 1024 / 1024:.1f}MB → {base}.prof")
+    _prune(node_dir)
+
+
+def _prune(node_dir: str) -> None:
+    stamps = sorted({os.path.splitext(p)[0] for p in glob.glob(os.path.join(node_dir, "*.prof"))})
+    for old in stamps[:-_KEEP_PER_NODE]:
+        for ext in (".prof", ".json"):
+            try:
+                os.remove(old + ext)
+            except OSError:
+                pass
+
+
+def _top_functions(stats: pstats.Stats, limit: int) -> List[Dict[str, Any]]:
+    """Flatten pstats into the top entries by own (tottime) CPU time."""
+    rows = []
+    for (filename, lineno, name), (cc, nc, tt, ct, _callers) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{lineno}({name})",
+            "calls": nc,
+            "tottime_ms": round(tt * 1000, 2),
+            "cumtime_ms": round(ct * 1000, 2),
+        })
+    rows.sort(key=lambda r: r["tottime_ms"], reverse=True)
+    return rows[:limit]
+
+
+# ─── Summary ─────────────────────────────────────────────────────────────────
+
+def summarize(node_type: Optional[str] = None, limit: int = _TOP_N) -> Dict[str, Any]:
+    """Aggregate stored profiles into per-node hotspots and peak allocations."""
+    result: Dict[str, Any] = {}
+    if not os.path.isdir(PROFILE_DIR):
+        return result
+
+    node_types = [os.path.basename(node_type)] if node_type else sorted(os.listdir(PROFILE_DIR))
+    for nt in node_types:
+        node_dir = os.path.join(PROFILE_DIR, nt)
+        prof_files = sorted(glob.glob(os.path.join(node_dir, "*.prof")))
+        if not prof_files:
+            continue
+
+        stats = pstats.Stats(prof_files[0], stream=io.StringIO())
+        for path in prof_files[1:]:
+            stats.add(path)
+
+        runs = []
+        for path in sorted(glob.glob(os.path.join(node_dir, "*.json"))):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    run = json.load(f)
+                runs.append({k: run.get(k) for k in ("timestamp", "function", "wall_ms", "peak_kb")}
+                            | {"top_alloc": run.get("top_alloc", [])[:3]})
+            except Exception:
+                continue
+
+        result[nt] = {
+            "executions": len(prof_files),
+            "hotspots": _top_functions(stats, limit),
+            "runs": runs,
+        }
+    return result
@@ -0,0 +1,101 @@
+"""
+Protected spans — keep non-translatable parts of a text away from the model.
+
+Prompts and subtitles carry syntax a translator must not touch: LoRA /
+hypernetwork tags (`<lora:name:0.8>`), embeddings, attention weights
+(`(word:1.2)` — only the `:1.2` is protected, the word is translated),
+subtitle timing lines and cue numbers, inline formatting tags, code and
+URLs. `protect()` finds them with one compiled alternation, replaces each
+run of spans with a compact numbered placeholder (⟦1⟧, ⟦2⟧, ...) and
+`Protected.restore()` puts the originals back into the translation.
+
+Placeholders are numbered per text, so two segments that differ only in
+their protected spans protect to the same text (and share a translation
+memory entry).
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+
+_PATTERNS = (
+    r"```.*?```",                                                   # fenced code
+    r"`[^`\n]+`",                                                   # inline code
+    r"\bhttps?://[^\s<>\"'\])]+",                                   # URLs
+    r"<[A-Za-z_]+:[^<>\n]+>",                                       # <lora:x:0.8>, <hypernet:...>
+    r"\bembedding:[\w.\-]+",                                        # embedding:name
+    r":[ \t]*-?\d+(?:\.\d+)?(?=[ \t]*[)\]])",                       # (word:1.2) / [word:0.5] weights
+    r"\d{1,2}:\d{2}(?::\d{2})?[,.]\d{1,3}[ \t]*-->[ \t]*"
+    r"\d{1,2}:\d{2}(?::\d{2})?[,.]\d{1,3}[^\n]*",                   # subtitle timing lines
+    r"(?m:^[ \t]*\d+[ \t]*$)",                                      # cue numbers
+    r"</?(?:i|b|u|font)\b[^<>\n]*>",                                # subtitle formatting tags
+    r"\{\\[^{}\n]*\}",                                              # ASS override tags {\an8}
+)
+_SPAN = re.compile("|".join(f"(?:{p})" for p in _PATTERNS), re.S)
+_JOIN = re.compile(r"[\s,]*")            # spans separated only by this share a placeholder
+_PLACEHOLDER = re.compile(r"⟦\s*(\d+)\s*⟧")
+_OPEN, _CLOSE = "⟦", "⟧"
+
+
+@dataclass
+class Protected:
+    text: str                                        # text with placeholders
+    spans: List[str] = field(default_factory=list)   # spans[n - 1] is placeholder n
+
+    @property
+    def translatable(self) -> bool:
+        """Whether anything but placeholders, digits and punctuation is left."""
+        return any(c.isalpha() for c in _PLACEHOLDER.sub("", self.text))
+
+    def fill(self, partial: str) -> str:
+        """`partial` with the placeholders it contains put back; nothing is appended (streamed text)."""
+        if not self.spans:
+            return partial
+        return _PLACEHOLDER.sub(
+            lambda m: self.spans[int(m.group(1)) - 1] if 1 <= int(m.group(1)) <= len(self.spans) else m.group(0),
+            partial)
+
+    def restore(self, translated: str) -> Tuple[str, bool]:
+        """(translation with the spans put back, whether every placeholder came back exactly once)."""
+        if not self.spans:
+            return translated, True
+        seen: List[int] = []
+
+        def put(m: "re.Match") -> str:
+            n = int(m.group(1))
+            if 1 <= n <= len(self.spans):
+                seen.append(n)
+                return self.spans[n - 1]
+            return m.group(0)
+
+        restored = _PLACEHOLDER.sub(put, translated)
+        missing = [s for n, s in enumerate(self.spans, 1) if n not in seen]
+        if missing:
+            # Dropped by the model: keep the spans rather than lose them
+            restored = " ".join([restored.rstrip()] + missing) if restored.strip() else " ".join(missing)
+        return restored, not missing and len(seen) == len(self.spans)
+
+
+def protect(text: str) -> Protected:
+    """Replace the protected spans of `text` with numbered placeholders."""
+    if _OPEN in text or _CLOSE in text:
+        return Protected(text)   # placeholders would be ambiguous
+    runs: List[List[int]] = []
+    for m in _SPAN.finditer(text):
+        if runs and _JOIN.fullmatch(text, runs[-1][1], m.start()):
+            runs[-1][1] = m.end()
+        else:
+            runs.append([m.start(), m.end()])
+    if not runs:
+        return Protected(text)
+    out: List[str] = []
+    spans: List[str] = []
+    pos = 0
+    for start, end in runs:
+        spans.append(text[start:end])
+        out.append(text[pos:start])
+        out.append(f"{_OPEN}{len(spans)}{_CLOSE}")
+        pos = end
+    out.append(text[pos:])
+    return Protected("".join(out), spans)
@@ -0,0 +1,216 @@
+"""
+ProviderRegistry — shared, cached view of config/providers.json.
+
+Nodes and routes read provider settings from here instead of parsing the
+file themselves:
+
+  - the file is parsed once and indexed by provider id and name
+  - the on-disk mtime is re-checked at most once per second, so edits made
+    outside ComfyUI are still picked up
+  - writes go through `save()`, which updates the cache immediately and
+    notifies subscribers (the routes push a websocket event so open node
+    dropdowns refresh)
+
+On first load, providers.json is created from default_providers.json and
+user records are migrated to include any fields added to the defaults.
+"""
+
+import os
+import copy
+import json
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "config")
+PROVIDERS_FILE = os.path.join(_CONFIG_DIR, "providers.json")
+DEFAULT_PROVIDERS_FILE = os.path.join(_CONFIG_DIR, "default_providers.json")
+
+_CHECK_INTERVAL = 1.0  # seconds between mtime checks
+
+
+class ProviderRegistry:
+    """Loads providers once; invalidates on save() or when the file changes on disk."""
+
+    TAG = "[LLMs_Toolkit]"
+
+    def __init__(self, path: str = PROVIDERS_FILE, defaults_path: str = DEFAULT_PROVIDERS_FILE,
+                 check_interval: float = _CHECK_INTERVAL):
+        self.path = path
+        self.defaults_path = defaults_path
+        self.check_interval = check_interval
+
+        self._lock = threading.RLock()
+        self._data: Dict[str, Any] = {"providers": []}
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._stamp: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._initialized = False
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+
+    # ── Reads ────────────────────────────────────────────────────────────
+
+    def providers(self, enabled_only: bool = False, enabled_default: bool = True) -> List[Dict[str, Any]]:
+        """
+        Provider records in file order (shared; do not mutate). Records
+        without an "enabled" flag count as `enabled_default`.
+        """
+        with self._lock:
+            self._refresh()
+            providers = self._data.get("providers", [])
+            if not enabled_only:
+                return list(providers)
+            return [p for p in providers if p.get("enabled", enabled_default)]
+
+    def get_by_id(self, provider_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return self._by_id.get(provider_id)
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return self._by_name.get(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Deep copy of the whole document, safe to modify and pass to save()."""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data)
+
+    # ── Writes ───────────────────────────────────────────────────────────
+
+    def save(self, data: Dict[str, Any]) -> None:
+        """Persist the document atomically and update the cache."""
+        with self._lock:
+            self._write(data)
+            self._stamp = self._file_stamp()
+            self._checked_at = time.monotonic()
+            self._set(data)
+            subscribers = list(self._subscribers)
+        self._notify(subscribers, data)
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Call `callback(data)` whenever the providers change (save or external edit)."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def invalidate(self) -> None:
+        """Force a re-read on next access."""
+        with self._lock:
+            self._stamp = None
+            self._checked_at = 0.0
+
+    # ── Internals ────────────────────────────────────────────────────────
+
+    def _refresh(self) -> None:
+        """Reload if the file changed; stat at most once per check interval (lock held)."""
+        now = time.monotonic()
+        if self._stamp is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        if not self._initialized:
+            self._initialized = True
+            self._ensure_file()
+
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        changed = self._stamp is not None
+        data = self._read()
+        self._stamp = stamp
+        self._set(data)
+        if changed:
+            self._notify(list(self._subscribers), data)
+
+    def _file_stamp(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return (0, 0)
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return data
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"{self.TAG} Failed to load providers.json: {e}")
+        return {"providers": []}
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _set(self, data: Dict[str, Any]) -> None:
+        self._data = data
+        providers = data.get("providers", [])
+        self._by_id = {p["id"]: p for p in providers if p.get("id")}
+        self._by_name = {}
+        for p in providers:
+            # First record wins, matching the previous linear lookups
+            self._by_name.setdefault(p.get("name", ""), p)
+
+    def _ensure_file(self) -> None:
+        """Create providers.json from the defaults and migrate missing default fields."""
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if os.path.exists(self.defaults_path):
+                    shutil.copy2(self.defaults_path, self.path)
+                    print(f"{self.TAG} Initialized providers.json from defaults.")
+                else:
+                    self._write({"providers": []})
+                    print(f"{self.TAG} No default_providers.json found, created empty providers.json.")
+                return
+
+            if not os.path.exists(self.defaults_path):
+                return
+            with open(self.defaults_path, "r", encoding="utf-8") as f:
+                defaults = {p.get("id"): p for p in json.load(f).get("providers", []) if p.get("id")}
+
+            data = self._read()
+            needs_save = False
+            for p in data.get("providers", []):
+                # System providers (or ids matching a default) get any newly added default keys
+                dp = defaults.get(p.get("id"))
+                if dp is None:
+                    continue
+                for key, val in dp.items():
+                    if key not in p:
+                        p[key] = val
+                        needs_save = True
+            if needs_save:
+                self._write(data)
+                print(f"{self.TAG} Migrated providers.json schema to include missing default fields.")
+        except Exception as e:
+            print(f"{self.TAG} Provider schema migration failed: {e}")
+
+    def _notify(self, subscribers: List[Callable[[Dict[str, Any]], None]], data: Dict[str, Any]) -> None:
+        for callback in subscribers:
+            try:
+                callback(data)
+            except Exception as e:
+                print(f"{self.TAG} Provider change listener failed: {e}")
+
+
+_registry: Optional[ProviderRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ProviderRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ProviderRegistry()
+    return _registry
@@ -0,0 +1,52 @@
+"""
+Structured-output requests: which `response_format` types each provider
+accepts, and how to ask for JSON within those limits.
+
+Unlisted providers (custom endpoints, LLM_CONFIG) are assumed to follow
+OpenAI and accept both json_object and json_schema; a provider record can
+override the table with a "responseFormats" list.
+"""
+
+import json
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+
+RESPONSE_FORMATS = {
+    "qwen": ("json_object",),
+    "deepseek": ("json_object",),
+    "doubao": ("json_object", "json_schema"),
+    "glm": ("json_object",),
+    "moonshot": ("json_object",),
+    "stepfun": ("json_object",),
+    "spark": (),
+    "baichuan": (),
+    "sensechat": (),
+}
+ALL_RESPONSE_FORMATS = ("json_object", "json_schema")
+
+JSON_INSTRUCTION = "Respond with a single valid JSON object only, without commentary or code fences."
+
+
+def supported_formats(provider_id: str, override: Optional[Sequence[str]] = None) -> tuple:
+    """`response_format` types to use for a provider (a record's "responseFormats" wins)."""
+    if override is not None:
+        return tuple(override)
+    return tuple(RESPONSE_FORMATS.get(provider_id, ALL_RESPONSE_FORMATS))
+
+
+def json_request(
+    mode: str, schema: Optional[Dict[str, Any]], supported: tuple
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Pick the `response_format` to send for a JSON mode, degrading to what the
+    provider supports. Returns (response_format or None, system instruction).
+    The schema goes into the instruction whenever it is not sent natively.
+    """
+    instruction = JSON_INSTRUCTION
+    if mode == "json_schema" and schema and "json_schema" in supported:
+        fmt = {"type": "json_schema", "json_schema": {"name": "response", "schema": schema}}
+        return fmt, instruction
+    if schema:
+        instruction += "\nThe JSON must conform to this JSON schema:\n" + json.dumps(schema, ensure_ascii=False)
+    fmt = {"type": "json_object"} if "json_object" in supported else None
+    return fmt, instruction
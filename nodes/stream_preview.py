@@ -0,0 +1,92 @@
+"""
+StreamPreview — throttled websocket updates of partial LLM output.
+
+While a streaming request is in flight, deltas are coalesced and pushed to
+the front end as `llm_toolkit.stream` events at most once per `interval`,
+plus a final `done` event, so a fast model sends a handful of messages per
+second instead of one per token. web/js/stream_preview.js renders them on
+the node.
+
+Event payload:
+  {"node": <unique_id>, "seq": n, "text": <delta>, "reasoning": <delta>, "done": bool}
+
+`seq` restarts at 0 for every request; the widget clears on seq 0 and
+appends deltas afterwards.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+
+EVENT = "llm_toolkit.stream"
+_INTERVAL = 0.1  # seconds between websocket messages per node
+
+
+def _prompt_server():
+    try:
+        from server import PromptServer
+        return PromptServer.instance
+    except Exception:
+        return None
+
+
+class StreamPreview:
+    """Callable `on_delta` sink that coalesces deltas into throttled events."""
+
+    def __init__(self, node_id: str, server: Any, interval: float = _INTERVAL):
+        self.node_id = str(node_id)
+        self.interval = interval
+        self._server = server
+        self._text: List[str] = []
+        self._reasoning: List[str] = []
+        self._seq = 0
+        self._last_send = 0.0
+        self._closed = False
+
+    @classmethod
+    def create(cls, node_id: Optional[str], interval: float = _INTERVAL) -> Optional["StreamPreview"]:
+        """Return a preview for the node, or None outside ComfyUI / without a node id."""
+        if not node_id:
+            return None
+        server = _prompt_server()
+        if server is None:
+            return None
+        return cls(node_id, server, interval)
+
+    def __call__(self, text: str, reasoning: str = "") -> None:
+        if self._closed:
+            return
+        if text:
+            self._text.append(text)
+        if reasoning:
+            self._reasoning.append(reasoning)
+        # Always send the first delta immediately: that is the time-to-first-token
+        if self._seq == 0 or time.monotonic() - self._last_send >= self.interval:
+            self._flush(done=False)
+
+    def close(self) -> None:
+        """Send any pending text and mark the stream finished."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._seq > 0:
+            self._flush(done=True)
+
+    def _flush(self, done: bool) -> None:
+        if not done and not self._text and not self._reasoning:
+            return
+        message: Dict[str, Any] = {
+            "node": self.node_id,
+            "seq": self._seq,
+            "text": "".join(self._text),
+            "reasoning": "".join(self._reasoning),
+            "done": done,
+        }
+        self._text.clear()
+        self._reasoning.clear()
+        self._seq += 1
+        self._last_send = time.monotonic()
+        try:
+            self._server.send_sync(EVENT, message, getattr(self._server, "client_id", None))
+        except Exception as e:
+            print(f"[LLMs_Toolkit] Failed to send stream preview: {e}")
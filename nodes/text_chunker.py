@@ -0,0 +1,138 @@
+"""
+Split long text into token-bounded chunks on natural boundaries.
+
+`split_text()` cuts at blank lines first (paragraphs; SRT/VTT subtitle cues
+are blank-line separated too, so a cue is never split), then at sentence
+ends, then at line breaks, and only as a last resort inside a line. Pieces
+are packed greedily up to `max_tokens` (estimated with count_text), and
+every chunk remembers the whitespace that followed it in the source, so
+
+    "".join(c.text + c.sep for c in split_text(text, n)) == text
+
+and translated chunks can be reassembled with the original layout.
+
+`split_segments()` cuts at every paragraph and sentence boundary instead
+(the translation-memory unit) with the same round-trip guarantee.
+
+`split_srt()` parses SubRip files natively: each cue's number and timing
+line become separator text and only the cue text is a chunk.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+try:
+    from .token_estimator import count_text
+except ImportError:
+    from token_estimator import count_text
+
+
+# Separators, coarsest first; each pattern captures the separator itself
+_PARAGRAPH = re.compile(r"(\n[ \t]*\n\s*)")
+_SENTENCE = re.compile(r"((?<=[.!?…])[ \t]+|(?<=[。！？；]))")
+_LINE = re.compile(r"(\n)")
+_LEVELS = (_PARAGRAPH, _SENTENCE, _LINE)
+_CUE_TIMING = re.compile(r"\d\d:\d\d[:.,\d]*\s*-->")
+_SRT_BLOCK = re.compile(r"(\r?\n[ \t]*\r?\n\s*)")
+_SRT_HEADER = re.compile(r"[\ufeff\s]*\d+[ \t]*\r?\n\d{1,2}:\d{2}:\d{2}[,.]\d{1,3}[ \t]*-->[ \t]*"
+                         r"\d{1,2}:\d{2}:\d{2}[,.]\d{1,3}[^\n]*(?:\n|$)")
+
+
+@dataclass
+class Chunk:
+    text: str
+    sep: str = ""   # whitespace that followed this chunk in the source
+
+
+def _split_keep(text: str, pattern: "re.Pattern") -> List[Tuple[str, str]]:
+    """(piece, separator) pairs; the separators are kept so nothing is lost."""
+    parts = pattern.split(text)
+    pieces = [(parts[i], parts[i + 1] if i + 1 < len(parts) else "") for i in range(0, len(parts), 2)]
+    # Zero-width sentence splits (CJK punctuation) can leave empty pieces
+    out: List[Tuple[str, str]] = []
+    for piece, sep in pieces:
+        if not piece and out:
+            out[-1] = (out[-1][0], out[-1][1] + sep)
+        else:
+            out.append((piece, sep))
+    return out
+
+
+def _hard_split(text: str, max_tokens: int) -> List[Tuple[str, str]]:
+    """Cut an unbreakable run into pieces of about `max_tokens`."""
+    tokens = max(1, count_text(text))
+    size = max(1, len(text) * max_tokens // tokens)
+    return [(text[i:i + size], "") for i in range(0, len(text), size)]
+
+
+def _pieces(text: str, max_tokens: int, level: int = 0) -> List[Tuple[str, str]]:
+    """Break `text` into pieces that each fit, using the coarsest boundary possible."""
+    if count_text(text) <= max_tokens:
+        return [(text, "")]
+    if level == len(_LEVELS):
+        return _hard_split(text, max_tokens)
+    out: List[Tuple[str, str]] = []
+    for piece, sep in _split_keep(text, _LEVELS[level]):
+        sub = _pieces(piece, max_tokens, level + 1)
+        sub[-1] = (sub[-1][0], sub[-1][1] + sep)
+        out.extend(sub)
+    return out
+
+
+def split_text(text: str, max_tokens: int) -> List[Chunk]:
+    """Pack `text` into chunks of at most ~`max_tokens` estimated tokens each."""
+    if max_tokens <= 0 or count_text(text) <= max_tokens:
+        return [Chunk(text)]
+
+    chunks: List[Chunk] = []
+    body: List[str] = []
+    tokens = 0
+    sep = ""
+    for piece, piece_sep in _pieces(text, max_tokens):
+        cost = count_text(piece)
+        if body and tokens + cost > max_tokens:
+            chunks.append(Chunk("".join(body), sep))
+            body, tokens = [], 0
+        elif body:
+            body.append(sep)
+        body.append(piece)
+        tokens += cost
+        sep = piece_sep
+    chunks.append(Chunk("".join(body), sep))
+    return chunks
+
+
+def split_segments(text: str) -> List[Chunk]:
+    """Every paragraph / subtitle cue / sentence of `text` as its own chunk (cues stay whole)."""
+    out: List[Chunk] = []
+    for paragraph, para_sep in _split_keep(text, _PARAGRAPH):
+        if _CUE_TIMING.search(paragraph):
+            out.append(Chunk(paragraph, para_sep))
+            continue
+        sentences = _split_keep(paragraph, _SENTENCE)
+        sentences[-1] = (sentences[-1][0], sentences[-1][1] + para_sep)
+        out.extend(Chunk(piece, sep) for piece, sep in sentences)
+    return out
+
+
+def is_srt(text: str) -> bool:
+    """Whether `text` starts like a SubRip file (cue number, then a timing line)."""
+    return bool(_SRT_HEADER.match(text))
+
+
+def split_srt(text: str) -> List[Chunk]:
+    """Cue texts of a SubRip file; numbers, timings and blank lines go into the separators."""
+    out: List[Chunk] = []
+    for block, block_sep in _split_keep(text, _SRT_BLOCK):
+        header = _SRT_HEADER.match(block)
+        if header is None:
+            out.append(Chunk(block, block_sep))   # stray text between cues is translated as is
+            continue
+        # The header follows the previous chunk; an empty chunk carries it at the very start
+        if out:
+            out[-1] = Chunk(out[-1].text, out[-1].sep + header.group(0))
+        else:
+            out.append(Chunk("", header.group(0)))
+        out.append(Chunk(block[header.end():], block_sep))
+    return out
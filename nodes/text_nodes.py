@@ -3,6 +3,11 @@ import logging
 import string
 from typing import Tuple, Dict, Any
 
+try:
+    from .profiling import profile_node
+except ImportError:
+    from profiling import profile_node
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -59,6 +64,7 @@ class StringTemplate:
     CATEGORY = "🚦ComfyUI_LLMs_Toolkit/JSON"
     DESCRIPTION = "Replaces variables in the template string with values from the input JSON variables (e.g. {name}). Missing variables are left as-is."
 
+    @profile_node
     def render(self, template: str, variables: str = "{}") -> Tuple[str]:
         # Parse variables
         context = {}
@@ -0,0 +1,246 @@
+"""
+Token estimation and context-window budgeting.
+
+`count_text()` is a fast local estimate that needs no tokenizer: CJK
+characters are counted individually (BPE vocabularies spend roughly one
+token per Han / Kana / Hangul character), Latin text by words and letters,
+digits in groups of three, and everything else per character. It is
+typically within ~15% of real BPE counts for mixed Chinese/English prompts.
+
+Set LLM_TOOLKIT_TOKENIZER to a tiktoken encoding name (e.g. `o200k_base`)
+to count with a real BPE vocabulary instead. This needs the optional
+`tiktoken` package; its vocabulary file is downloaded once and cached in
+config/tiktoken (or TIKTOKEN_CACHE_DIR).
+
+`fit_messages()` checks a request against the model's context window
+(looked up in `_CONTEXT_WINDOWS`) before it is sent: the oldest
+conversation turns are dropped if needed, `max_tokens` is clamped to what
+is left, and a prompt that cannot fit at all raises ContextWindowError.
+"""
+
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "config")
+
+_MESSAGE_OVERHEAD = 4      # role / separators per message
+_REPLY_PRIMING = 3         # tokens the server adds before the reply
+_IMAGE_TOKENS = 800        # flat cost when the dimensions are unknown
+_SAFETY_RATIO = 0.05       # headroom kept free for estimation error
+_MIN_OUTPUT_TOKENS = 256   # smallest reply budget worth sending
+_CACHE_CHARS = 4096         # texts this long or longer are not cached
+
+# Han, Kana, Hangul and full-width forms / CJK punctuation
+_CJK = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff"
+                  r"\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+_LATIN_WORD = re.compile(r"[A-Za-z]+")
+_LATIN_LETTER = re.compile(r"[A-Za-z]")
+_DIGIT = re.compile(r"\d")
+_SPACE = re.compile(r"\s")
+
+
+class ContextWindowError(ValueError):
+    """The prompt alone does not fit the model's context window."""
+
+
+# ─── Text estimate ───────────────────────────────────────────────────────────
+
+def _heuristic_count(text: str) -> int:
+    n = len(text)
+    cjk = len(_CJK.findall(text))
+    words = len(_LATIN_WORD.findall(text))
+    letters = len(_LATIN_LETTER.findall(text))
+    digits = len(_DIGIT.findall(text))
+    spaces = len(_SPACE.findall(text))
+    other = n - cjk - letters - digits - spaces
+    # ~1.3 tokens per average English word, longer words cost more
+    latin = 0.75 * words + letters / 8
+    return int(cjk + latin + digits / 3 + other * 0.8 + text.count("\n") * 0.5) + 1
+
+
+_bpe = None
+_bpe_loaded = False
+_bpe_lock = threading.Lock()
+
+
+def _get_bpe():
+    """The tiktoken encoding named by LLM_TOOLKIT_TOKENIZER, or None (loaded once)."""
+    global _bpe, _bpe_loaded
+    if _bpe_loaded:
+        return _bpe
+    with _bpe_lock:
+        if _bpe_loaded:
+            return _bpe
+        name = os.environ.get("LLM_TOOLKIT_TOKENIZER", "").strip()
+        if name and name.lower() != "heuristic":
+            try:
+                os.environ.setdefault("TIKTOKEN_CACHE_DIR", os.path.join(_CONFIG_DIR, "tiktoken"))
+                import tiktoken
+                _bpe = tiktoken.get_encoding(name)
+                print(f"[LLMs_Toolkit] Token counts use the {name} vocabulary")
+            except Exception as e:
+                print(f"[LLMs_Toolkit] Tokenizer {name!r} unavailable ({e}), using the heuristic estimate")
+        _bpe_loaded = True
+    return _bpe
+
+
+def count_text(text: str) -> int:
+    """Estimated token count of a string (short ones are cached; prompts repeat across runs)."""
+    if not text:
+        return 0
+    # The cache holds its keys: long texts (documents, chat histories) are counted each time
+    if len(text) < _CACHE_CHARS:
+        return _count_cached(text)
+    return _count(text)
+
+
+@lru_cache(maxsize=4096)
+def _count_cached(text: str) -> int:
+    return _count(text)
+
+
+def _count(text: str) -> int:
+    bpe = _get_bpe()
+    if bpe is not None:
+        return len(bpe.encode(text, disallowed_special=()))
+    return _heuristic_count(text)
+
+
+def image_tokens(image: Any) -> int:
+    """
+    Cost of one image: OpenAI's high-detail tile formula when the size is
+    known (ImageRef handles carry it), otherwise a flat estimate.
+    """
+    width, height = getattr(image, "width", 0), getattr(image, "height", 0)
+    if not width or not height:
+        return _IMAGE_TOKENS
+    return image_tokens_for_size(width, height)
+
+
+def image_tokens_for_size(width: int, height: int) -> int:
+    """Tile-formula cost of a width x height image (fit to 2048, short side to 768)."""
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = -(-int(width) // 512) * -(-int(height) // 512)
+    return 85 + 170 * tiles
+
+
+def count_message(message: Dict[str, Any]) -> int:
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return _MESSAGE_OVERHEAD + count_text(content)
+    tokens = _MESSAGE_OVERHEAD
+    for part in content or []:
+        if part.get("type") == "text":
+            tokens += count_text(part.get("text", ""))
+        elif part.get("type") == "image_url":
+            tokens += image_tokens(part.get("image_url", {}).get("url"))
+        else:
+            tokens += _IMAGE_TOKENS
+    return tokens
+
+
+def count_messages(messages: List[Dict[str, Any]]) -> int:
+    return _REPLY_PRIMING + sum(count_message(m) for m in messages)
+
+
+# ─── Context windows ─────────────────────────────────────────────────────────
+
+# First match wins; patterns are searched in the lower-cased model id.
+_CONTEXT_WINDOWS: List[Tuple[str, int]] = [
+    (r"qwen-long", 10_000_000),
+    (r"qwen.*-vl", 32_768),
+    (r"qwen-max", 32_768),
+    (r"qwen", 131_072),
+    (r"deepseek", 131_072),
+    (r"glm-4-long", 1_000_000),
+    (r"glm-4v", 8_192),
+    (r"glm", 131_072),
+    (r"kimi", 131_072),
+    (r"moonshot", 131_072),
+    (r"doubao", 131_072),
+    (r"abab", 245_760),
+    (r"minimax", 1_000_192),
+    (r"baichuan", 32_768),
+    (r"claude", 200_000),
+    (r"gemini", 1_048_576),
+    (r"gpt-4\.1", 1_047_576),
+    (r"gpt-4o|gpt-4-turbo|o1-mini|o1-preview", 128_000),
+    (r"\bo[1-4]\b|\bo[1-4]-", 200_000),
+    (r"gpt-3\.5", 16_385),
+    (r"gpt-4", 8_192),
+    (r"generalv3|4\.0ultra|spark|^lite$", 8_192),
+]
+_SIZE_SUFFIX = re.compile(r"(?:^|[-_/])(\d+)k(?:$|[-_])")
+
+
+@lru_cache(maxsize=256)
+def context_window(model: str) -> Optional[int]:
+    """Context window of a model id, or None when unknown (then nothing is enforced)."""
+    name = (model or "").lower()
+    # Ids such as moonshot-v1-32k / doubao-pro-128k / step-1-8k state it themselves
+    m = _SIZE_SUFFIX.search(name)
+    if m:
+        return int(m.group(1)) * 1024
+    for pattern, tokens in _CONTEXT_WINDOWS:
+        if re.search(pattern, name):
+            return tokens
+    return None
+
+
+def fit_messages(
+    messages: List[Dict[str, Any]], max_tokens: int, window: Optional[int]
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Make a request fit `window`. Returns (messages, max_tokens, prompt_tokens).
+
+    Oldest non-system messages are dropped (the last message is always
+    kept) until at least a minimal reply budget is left, then `max_tokens`
+    is clamped to the remaining space. Raises ContextWindowError when the
+    kept messages alone are too large. `window=None` only counts.
+    """
+    tokens = [count_message(m) for m in messages]
+    total = _REPLY_PRIMING + sum(tokens)
+    if not window:
+        return messages, max_tokens, total
+
+    budget = int(window * (1 - _SAFETY_RATIO))
+    min_output = min(max_tokens, _MIN_OUTPUT_TOKENS)
+    if total + max_tokens <= budget:
+        return messages, max_tokens, total
+
+    kept = list(range(len(messages)))
+    dropped = 0
+    for i in range(len(messages) - 1):
+        if total + min_output <= budget:
+            break
+        if messages[i].get("role") == "system":
+            continue
+        kept.remove(i)
+        total -= tokens[i]
+        dropped += 1
+
+    if total + min_output > budget:
+        raise ContextWindowError(
+            f"Prompt is about {total} tokens but the model's context window is {window} "
+            f"(with {min_output} tokens reserved for the reply). Shorten the input."
+        )
+    if dropped:
+        # Never let the remaining history open with an orphaned assistant reply
+        first = next(j for j, i in enumerate(kept) if messages[i].get("role") != "system")
+        while first < len(kept) - 1 and messages[kept[first]].get("role") == "assistant":
+            total -= tokens[kept.pop(first)]
+            dropped += 1
+        print(f"[LLMs_Toolkit] Context: dropped {dropped} oldest message(s) to fit {window} tokens")
+        messages = [messages[i] for i in kept]
+
+    clamped = min(max_tokens, budget - total)
+    if clamped < max_tokens:
+        print(f"[LLMs_Toolkit] Context: max_tokens {max_tokens} -> {clamped} (prompt ~{total} tokens)")
+    return messages, clamped, total
@@ -0,0 +1,219 @@
+"""
+Tracing — lightweight nested spans for request diagnostics.
+
+Answers "where did the 40 seconds go?" for a single LLM call by timing each
+stage (image encoding, payload serialization, connect/TTFB, body read,
+post-processing) as nested spans.
+
+Disabled by default; enable with LLM_TOOLKIT_TRACE=1. When disabled, `span()`
+yields a shared no-op object, so instrumented code pays almost nothing.
+
+Spans are exported one per line to config/traces/trace.jsonl (size-rotated)
+as Chrome Trace Event objects. GET /llm_toolkit/traces wraps them in a
+`traceEvents` document that chrome://tracing and Perfetto load directly.
+"""
+
+import os
+import json
+import time
+import uuid
+import inspect
+import logging
+import itertools
+import threading
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "config")
+TRACE_DIR = os.path.join(_CONFIG_DIR, "traces")
+TRACE_FILE = os.path.join(TRACE_DIR, "trace.jsonl")
+
+_MAX_BYTES = int(float(os.environ.get("LLM_TOOLKIT_TRACE_MAX_MB", "10")) * 1024 * 1024)
+_BACKUP_COUNT = 3
+
+_enabled = os.environ.get("LLM_TOOLKIT_TRACE", "").strip().lower() in ("1", "true", "yes", "on")
+_current: contextvars.ContextVar = contextvars.ContextVar("llm_toolkit_span", default=None)
+_span_ids = itertools.count(1)
+_PID = os.getpid()
+
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(flag: bool) -> None:
+    """Toggle tracing at runtime (e.g. from a route or a debugging session)."""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def _get_logger() -> logging.Logger:
+    """Create the rotating JSONL exporter on first use."""
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                os.makedirs(TRACE_DIR, exist_ok=True)
+                handler = RotatingFileHandler(
+                    TRACE_FILE, maxBytes=_MAX_BYTES, backupCount=_BACKUP_COUNT, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                lg = logging.getLogger("LLMs_Toolkit.trace")
+                lg.setLevel(logging.INFO)
+                lg.propagate = False
+                lg.addHandler(handler)
+                _logger = lg
+    return _logger
+
+
+# ─── Spans ───────────────────────────────────────────────────────────────────
+
+class Span:
+    """A timed stage. Attributes may be added while the span is open."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    """Stand-in yielded while tracing is disabled."""
+
+    __slots__ = ()
+    trace_id = None
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attrs):
+    """
+    Time a block as a span nested under the current one.
+
+    Root spans should pass `trace_id` (the ComfyUI prompt id); child spans
+    inherit it from their parent.
+    """
+    if not _enabled:
+        yield _NULL_SPAN
+        return
+
+    parent = _current.get()
+    if trace_id is None:
+        trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:12]
+    s = Span(name, trace_id, parent.span_id if parent is not None else None, attrs)
+    token = _current.set(s)
+    wall_start = time.time()
+    start = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current.reset(token)
+        _export(s, wall_start, duration)
+
+
+def _export(s: Span, wall_start: float, duration: float) -> None:
+    event = {
+        "name": s.name,
+        "cat": "llm_toolkit",
+        "ph": "X",
+        "ts": int(wall_start * 1_000_000),
+        "dur": max(1, int(duration * 1_000_000)),
+        "pid": _PID,
+        "tid": threading.get_ident(),
+        "args": {"trace_id": s.trace_id, "span_id": s.span_id, "parent_id": s.parent_id, **s.attrs},
+    }
+    try:
+        _get_logger().info(json.dumps(event, ensure_ascii=False, default=str))
+    except Exception as e:
+        print(f"[LLMs_Toolkit] Failed to export trace span: {e}")
+
+
+def current_trace_id() -> Optional[str]:
+    s = _current.get()
+    return s.trace_id if s is not None else None
+
+
+def comfy_prompt_id() -> Optional[str]:
+    """Best-effort id of the prompt ComfyUI is currently executing."""
+    try:
+        from server import PromptServer
+        return getattr(PromptServer.instance, "last_prompt_id", None)
+    except Exception:
+        return None
+
+
+def traced(name: str):
+    """
+    Decorator for node entry points (sync or coroutine): opens a root span
+    correlated by the ComfyUI prompt id, tagged with the node's `unique_id`
+    when provided.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await func(*args, **kwargs)
+                trace_id = current_trace_id() or comfy_prompt_id()
+                with span(name, trace_id=trace_id, unique_id=kwargs.get("unique_id", "")):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            trace_id = current_trace_id() or comfy_prompt_id()
+            with span(name, trace_id=trace_id, unique_id=kwargs.get("unique_id", "")):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ─── Reading ─────────────────────────────────────────────────────────────────
+
+def read_events(trace_id: Optional[str] = None, limit: int = 5000) -> List[Dict[str, Any]]:
+    """Return the most recent exported events, optionally for one trace."""
+    events: deque = deque(maxlen=max(1, limit))
+    if not os.path.exists(TRACE_FILE):
+        return []
+    try:
+        with open(TRACE_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if trace_id and event.get("args", {}).get("trace_id") != trace_id:
+                    continue
+                events.append(event)
+    except Exception as e:
+        print(f"[LLMs_Toolkit] Failed to read traces: {e}")
+    return list(events)
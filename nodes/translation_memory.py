@@ -0,0 +1,211 @@
+"""
+TranslationMemory — persistent segment-level cache for LLMTranslator.
+
+Translated segments (sentences, prompt lines, subtitle cues) are stored in
+config/translation_memory.db keyed by a digest of
+
+    (normalized source segment, target language, glossary digest, model)
+
+so a segment seen before is served locally and only new ones go to the API.
+Normalization is Unicode NFC plus collapsed whitespace; case and
+punctuation are kept because they change the translation.
+
+The file is size-bounded (LLM_TOOLKIT_TM_MB, default 64; 0 disables the
+memory): when stored text exceeds the budget, the least recently used
+entries are evicted.
+
+The memory is an optional cache: SQLite errors (locked or read-only
+database, corrupt file) are logged and `lookup()` / `store()` fall back to
+a miss / no-op, so translation goes on without it.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "config")
+DB_FILE = os.path.join(_CONFIG_DIR, "translation_memory.db")
+
+_LOOKUP_BATCH = 500         # keys per SELECT ... IN (...)
+_EVICT_TARGET = 0.9         # evict down to this share of the budget
+_WHITESPACE = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tm (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    language TEXT NOT NULL,
+    model TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    used INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tm_used ON tm(used);
+"""
+
+
+def _max_bytes_from_env() -> int:
+    try:
+        return int(float(os.environ.get("LLM_TOOLKIT_TM_MB", "64")) * 1024 * 1024)
+    except ValueError:
+        return 64 * 1024 * 1024
+
+
+def normalize(segment: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", segment)).strip()
+
+
+def glossary_digest(glossary: str) -> str:
+    """Digest of the glossary entries (order and blank lines do not matter)."""
+    lines = sorted({normalize(line) for line in (glossary or "").splitlines() if line.strip()})
+    return hashlib.blake2b("\n".join(lines).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def segment_key(segment: str, language: str, glossary: str, model: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in (normalize(segment), language, glossary, model):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class TranslationMemory:
+    """SQLite-backed segment cache with LRU eviction by stored bytes."""
+
+    def __init__(self, db_path: str = DB_FILE, max_bytes: Optional[int] = None):
+        self.db_path = db_path
+        self.max_bytes = _max_bytes_from_env() if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._bytes: Optional[int] = None
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            try:
+                conn.executescript(_SCHEMA)
+                conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self._initialized = True
+        return conn
+
+    def lookup(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Stored translations for the keys that have one (marks them as used)."""
+        keys = list(dict.fromkeys(keys))
+        if not keys or not self.enabled:
+            return {}
+        found: Dict[str, str] = {}
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    for i in range(0, len(keys), _LOOKUP_BATCH):
+                        batch = keys[i:i + _LOOKUP_BATCH]
+                        marks = ", ".join("?" * len(batch))
+                        found.update(conn.execute(
+                            f"SELECT key, target FROM tm WHERE key IN ({marks})", batch).fetchall())
+                    if found:
+                        with conn:
+                            conn.executemany("UPDATE tm SET used = ?, hits = hits + 1 WHERE key = ?",
+                                             [(int(time.time()), k) for k in found])
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"[LLM Translator] memory: lookup failed, translating without it ({e})")
+                found = {}
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        return found
+
+    def store(self, rows: Iterable[Tuple[str, str, str, str, str]]) -> None:
+        """Insert (key, source, target, language, model) rows, then enforce the size budget."""
+        now = int(time.time())
+        data = [(key, source, target, language, model, len(source.encode("utf-8")) + len(target.encode("utf-8")), now)
+                for key, source, target, language, model in rows]
+        if not data or not self.enabled:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO tm (key, source, target, language, model, bytes, used) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", data)
+                        # Recount after replacing rows rather than tracking deltas
+                        self._bytes = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM tm").fetchone()[0]
+                        if self._bytes > self.max_bytes:
+                            self._evict(conn)
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"[LLM Translator] memory: could not store {len(data)} segment(s) ({e})")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        target = int(self.max_bytes * _EVICT_TARGET)
+        freed, doomed = 0, []
+        for key, size in conn.execute("SELECT key, bytes FROM tm ORDER BY used, rowid"):
+            if self._bytes - freed <= target:
+                break
+            doomed.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM tm WHERE key = ?", doomed)
+        self._bytes -= freed
+        print(f"[LLM Translator] memory: evicted {len(doomed)} least recently used segment(s)")
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM tm")
+            finally:
+                conn.close()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM tm").fetchone()
+            finally:
+                conn.close()
+            lookups = self._hits + self._misses
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+_memory: Optional[TranslationMemory] = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> TranslationMemory:
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = TranslationMemory()
+    return _memory
@@ -0,0 +1,219 @@
+"""
+UsageWriter — buffered background writer for config/usage.jsonl.
+
+Request threads only enqueue a record; a daemon thread batches appends,
+fsyncs on an interval and rotates by byte size:
+
+  config/usage.jsonl                       active segment (appended to)
+  config/usage-YYYYmmdd-HHMMSS.jsonl       sealed segments, oldest pruned
+
+Rotation is a rename, so no request ever re-reads or rewrites the log.
+Pending records are flushed at interpreter shutdown.
+"""
+
+import os
+import glob
+import json
+import time
+import queue
+import atexit
+import threading
+from typing import Any, Dict, List, Optional
+
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "config")
+USAGE_FILE = os.path.join(_CONFIG_DIR, "usage.jsonl")
+
+_SEGMENT_BYTES = 2 * 1024 * 1024   # seal the active file at ~2 MB (~10k records)
+_MAX_SEGMENTS = 20                 # sealed segments kept
+_BATCH_SIZE = 256
+_FLUSH_INTERVAL = 1.0              # seconds between batch writes when idle
+_FSYNC_INTERVAL = 5.0
+
+
+class UsageWriter:
+    """Queue-fed appender with size-based segment rotation."""
+
+    TAG = "[LLMs_Toolkit]"
+
+    def __init__(
+        self,
+        path: str = USAGE_FILE,
+        segment_bytes: int = _SEGMENT_BYTES,
+        max_segments: int = _MAX_SEGMENTS,
+        flush_interval: float = _FLUSH_INTERVAL,
+        fsync_interval: float = _FSYNC_INTERVAL,
+    ):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._last_fsync = 0.0
+        self._closed = False
+
+    # ── Producer side ────────────────────────────────────────────────────
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Enqueue a record; never touches the disk on the caller's thread."""
+        if self._closed:
+            return
+        self._ensure_thread()
+        self._queue.put(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Block until everything enqueued so far is on disk (best effort)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self) -> None:
+        """Flush pending records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="llm_usage_writer", daemon=True
+                    )
+                    self._thread.start()
+
+    # ── Writer thread ────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._sync(force=False)
+                continue
+
+            batch: List[str] = []
+            waiters: List[threading.Event] = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= _BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._append(batch)
+            if waiters or stop:
+                self._sync(force=True)
+            for w in waiters:
+                w.set()
+            if stop:
+                self._close_file()
+                return
+
+    def _append(self, lines: List[str]) -> None:
+        try:
+            f = self._open()
+            f.write("".join(lines))
+            f.flush()
+            if f.tell() >= self.segment_bytes:
+                self._rotate()
+            self._sync(force=False)
+        except Exception as e:
+            print(f"{self.TAG} Failed to write usage log: {e}")
+            self._close_file()
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _sync(self, force: bool) -> None:
+        if self._file is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError:
+                pass
+            self._last_fsync = now
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+            except (OSError, ValueError):
+                pass
+            self._file = None
+
+    def _rotate(self) -> None:
+        """Seal the active file as a timestamped segment and prune old ones."""
+        self._close_file()
+        base, ext = os.path.splitext(self.path)
+        sealed = f"{base}-{time.strftime('%Y%m%d-%H%M%S')}{ext}"
+        suffix = 1
+        while os.path.exists(sealed):
+            sealed = f"{base}-{time.strftime('%Y%m%d-%H%M%S')}_{suffix}{ext}"
+            suffix += 1
+        os.replace(self.path, sealed)
+
+        segments = sealed_segments(self.path)
+        for old in segments[:-self.max_segments] if self.max_segments > 0 else segments:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        print(f"{self.TAG} Usage log rotated -> {os.path.basename(sealed)}")
+
+
+# ─── Segment discovery ───────────────────────────────────────────────────────
+
+def sealed_segments(path: str = USAGE_FILE) -> List[str]:
+    """Sealed segments, oldest first (timestamped names sort chronologically)."""
+    base, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{glob.escape(base)}-*{ext}"))
+
+
+def segment_paths(path: str = USAGE_FILE) -> List[str]:
+    """All usage files, oldest first, ending with the active segment."""
+    paths = sealed_segments(path)
+    if os.path.exists(path):
+        paths.append(path)
+    return paths
+
+
+_writer: Optional[UsageWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> UsageWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = UsageWriter()
+                atexit.register(_writer.close)
+    return _writer
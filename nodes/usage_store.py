@@ -0,0 +1,494 @@
+"""
+UsageStore — indexed usage analytics on top of the usage.jsonl segments.
+
+The JSONL segments written by usage_log stay the source of truth; this module
+ingests them incrementally (per-file byte offsets) into config/usage.db:
+
+  usage    raw records, indexed by time and provider/model
+  rollup   per-minute and per-hour aggregates: calls, errors, tokens,
+           latency avg/p50/p95/p99 and a sparse log-scale latency histogram,
+           at three levels — all traffic (provider="*", model="*"), per
+           provider (model="*"), and per provider/model
+
+Rollups of the buckets touched by each ingest are recomputed with NumPy
+(grouped sums via bincount, percentiles via one lexsort), so dashboard
+queries read a handful of pre-aggregated rows instead of parsing months of
+JSON on every request. Summary totals over a range come from the rollups
+too: call-weighted means, and percentiles from the summed histograms
+(within one bin, about 7.5%).
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .usage_log import segment_paths
+except ImportError:
+    from usage_log import segment_paths
+
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "config")
+DB_FILE = os.path.join(_CONFIG_DIR, "usage.db")
+
+GRANULARITIES = {"minute": 60, "hour": 3600}
+ALL = "*"
+_PERCENTILES = (0.50, 0.95, 0.99)
+_FINGERPRINT_BYTES = 512
+# Latency histogram: bin 0 is < 1 ms, then 32 log-spaced bins per decade up to 10^7 ms
+_HIST_PER_DECADE = 32
+_HIST_BINS = _HIST_PER_DECADE * 7 + 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL,
+    elapsed_ms INTEGER NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_ts ON usage(ts);
+CREATE INDEX IF NOT EXISTS idx_usage_pm_ts ON usage(provider, model, ts);
+
+CREATE TABLE IF NOT EXISTS rollup (
+    granularity TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL,
+    latency_avg REAL,
+    latency_p50 REAL,
+    latency_p95 REAL,
+    latency_p99 REAL,
+    latency_hist BLOB,
+    PRIMARY KEY (granularity, provider, model, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS ingest_state (
+    file_key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    offset INTEGER NOT NULL
+);
+"""
+
+_RECORD_COLUMNS = ("ts", "provider", "model", "input_tokens", "output_tokens",
+                   "total_tokens", "elapsed_ms", "status")
+
+
+def _file_key(st: os.stat_result) -> str:
+    # Rotation renames the active file, so the inode identifies a segment
+    return f"{st.st_dev}:{st.st_ino}"
+
+
+def _fingerprint(path: str) -> Optional[str]:
+    """Hash of the first complete line; None until one has been written."""
+    with open(path, "rb") as f:
+        head = f.read(_FINGERPRINT_BYTES)
+    newline = head.find(b"\n")
+    if newline < 0 and len(head) < _FINGERPRINT_BYTES:
+        return None
+    return hashlib.blake2b(head[:newline + 1] if newline >= 0 else head, digest_size=8).hexdigest()
+
+
+def _to_row(record: Dict[str, Any]) -> Optional[Tuple]:
+    try:
+        in_tok = int(record.get("input_tokens", 0) or 0)
+        out_tok = int(record.get("output_tokens", 0) or 0)
+        return (
+            int(record["timestamp"]),
+            str(record.get("provider", "")),
+            str(record.get("model", "")),
+            in_tok,
+            out_tok,
+            int(record.get("total_tokens", in_tok + out_tok) or 0),
+            int(record.get("elapsed_ms", 0) or 0),
+            str(record.get("status", "ok")),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class UsageStore:
+    """SQLite usage index with incremental ingestion and NumPy rollups."""
+
+    def __init__(self, db_path: str = DB_FILE, usage_path: Optional[str] = None):
+        self.db_path = db_path
+        self.usage_path = usage_path
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn.executescript(_SCHEMA)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._migrate(conn)
+            self._initialized = True
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Add the latency histogram to rollups created before it existed (one full rebuild)."""
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(rollup)")}
+        if "latency_hist" in columns:
+            return
+        with conn:
+            conn.execute("ALTER TABLE rollup ADD COLUMN latency_hist BLOB")
+            ts = np.array([r[0] for r in conn.execute("SELECT ts FROM usage")], dtype=np.int64)
+            if ts.size:
+                for granularity, width in GRANULARITIES.items():
+                    self._rebuild_rollups(conn, granularity, width, np.unique(ts // width * width))
+
+    # ── Ingestion ────────────────────────────────────────────────────────
+
+    def ingest(self) -> int:
+        """Load records appended to the JSONL segments since the last call."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                return self._ingest(conn)
+            finally:
+                conn.close()
+
+    def _ingest(self, conn: sqlite3.Connection) -> int:
+        paths = segment_paths(self.usage_path) if self.usage_path else segment_paths()
+        state = {r["file_key"]: (r["fingerprint"], r["offset"])
+                 for r in conn.execute("SELECT * FROM ingest_state")}
+        seen = set()
+        rows: List[Tuple] = []
+        new_state: List[Tuple[str, str, int]] = []
+
+        for path in paths:
+            try:
+                st = os.stat(path)
+                if st.st_size == 0:
+                    continue
+                key = _file_key(st)
+                fp = _fingerprint(path)
+            except OSError:
+                continue
+            seen.add(key)
+            if fp is None:
+                continue
+            prev_fp, offset = state.get(key, (fp, 0))
+            if prev_fp != fp or offset > st.st_size:
+                offset = 0  # inode reused by a different file
+            if offset == st.st_size:
+                continue
+
+            with open(path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read()
+            end = chunk.rfind(b"\n") + 1  # only complete lines
+            for line in chunk[:end].splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = _to_row(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                if row is not None:
+                    rows.append(row)
+            new_state.append((key, fp, offset + end))
+
+        with conn:
+            if rows:
+                conn.executemany(
+                    f"INSERT INTO usage ({', '.join(_RECORD_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                ts = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+                for granularity, width in GRANULARITIES.items():
+                    self._rebuild_rollups(conn, granularity, width, np.unique(ts // width * width))
+            conn.executemany(
+                "INSERT OR REPLACE INTO ingest_state (file_key, fingerprint, offset) VALUES (?, ?, ?)",
+                new_state,
+            )
+            stale = [k for k in state if k not in seen]
+            conn.executemany("DELETE FROM ingest_state WHERE file_key = ?", [(k,) for k in stale])
+        return len(rows)
+
+    def _rebuild_rollups(self, conn: sqlite3.Connection, granularity: str,
+                         width: int, buckets: np.ndarray) -> None:
+        """Recompute every rollup row for the given buckets from raw records."""
+        lo, hi = int(buckets.min()), int(buckets.max()) + width
+        raw = conn.execute(
+            "SELECT ts, provider, model, input_tokens, output_tokens, total_tokens, elapsed_ms, status "
+            "FROM usage WHERE ts >= ? AND ts < ?", (lo, hi)
+        ).fetchall()
+        if not raw:
+            return
+
+        ts = np.array([r[0] for r in raw], dtype=np.int64)
+        bucket = ts // width * width
+        keep = np.isin(bucket, buckets)
+        if not keep.all():
+            raw = [r for r, k in zip(raw, keep) if k]
+            bucket = bucket[keep]
+        providers = np.array([r[1] for r in raw], dtype=str)
+        models = np.array([r[2] for r in raw], dtype=str)
+        numeric = np.array([(r[3], r[4], r[5], r[6]) for r in raw], dtype=np.int64).reshape(-1, 4)
+        errors = np.array([r[7] for r in raw], dtype=str) == "error"
+
+        out: List[Tuple] = []
+        star = np.full(len(raw), ALL)
+        for prov_key, model_key in ((star, star), (providers, star), (providers, models)):
+            out.extend(_aggregate(granularity, bucket, prov_key, model_key, numeric, errors))
+
+        conn.executemany(
+            "DELETE FROM rollup WHERE granularity = ? AND bucket = ?",
+            [(granularity, int(b)) for b in buckets],
+        )
+        conn.executemany(
+            "INSERT INTO rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", out
+        )
+
+    # ── Queries ──────────────────────────────────────────────────────────
+
+    def records(self, start: Optional[int] = None, end: Optional[int] = None,
+                provider: Optional[str] = None, model: Optional[str] = None,
+                limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Raw records in a time range, newest first, paginated."""
+        self.ingest()
+        where, params = _filters(start, end, provider, model)
+        conn = self._connect()
+        try:
+            total = conn.execute(f"SELECT COUNT(*) FROM usage {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT ts, {', '.join(_RECORD_COLUMNS[1:])} FROM usage {where} "
+                "ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        finally:
+            conn.close()
+        records = [
+            {"timestamp": r["ts"], **{c: r[c] for c in _RECORD_COLUMNS[1:]}} for r in rows
+        ]
+        return {"total": total, "limit": limit, "offset": offset, "records": records}
+
+    def summary(self, start: Optional[int] = None, end: Optional[int] = None,
+                provider: Optional[str] = None, model: Optional[str] = None,
+                granularity: str = "hour") -> Dict[str, Any]:
+        """Totals, a time series from rollups, and a per-model breakdown."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {sorted(GRANULARITIES)}")
+        self.ingest()
+        width = GRANULARITIES[granularity]
+        conn = self._connect()
+        try:
+            rows = self._series(conn, granularity, width, start, end, provider, model)
+            breakdown = self._breakdown(conn, granularity, width, start, end, provider, model)
+        finally:
+            conn.close()
+
+        # Totals from the rollup rows only: no scan of raw records, however long the range
+        series = _merge_by_bucket(rows)
+        totals = {k: int(sum(s[k] for s in series)) for k in
+                  ("calls", "errors", "input_tokens", "output_tokens", "total_tokens")}
+        totals["error_rate"] = totals["errors"] / totals["calls"] if totals["calls"] else 0.0
+        if totals["calls"]:
+            p = _hist_percentiles(_sum_hists(r["latency_hist"] for r in rows))
+            totals.update(latency_avg=sum(s["latency_avg"] * s["calls"] for s in series) / totals["calls"],
+                          latency_p50=p[0], latency_p95=p[1], latency_p99=p[2])
+        return {"granularity": granularity, "totals": totals, "series": series, "by_model": breakdown}
+
+    def _series(self, conn, granularity, width, start, end, provider, model) -> List[sqlite3.Row]:
+        # Pick the pre-aggregated level matching the filter
+        level_provider = provider if provider else ALL
+        level_model = model if model else ALL
+        clauses = ["granularity = ?"]
+        params: List[Any] = [granularity]
+        if provider or not model:
+            clauses.append("provider = ?")
+            params.append(level_provider)
+        clauses.append("model = ?")
+        params.append(level_model)
+        clauses, params = _bucket_range(clauses, params, width, start, end)
+        return conn.execute(
+            f"SELECT * FROM rollup WHERE {' AND '.join(clauses)} ORDER BY bucket", params
+        ).fetchall()
+
+    def _breakdown(self, conn, granularity, width, start, end, provider, model) -> List[Dict[str, Any]]:
+        clauses = ["granularity = ?", "provider != ?", "model != ?"]
+        params: List[Any] = [granularity, ALL, ALL]
+        if provider:
+            clauses.append("provider = ?")
+            params.append(provider)
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        clauses, params = _bucket_range(clauses, params, width, start, end)
+        rows = conn.execute(
+            "SELECT provider, model, SUM(calls) AS calls, SUM(errors) AS errors, "
+            "SUM(input_tokens) AS input_tokens, SUM(output_tokens) AS output_tokens, "
+            "SUM(total_tokens) AS total_tokens, "
+            "SUM(latency_avg * calls) / SUM(calls) AS latency_avg "
+            f"FROM rollup WHERE {' AND '.join(clauses)} "
+            "GROUP BY provider, model ORDER BY total_tokens DESC", params
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────────────
+
+def _filters(start, end, provider, model) -> Tuple[str, List[Any]]:
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("ts >= ?")
+        params.append(int(start))
+    if end is not None:
+        clauses.append("ts < ?")
+        params.append(int(end))
+    if provider:
+        clauses.append("provider = ?")
+        params.append(provider)
+    if model:
+        clauses.append("model = ?")
+        params.append(model)
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _bucket_range(clauses, params, width, start, end):
+    if start is not None:
+        clauses.append("bucket >= ?")
+        params.append(int(start) // width * width)
+    if end is not None:
+        clauses.append("bucket < ?")
+        params.append(int(end))
+    return clauses, params
+
+
+def _aggregate(granularity: str, bucket: np.ndarray, provider: np.ndarray, model: np.ndarray,
+               numeric: np.ndarray, errors: np.ndarray) -> List[Tuple]:
+    """Group rows by (bucket, provider, model) and aggregate with NumPy."""
+    b_vals, b_idx = np.unique(bucket, return_inverse=True)
+    p_vals, p_idx = np.unique(provider, return_inverse=True)
+    m_vals, m_idx = np.unique(model, return_inverse=True)
+    n_p, n_m = len(p_vals), len(m_vals)
+    combined = (b_idx.reshape(-1).astype(np.int64) * n_p + p_idx.reshape(-1)) * n_m + m_idx.reshape(-1)
+    group_keys, inverse = np.unique(combined, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n_groups = len(group_keys)
+    g_bucket = b_vals[group_keys // (n_p * n_m)]
+    g_provider = p_vals[(group_keys // n_m) % n_p]
+    g_model = m_vals[group_keys % n_m]
+
+    calls = np.bincount(inverse, minlength=n_groups)
+    errs = np.bincount(inverse, weights=errors.astype(np.float64), minlength=n_groups)
+    sums = [np.bincount(inverse, weights=numeric[:, i], minlength=n_groups) for i in range(4)]
+    latency = numeric[:, 3].astype(np.float64)
+
+    # Percentiles per group: sort by (group, latency), then index into each run
+    order = np.lexsort((latency, inverse))
+    sorted_lat = latency[order]
+    starts = np.concatenate(([0], np.cumsum(calls)[:-1]))
+    pct = []
+    for q in _PERCENTILES:
+        pos = starts + q * (calls - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, starts + calls - 1)
+        frac = pos - lo
+        pct.append(sorted_lat[lo] * (1 - frac) + sorted_lat[hi] * frac)
+
+    # Sparse histogram per group: count the (group, bin) pairs, then split by group
+    pairs, counts = np.unique(inverse.astype(np.int64) * _HIST_BINS + _latency_bins(latency),
+                              return_counts=True)
+    bounds = np.searchsorted(pairs // _HIST_BINS, np.arange(n_groups + 1))
+    hists = [_encode_hist(pairs[a:b] % _HIST_BINS, counts[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    out = []
+    for g in range(n_groups):
+        out.append((
+            granularity, int(g_bucket[g]), str(g_provider[g]), str(g_model[g]), int(calls[g]), int(errs[g]),
+            int(sums[0][g]), int(sums[1][g]), int(sums[2][g]),
+            float(sums[3][g] / calls[g]), float(pct[0][g]), float(pct[1][g]), float(pct[2][g]),
+            hists[g],
+        ))
+    return out
+
+
+def _latency_bins(latency: np.ndarray) -> np.ndarray:
+    """Histogram bin of each latency in ms."""
+    bins = np.floor(np.log10(np.maximum(latency, 1.0)) * _HIST_PER_DECADE).astype(np.int64) + 1
+    bins[latency < 1.0] = 0
+    return np.minimum(bins, _HIST_BINS - 1)
+
+
+def _encode_hist(bins: np.ndarray, counts: np.ndarray) -> bytes:
+    """(bin, count) pairs of the non-empty bins as little-endian uint32."""
+    return np.stack([bins, counts], axis=1).astype("<u4").tobytes()
+
+
+def _sum_hists(blobs) -> np.ndarray:
+    total = np.zeros(_HIST_BINS, dtype=np.int64)
+    for blob in blobs:
+        if blob:
+            pairs = np.frombuffer(blob, dtype="<u4").reshape(-1, 2)
+            np.add.at(total, pairs[:, 0], pairs[:, 1])
+    return total
+
+
+def _hist_percentiles(hist: np.ndarray) -> List[float]:
+    """_PERCENTILES of a histogram, each at the geometric centre of its bin."""
+    n = int(hist.sum())
+    if not n:
+        return [0.0] * len(_PERCENTILES)
+    cumulative = np.cumsum(hist)
+    out = []
+    for q in _PERCENTILES:
+        b = int(np.searchsorted(cumulative, q * (n - 1), side="right"))
+        out.append(0.0 if b == 0 else float(10 ** ((b - 0.5) / _HIST_PER_DECADE)))
+    return out
+
+
+def _merge_by_bucket(rows) -> List[Dict[str, Any]]:
+    """Combine rollup rows sharing a bucket (only needed for model-only filters)."""
+    series: Dict[int, Dict[str, Any]] = {}
+    for r in rows:
+        s = series.get(r["bucket"])
+        if s is None:
+            series[r["bucket"]] = {
+                "bucket": r["bucket"], "calls": r["calls"], "errors": r["errors"],
+                "input_tokens": r["input_tokens"], "output_tokens": r["output_tokens"],
+                "total_tokens": r["total_tokens"], "latency_avg": r["latency_avg"],
+                "latency_p50": r["latency_p50"], "latency_p95": r["latency_p95"],
+                "latency_p99": r["latency_p99"],
+            }
+            continue
+        # Percentiles do not merge exactly; use the call-weighted average
+        total = s["calls"] + r["calls"]
+        for k in ("latency_avg", "latency_p50", "latency_p95", "latency_p99"):
+            s[k] = (s[k] * s["calls"] + r[k] * r["calls"]) / total
+        for k in ("calls", "errors", "input_tokens", "output_tokens", "total_tokens"):
+            s[k] += r[k]
+    for s in series.values():
+        s["error_rate"] = s["errors"] / s["calls"] if s["calls"] else 0.0
+    return list(series.values())
+
+
+_store: Optional[UsageStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> UsageStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = UsageStore()
+    return _store
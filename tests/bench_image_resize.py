@@ -0,0 +1,110 @@
+"""
+Benchmark: ImagePrep resize paths (not collected by pytest).
+
+Compares, for one tensor batch:
+  pil     full-resolution uint8 conversion, then PIL LANCZOS per frame
+          (the path used before tensor-space resizing)
+  tensor  one antialiased bicubic F.interpolate over the batch, then uint8
+          conversion of the small result (current ImagePrep path)
+
+Quality is reported as PSNR of each path against an area-average reference
+computed in float; the test pattern mixes smooth gradients with a zone plate
+so aliasing shows up as a PSNR drop.
+
+    python tests/bench_image_resize.py --frames 16 --size 3840x2160 --target 1024
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "nodes"))
+from image_prep import ImagePrep  # noqa: E402
+
+
+def make_batch(frames: int, width: int, height: int) -> torch.Tensor:
+    y = torch.linspace(-1, 1, height)[:, None]
+    x = torch.linspace(-1, 1, width)[None, :]
+    zone = 0.5 + 0.5 * torch.cos(400 * (x * x + y * y))
+    batch = []
+    for i in range(frames):
+        r = 0.5 + 0.5 * torch.sin(3 * x + i * 0.3) * torch.cos(2 * y)
+        g = (x + 1) / 2 * torch.ones_like(y)
+        b = 0.6 * zone + 0.4 * (y + 1) / 2
+        batch.append(torch.stack([r, g, b], dim=-1))
+    return torch.stack(batch)
+
+
+def target_size(width: int, height: int, target: int):
+    scale = target / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def pil_path(prep: ImagePrep, batch: torch.Tensor, size) -> np.ndarray:
+    pixels, mode = prep._tensor_to_uint8(batch)
+    frames = prep._frames_to_pil(pixels, mode)
+    out = [f.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0).convert("RGB") for f in frames]
+    return np.stack([np.asarray(f) for f in out])
+
+
+def tensor_path(prep: ImagePrep, batch: torch.Tensor, target: int) -> np.ndarray:
+    small = prep._downscale_batch(batch, lambda w, h: target)
+    pixels, mode = prep._tensor_to_uint8(small)
+    frames = prep._frames_to_pil(pixels, mode)
+    return np.stack([np.asarray(f.convert("RGB")) for f in frames])
+
+
+def reference(batch: torch.Tensor, size) -> np.ndarray:
+    out = F.interpolate(batch.permute(0, 3, 1, 2), size=(size[1], size[0]), mode="area")
+    return (out.permute(0, 2, 3, 1).clamp(0, 1) * 255).numpy()
+
+
+def psnr(a: np.ndarray, ref: np.ndarray) -> float:
+    mse = float(np.mean((a.astype(np.float64) - ref) ** 2))
+    return math.inf if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def best_of(func, repeat: int):
+    best, result = math.inf, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", type=int, default=8)
+    parser.add_argument("--size", default="3840x2160", help="source WxH")
+    parser.add_argument("--target", type=int, default=1024, help="long side after resize")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    width, height = map(int, args.size.lower().split("x"))
+    size = target_size(width, height, args.target)
+    batch = make_batch(args.frames, width, height)
+    prep = ImagePrep()
+    ref = reference(batch, size)
+
+    print(f"{args.frames} frame(s) {width}x{height} -> {size[0]}x{size[1]}, "
+          f"torch threads={torch.get_num_threads()}, best of {args.repeat}")
+    results = {}
+    for name, func in (("pil", lambda: pil_path(prep, batch, size)),
+                       ("tensor", lambda: tensor_path(prep, batch, args.target))):
+        seconds, out = best_of(func, args.repeat)
+        results[name] = out
+        print(f"  {name:<7} {seconds * 1000:8.1f} ms  {seconds * 1000 / args.frames:7.1f} ms/frame  "
+              f"PSNR vs reference {psnr(out, ref):5.2f} dB")
+    print(f"  tensor vs pil: PSNR {psnr(results['tensor'], results['pil'].astype(np.float64)):5.2f} dB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Unit tests for nodes/glossary.py: parsing and Aho-Corasick term matching."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "nodes"))
+import glossary as glossary_module  # noqa: E402
+from glossary import Glossary, compile_glossary, parse_glossary  # noqa: E402
+
+
+def sources(text, glossary):
+    g = Glossary(glossary)
+    return [g.entries[i].source for i in g.matches(text)]
+
+
+def test_parse_separators_comments_and_instructions():
+    entries, instructions = parse_glossary(
+        "cat = chat\n"
+        "dog => chien\n"
+        "bird -> oiseau\n"
+        "fish → poisson\n"
+        "horse\tcheval\n"
+        "\n"
+        "# a comment\n"
+        "Keep brand names in English\n"
+        "= no source\n"
+    )
+    assert [e.source for e in entries] == ["cat", "dog", "bird", "fish", "horse"]
+    assert entries[1].line == "dog => chien"   # injected as written
+    assert instructions == ["Keep brand names in English", "= no source"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("a party tonight", []),
+    ("modern art", ["art"]),
+    ("Art.", ["art"]),
+    ("art's history", ["art"]),
+    ("artist", []),
+    ("(art)", ["art"]),
+    ("art_deco", []),
+    ("art2", []),
+])
+def test_latin_terms_match_whole_words_only(text, expected):
+    assert sources(text, "art = arte") == expected
+
+
+def test_matching_is_case_insensitive():
+    assert sources("NEW YORK at night", "New York = Nueva York") == ["New York"]
+
+
+def test_cjk_terms_match_anywhere():
+    glossary = "东京 = Tokyo\n猫 = cat"
+    assert sources("我在东京看到一只猫。", glossary) == ["东京", "猫"]
+    assert sources("Tokyo东京Tower", glossary) == ["东京"]
+
+
+def test_terms_ending_in_punctuation_have_no_trailing_boundary():
+    assert sources("I write C++code", "C++ = C++") == ["C++"]
+    assert sources("Apple C++", "C++ = C++") == ["C++"]
+
+
+def test_overlapping_and_nested_terms():
+    glossary = "he = il\nshe = elle\nhers = les siens\nhis = son\nice cream = glace\ncream = crème"
+    assert sources("ushers", glossary) == []   # all inside one word
+    assert sources("she said hers", glossary) == ["she", "hers"]
+    assert sources("ice cream", glossary) == ["ice cream", "cream"]
+    assert sources("he and his", glossary) == ["he", "his"]
+
+
+def test_matches_are_in_glossary_order_and_unique():
+    g = Glossary("b = 2\na = 1\nc = 3")
+    assert g.matches("a b a c b") == [0, 1, 2]
+
+
+def test_lines_put_instructions_first():
+    g = Glossary("cat = chat\nBe formal\ndog = chien")
+    assert g.lines(g.matches("dog")) == ["Be formal", "dog = chien"]
+    assert g.size == 2
+
+
+def test_empty_glossary_and_text():
+    assert compile_glossary("") is None
+    assert compile_glossary("  \n ") is None
+    assert Glossary("cat = chat").matches("") == []
+    assert Glossary("# only a comment").matches("anything") == []
+
+
+def test_compile_glossary_is_cached_by_content(monkeypatch):
+    monkeypatch.setattr(glossary_module, "_cache", type(glossary_module._cache)())
+    first = compile_glossary("cat = chat")
+    assert compile_glossary("cat = chat") is first
+    for i in range(glossary_module._CACHE_SIZE):
+        compile_glossary(f"term{i} = x")
+    assert compile_glossary("cat = chat") is not first   # evicted, least recently used first
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("İSTANBUL art", ["İstanbul", "art"]),
+    ("İart", []),                      # "İ" folds to two characters: still one word
+    ("İİ art", ["art"]),               # boundaries stay aligned after the longer fold
+    ("İ", []),                         # "i" must not match half of "İ"
+    ("STRASSE", ["Straße"]),
+    ("über café", []),                 # non-ASCII letters are word characters
+    ("кот! котик", ["кот"]),
+])
+def test_case_folding_keeps_word_boundaries(text, expected):
+    glossary = "İstanbul = Istanbul\nart = arte\nStraße = street\nber = x\ncaf = y\ni = z\nкот = cat"
+    assert sources(text, glossary) == expected
@@ -0,0 +1,188 @@
+"""Unit tests for nodes/json_stream.py (StreamingJSONValidator)."""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "nodes"))
+from json_stream import JSONStreamError, StreamingJSONValidator, load_schema  # noqa: E402
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "minLength": 1, "maxLength": 20},
+        "mood": {"enum": ["happy", "sad"]},
+        "age": {"type": "integer", "minimum": 0, "maximum": 150},
+        "score": {"type": "number", "exclusiveMinimum": 0, "exclusiveMaximum": 1},
+        "tags": {"type": "array", "items": {"type": "string"}, "minItems": 1, "maxItems": 3},
+        "ok": {"type": "boolean"},
+        "kind": {"const": "person"},
+    },
+    "required": ["name", "age"],
+    "additionalProperties": False,
+}
+
+VALID = {"name": "Ada 😀 \"q\"\n", "mood": "happy", "age": 36, "score": 0.5,
+         "tags": ["a", "b"], "ok": True, "kind": "person"}
+
+
+def run(text, schema=None, step=None):
+    """Feed `text` in pieces of `step` characters (all at once when None) and close."""
+    v = StreamingJSONValidator(schema)
+    step = step or len(text) or 1
+    for i in range(0, len(text), step):
+        v(text[i:i + step])
+    return v.close()
+
+
+# ── Chunk boundaries ─────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("step", [1, 2, 3, 5, 7, None])
+def test_any_split_gives_the_same_document(step):
+    text = json.dumps(VALID)
+    assert json.loads(run(text, SCHEMA, step)) == VALID
+
+
+@pytest.mark.parametrize("step", [1, 3])
+def test_escapes_split_across_deltas(step):
+    text = '{"name": "a\\u00e9\\n\\"b\\ud83d\\ude00", "age": 1}'
+    assert json.loads(run(text, SCHEMA, step))["name"] == 'aé\n"b😀'
+
+
+def test_number_finished_by_closing_bracket_in_next_delta():
+    v = StreamingJSONValidator({"type": "array", "items": {"type": "integer"}})
+    for piece in ("[1", "2", "3", "]"):
+        v(piece)
+    assert json.loads(v.close()) == [123]
+
+
+def test_text_after_the_document_is_ignored():
+    assert run('{"a": 1}\nDone!') == '{"a": 1}'
+
+
+def test_reasoning_deltas_are_ignored():
+    v = StreamingJSONValidator()
+    v("", "thinking...")
+    v('{"a": [true, false, null]}')
+    assert json.loads(v.close()) == {"a": [True, False, None]}
+
+
+# ── Preamble: whitespace, <think>, fences ────────────────────────────────────
+
+@pytest.mark.parametrize("text", [
+    '  \n{"a": 1}',
+    '```json\n{"a": 1}\n```',
+    '```\n{"a": 1}```',
+    '<think>maybe {"a": 2}? no</think>\n{"a": 1}',
+    '<think>x</think>```json\n{"a": 1}\n```',
+])
+@pytest.mark.parametrize("step", [1, None])
+def test_preamble_is_stripped(text, step):
+    assert json.loads(run(text, step=step)) == {"a": 1}
+
+
+@pytest.mark.parametrize("text", ['Sure! {"a": 1}', 'json {"a": 1}', '<thinking>{"a": 1}'])
+def test_text_before_the_document_fails(text):
+    with pytest.raises(JSONStreamError):
+        run(text, step=1)
+
+
+def test_failure_is_raised_early_with_position():
+    v = StreamingJSONValidator()
+    with pytest.raises(JSONStreamError) as e:
+        v('Hello, here is the JSON you asked for')
+    assert e.value.position == 0
+
+
+# ── Incomplete and malformed output ──────────────────────────────────────────
+
+@pytest.mark.parametrize("text", ["", "   ", '{"a": 1', '{"a": "b', "[1, 2", "<think>{}"])
+def test_incomplete_output_fails_on_close(text):
+    with pytest.raises(JSONStreamError, match="output ended"):
+        run(text)
+
+
+@pytest.mark.parametrize("text", [
+    '{"a" 1}', '{"a": 1,}', '[1 2]', '{"a": tru}', '{"a": 01}', '{"a": 1.}',
+    '{"a": -}', '{"a": 1e}', '{"a": "\\x"}', '{"a": "\\u12g4"}', '{"a": "line\nbreak"}', "{'a': 1}",
+])
+def test_malformed_json_fails(text):
+    with pytest.raises(JSONStreamError):
+        run(text, step=1)
+
+
+# ── Schema violations ────────────────────────────────────────────────────────
+
+def with_(**changes):
+    doc = dict(VALID)
+    for key, value in changes.items():
+        if value is ...:
+            del doc[key]
+        else:
+            doc[key] = value
+    return json.dumps(doc)
+
+
+@pytest.mark.parametrize("text, reason", [
+    (with_(name=5), "expected string"),
+    (with_(name=""), "shorter than 1"),
+    (with_(name="x" * 21), "longer than 20"),
+    (with_(mood="angry"), "not one of the allowed values"),
+    (with_(mood=1), "not one of the allowed values"),
+    (with_(age=1.5), "expected an integer"),
+    (with_(age=-1), "violates minimum 0"),
+    (with_(age=151), "violates maximum 150"),
+    (with_(score=0), "violates exclusiveMinimum 0"),
+    (with_(score=1), "violates exclusiveMaximum 1"),
+    (with_(tags=[]), "fewer than 1 items"),
+    (with_(tags=["a", "b", "c", "d"]), "more than 3 items"),
+    (with_(tags=["a", 2]), "expected string"),
+    (with_(ok="yes"), "expected boolean"),
+    (with_(kind="robot"), "not one of the allowed values"),
+    (with_(age=...), "missing required key(s) 'age'"),
+    (with_(extra=1), "unexpected key"),
+    ("[]", "expected object, got array"),
+])
+@pytest.mark.parametrize("step", [1, None])
+def test_schema_violation(text, reason, step):
+    with pytest.raises(JSONStreamError) as e:
+        run(text, SCHEMA, step)
+    assert reason in e.value.reason
+
+
+def test_enum_and_key_prefixes_fail_before_the_string_ends():
+    v = StreamingJSONValidator(SCHEMA)
+    with pytest.raises(JSONStreamError, match="allowed values"):
+        v('{"name": "x", "age": 1, "mood": "ha')   # a prefix of "happy" is still fine
+        v("ng")
+    v = StreamingJSONValidator(SCHEMA)
+    with pytest.raises(JSONStreamError, match="unexpected key starting with 'zz'"):
+        v('{"zz')
+
+
+def test_booleans_are_not_numbers_in_enums():
+    with pytest.raises(JSONStreamError):
+        run('{"a": true}', {"properties": {"a": {"enum": [1]}}})
+    assert run('{"a": 1}', {"properties": {"a": {"enum": [1, True]}}}) == '{"a": 1}'
+
+
+def test_additional_properties_schema_applies_to_unlisted_keys():
+    schema = {"type": "object", "additionalProperties": {"type": "integer"}}
+    assert json.loads(run('{"x": 1, "y": 2}', schema)) == {"x": 1, "y": 2}
+    with pytest.raises(JSONStreamError, match="expected integer"):
+        run('{"x": "1"}', schema)
+
+
+# ── load_schema ──────────────────────────────────────────────────────────────
+
+def test_load_schema_accepts_bare_and_wrapped_schemas():
+    assert load_schema("") is None
+    assert load_schema('{"type": "object"}') == {"type": "object"}
+    assert load_schema('{"name": "r", "schema": {"type": "array"}}') == {"type": "array"}
+    with pytest.raises(ValueError):
+        load_schema("{nope")
+    with pytest.raises(ValueError):
+        load_schema("[1]")
@@ -0,0 +1,93 @@
+"""Unit tests for nodes/protected_spans.py: placeholders and their restoration."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "nodes"))
+from protected_spans import Protected, protect  # noqa: E402
+
+
+SRT = "1\n00:00:01,000 --> 00:00:02,000\n<i>Hello</i> there\n\n2\n00:00:03,000 --> 00:00:04,000\nBye"
+
+
+@pytest.mark.parametrize("text, protected, spans", [
+    ("<lora:x:0.8> a cat, (red:1.2) hat", "⟦1⟧ a cat, (red⟦2⟧) hat", ["<lora:x:0.8>", ":1.2"]),
+    ("[word:0.5] nice", "[word⟦1⟧] nice", [":0.5"]),
+    ("see https://x.com/a?b=1 and `code` and embedding:foo_bar", "see ⟦1⟧ and ⟦2⟧ and ⟦3⟧",
+     ["https://x.com/a?b=1", "`code`", "embedding:foo_bar"]),
+    ("{\\an8}Top text", "⟦1⟧Top text", ["{\\an8}"]),
+    ("```\nx = 1\n```\ntext", "⟦1⟧\ntext", ["```\nx = 1\n```"]),
+    (SRT, "⟦1⟧Hello⟦2⟧ there\n\n⟦3⟧\nBye",
+     ["1\n00:00:01,000 --> 00:00:02,000\n<i>", "</i>", "2\n00:00:03,000 --> 00:00:04,000"]),
+])
+def test_protect(text, protected, spans):
+    p = protect(text)
+    assert (p.text, p.spans) == (protected, spans)
+    assert p.restore(p.text) == (text, True)
+
+
+def test_adjacent_spans_share_a_placeholder():
+    p = protect("<lora:a:1>, <lora:b:0.5> cat")
+    assert p.text == "⟦1⟧ cat"
+    assert p.spans == ["<lora:a:1>, <lora:b:0.5>"]
+
+
+@pytest.mark.parametrize("text", ["a plain sentence", "ratio 3:2 (fine)", "time 12:30 today", ""])
+def test_nothing_to_protect(text):
+    p = protect(text)
+    assert (p.text, p.spans) == (text, [])
+    assert p.restore("anything") == ("anything", True)
+
+
+def test_text_with_placeholder_brackets_is_left_alone():
+    p = protect("already ⟦1⟧ here <lora:x:1>")
+    assert p.spans == [] and p.text == "already ⟦1⟧ here <lora:x:1>"
+
+
+def test_same_text_with_different_spans_protects_the_same():
+    assert protect("<lora:a:1> a cat").text == protect("<lora:b:0.3> a cat").text
+
+
+def test_restore_in_translated_order_and_spacing():
+    p = protect("<lora:x:0.8> a cat, (red:1.2) hat")
+    assert p.restore("un chat ⟦ 1 ⟧, chapeau (rouge⟦2⟧)") == (
+        "un chat <lora:x:0.8>, chapeau (rouge:1.2)", True)
+
+
+def test_dropped_placeholder_is_appended():
+    p = protect("<lora:x:0.8> a cat, (red:1.2) hat")
+    restored, intact = p.restore("un chat, (rouge⟦2⟧) chapeau  ")
+    assert not intact
+    assert restored == "un chat, (rouge:1.2) chapeau <lora:x:0.8>"
+    assert p.restore("") == ("<lora:x:0.8> :1.2", False)
+
+
+def test_duplicated_placeholder_is_not_intact():
+    p = protect("<lora:x:0.8> cat")
+    restored, intact = p.restore("⟦1⟧ chat ⟦1⟧")
+    assert restored == "<lora:x:0.8> chat <lora:x:0.8>"
+    assert not intact
+
+
+def test_unknown_placeholder_is_kept_verbatim():
+    p = protect("<lora:x:0.8> cat")
+    assert p.restore("⟦1⟧ chat ⟦7⟧") == ("<lora:x:0.8> chat ⟦7⟧", True)
+
+
+@pytest.mark.parametrize("text, translatable", [
+    ("⟦1⟧ a cat", True),
+    ("⟦1⟧ 12, ⟦2⟧.", False),
+    ("", False),
+    ("猫", True),
+])
+def test_translatable(text, translatable):
+    assert Protected(text).translatable is translatable
+
+
+def test_fill_restores_partial_text_without_appending():
+    p = protect("<lora:x:0.8> a cat, (red:1.2) hat")
+    assert p.fill("un chat ⟦1⟧, (rouge") == "un chat <lora:x:0.8>, (rouge"
+    assert p.fill("⟦9⟧ ⟦2") == "⟦9⟧ ⟦2"
+    assert protect("plain").fill("texte ⟦1⟧") == "texte ⟦1⟧"
@@ -0,0 +1,119 @@
+"""Unit tests for nodes/text_chunker.py: layout-preserving splits."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "nodes"))
+from text_chunker import is_srt, split_segments, split_srt, split_text  # noqa: E402
+from token_estimator import count_text  # noqa: E402
+
+
+PROSE = (
+    "  Indented first line. Second sentence!   Third one?\n"
+    "Same paragraph, new line…\n\n\n"
+    "\tTabbed paragraph. With two sentences.\n"
+    "\n"
+    "Last paragraph without a trailing newline"
+)
+CJK = "今天天气很好。我们去公园吧！你觉得呢？好的；走吧\n\n第二段。结束。"
+MIXED = "Hello world. 你好，世界。Bonjour! Ça va?\n\n" + "Long sentence with many words " * 40 + "end."
+UNBROKEN = "x" * 5000
+TEXTS = [PROSE, CJK, MIXED, UNBROKEN, "", "one", "\n\n", "a\n\nb\n\n"]
+
+
+def joined(chunks):
+    return "".join(c.text + c.sep for c in chunks)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("max_tokens", [0, 1, 5, 20, 100, 100000])
+def test_split_text_round_trips(text, max_tokens):
+    assert joined(split_text(text, max_tokens)) == text
+
+
+@pytest.mark.parametrize("text", [PROSE, CJK])
+@pytest.mark.parametrize("max_tokens", [8, 12, 20])
+def test_split_text_respects_the_budget(text, max_tokens):
+    chunks = split_text(text, max_tokens)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert count_text(chunk.text) <= max_tokens
+
+
+def test_split_text_prefers_paragraphs():
+    chunks = split_text(PROSE, count_text(PROSE) - 1)
+    assert len(chunks) == 2
+    assert chunks[0].sep.strip() == "" and chunks[0].sep.count("\n") >= 2
+    assert chunks[0].text.startswith("  Indented")   # leading whitespace kept
+
+
+def test_run_on_text_is_cut_to_about_the_budget():
+    chunks = split_text(MIXED, 30)
+    assert all(count_text(c.text) <= 30 * 1.1 for c in chunks)
+
+
+def test_small_text_is_one_chunk():
+    assert [c.text for c in split_text(PROSE, 0)] == [PROSE]
+    assert [c.text for c in split_text("short", 10)] == ["short"]
+
+
+def test_unbreakable_text_is_hard_split():
+    chunks = split_text(UNBROKEN, 50)
+    assert len(chunks) > 1 and all(c.sep == "" for c in chunks)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_split_segments_round_trips(text):
+    assert joined(split_segments(text)) == text
+
+
+def test_split_segments_cjk_punctuation():
+    texts = [c.text for c in split_segments(CJK)]
+    assert texts == ["今天天气很好。", "我们去公园吧！", "你觉得呢？", "好的；", "走吧", "第二段。", "结束。"]
+    assert split_segments(CJK)[4].sep == "\n\n"
+
+
+def test_split_segments_sentences_and_separators():
+    chunks = split_segments("One. Two!  Three?\n\nFour.")
+    assert [c.text for c in chunks] == ["One.", "Two!", "Three?", "Four."]
+    assert [c.sep for c in chunks] == [" ", "  ", "\n\n", ""]
+
+
+def test_split_segments_keeps_vtt_cues_whole():
+    cue = "00:00:01.000 --> 00:00:02.000\nHello. How are you?"
+    chunks = split_segments("WEBVTT\n\n" + cue + "\n\nAfter. Cue.")
+    assert cue in [c.text for c in chunks]
+
+
+SRT = (
+    "﻿1\r\n00:00:01,000 --> 00:00:02,000\r\nHello there.\r\nSecond line\r\n\r\n"
+    "2\r\n00:00:03,000 --> 00:00:04,500 X1:10\r\n<i>Bye.</i>\r\n\r\n"
+    "3\r\n00:00:05,000 --> 00:00:06,000\r\n\r\n"
+    "4\r\n00:00:07,000 --> 00:00:08,000\r\nLast"
+)
+
+
+@pytest.mark.parametrize("text", [SRT, SRT.replace("\r\n", "\n"), SRT + "\r\n\r\n", "\n\n" + SRT.lstrip("﻿")])
+def test_split_srt_round_trips(text):
+    assert is_srt(text)
+    assert joined(split_srt(text)) == text
+
+
+def test_split_srt_sends_only_cue_text():
+    texts = [c.text for c in split_srt(SRT) if c.text.strip()]
+    assert texts == ["Hello there.\r\nSecond line", "<i>Bye.</i>", "Last"]
+    for chunk in split_srt(SRT):
+        assert "-->" not in chunk.text
+
+
+def test_split_srt_keeps_stray_text():
+    text = "1\n00:00:01,000 --> 00:00:02,000\nHi\n\nnot a cue\n\n2\n00:00:03,000 --> 00:00:04,000\nBye\n"
+    assert "not a cue" in [c.text for c in split_srt(text)]
+    assert joined(split_srt(text)) == text
+
+
+@pytest.mark.parametrize("text", ["hello", "", "1\nno timing", "00:00:01,000 --> 00:00:02,000\nno index"])
+def test_not_srt(text):
+    assert not is_srt(text)
@@ -0,0 +1,114 @@
+"""Unit tests for nodes/translation_memory.py: keys, lookups and LRU eviction by bytes."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "nodes"))
+import translation_memory  # noqa: E402
+from translation_memory import TranslationMemory, glossary_digest, normalize, segment_key  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(translation_memory.time, "time", c)
+    return c
+
+
+def row(key, size=100, target="t"):
+    """A row whose source + target take exactly `size` bytes."""
+    return key, "s" * (size - len(target)), target, "French", "m"
+
+
+def keys(memory):
+    conn = memory._connect()
+    try:
+        return {k for (k,) in conn.execute("SELECT key FROM tm")}
+    finally:
+        conn.close()
+
+
+def test_normalize_and_keys():
+    assert normalize("  Hello\n\t world ") == "Hello world"
+    assert normalize("é") == "é"   # NFC
+    key = segment_key("Hello  world", "French", glossary_digest(""), "m")
+    assert key == segment_key(" Hello world ", "French", glossary_digest(""), "m")
+    for other in (("hello world", "French", ""), ("Hello world", "German", ""), ("Hello world", "French", "a = b")):
+        assert segment_key(other[0], other[1], glossary_digest(other[2]), "m") != key
+    assert segment_key("Hello world", "French", glossary_digest(""), "m2") != key
+    assert glossary_digest("b = 2\n\na = 1") == glossary_digest("a = 1\nb = 2\n")
+
+
+def test_store_and_lookup(tmp_path, clock):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), max_bytes=10_000)
+    memory.store([row("a", target="A"), row("b", target="B")])
+    assert memory.lookup(["a", "b", "c", "a"]) == {"a": "A", "b": "B"}
+    stats = memory.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 2, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+    memory.store([row("a", target="A2")])   # replace
+    assert memory.lookup(["a"]) == {"a": "A2"}
+    assert memory.stats()["entries"] == 2
+
+
+def test_eviction_is_least_recently_used_by_bytes(tmp_path, clock):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), max_bytes=1000)
+    for key in "abcdefghij":   # 10 x 100 bytes: exactly the budget
+        clock.now += 1
+        memory.store([row(key)])
+    assert len(keys(memory)) == 10
+
+    clock.now += 1
+    memory.lookup(["a", "b"])   # a and b become the most recently used
+    clock.now += 1
+    memory.store([row("k", size=250)])   # 1250 bytes -> evict down to 900
+    assert keys(memory) == set("abghijk")
+    assert memory.stats()["bytes"] <= 900
+
+
+def test_eviction_order_ties_follow_insertion(tmp_path, clock):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), max_bytes=500)
+    memory.store([row(k) for k in "abcde"])   # same timestamp
+    memory.store([row("f")])
+    assert keys(memory) == set("cdef")
+
+
+def test_disabled_memory_does_nothing(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), max_bytes=0)
+    assert not memory.enabled
+    memory.store([row("a")])
+    assert memory.lookup(["a"]) == {}
+    assert not (tmp_path / "tm.db").exists()
+
+
+def test_max_bytes_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_TOOLKIT_TM_MB", "0.5")
+    assert TranslationMemory("unused").max_bytes == 512 * 1024
+    monkeypatch.setenv("LLM_TOOLKIT_TM_MB", "lots")
+    assert TranslationMemory("unused").max_bytes == 64 * 1024 * 1024
+
+
+def test_database_errors_fall_back_to_a_miss(tmp_path):
+    path = tmp_path / "tm.db"
+    path.write_bytes(b"not a database" * 100)
+    memory = TranslationMemory(str(path), max_bytes=10_000)
+    assert memory.lookup(["a"]) == {}
+    memory.store([row("a")])   # logged, not raised
+
+
+def test_clear(tmp_path, clock):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), max_bytes=10_000)
+    memory.store([row("a"), row("b")])
+    memory.clear()
+    assert memory.lookup(["a", "b"]) == {}
+    assert memory.stats()["entries"] == 0
@@ -0,0 +1,214 @@
+"""Unit tests for nodes/usage_store.py: rollups, percentiles and incremental ingestion."""
+
+import json
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "nodes"))
+import usage_store  # noqa: E402
+from usage_store import UsageStore  # noqa: E402
+
+
+HOUR = 3600
+T0 = 1_700_000_000 // HOUR * HOUR   # bucket-aligned start
+BIN = 10 ** (1 / usage_store._HIST_PER_DECADE)   # width ratio of one histogram bin
+
+
+def record(ts, provider="p1", model="m1", elapsed=100, status="ok", inp=10, out=5):
+    return {"timestamp": ts, "provider": provider, "model": model, "input_tokens": inp,
+            "output_tokens": out, "total_tokens": inp + out, "elapsed_ms": elapsed, "status": status}
+
+
+def append(path, records, newline=True):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(json.dumps(r) for r in records) + ("\n" if newline else ""))
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "usage.jsonl"), str(tmp_path / "usage.db")
+
+
+@pytest.fixture
+def sample():
+    rng = np.random.default_rng(7)
+    out = []
+    for i in range(3000):
+        out.append(record(
+            T0 + i * 7,   # spans ~6 hours
+            provider=("p1", "p2")[i % 2],
+            model=("m1", "m2", "m3")[i % 3],
+            elapsed=int(rng.lognormal(6, 0.8)),
+            status="error" if i % 17 == 0 else "ok",
+            inp=int(rng.integers(1, 500)),
+            out=int(rng.integers(1, 300)),
+        ))
+    return out
+
+
+def store_with(paths, records):
+    usage, db = paths
+    append(usage, records)
+    return UsageStore(db, usage)
+
+
+# ── Rollup totals vs raw records ─────────────────────────────────────────────
+
+@pytest.mark.parametrize("granularity", ["minute", "hour"])
+def test_summary_totals_match_raw_records(paths, sample, granularity):
+    summary = store_with(paths, sample).summary(granularity=granularity)
+    totals = summary["totals"]
+    assert totals["calls"] == len(sample)
+    assert totals["errors"] == sum(r["status"] == "error" for r in sample)
+    for key in ("input_tokens", "output_tokens", "total_tokens"):
+        assert totals[key] == sum(r[key] for r in sample)
+        assert sum(s[key] for s in summary["series"]) == totals[key]
+    assert totals["latency_avg"] == pytest.approx(np.mean([r["elapsed_ms"] for r in sample]))
+    assert sum(m["calls"] for m in summary["by_model"]) == len(sample)
+
+
+@pytest.mark.parametrize("provider, model", [("p1", None), (None, "m2"), ("p2", "m3")])
+def test_filtered_summary_matches_raw_records(paths, sample, provider, model):
+    summary = store_with(paths, sample).summary(provider=provider, model=model)
+    picked = [r for r in sample
+              if (provider is None or r["provider"] == provider) and (model is None or r["model"] == model)]
+    assert summary["totals"]["calls"] == len(picked)
+    assert summary["totals"]["total_tokens"] == sum(r["total_tokens"] for r in picked)
+    assert summary["totals"]["latency_avg"] == pytest.approx(np.mean([r["elapsed_ms"] for r in picked]))
+
+
+def test_summary_range_selects_whole_buckets(paths, sample):
+    store = store_with(paths, sample)
+    summary = store.summary(start=T0 + HOUR, end=T0 + 3 * HOUR)
+    picked = [r for r in sample if T0 + HOUR <= r["timestamp"] < T0 + 3 * HOUR]
+    assert [s["bucket"] for s in summary["series"]] == [T0 + HOUR, T0 + 2 * HOUR]
+    assert summary["totals"]["calls"] == len(picked)
+
+
+def test_summary_does_not_read_raw_records(paths, sample):
+    store = store_with(paths, sample)
+    store.ingest()
+    conn = sqlite3.connect(paths[1])
+    conn.execute("DELETE FROM usage")   # totals must come from the rollups alone
+    conn.commit()
+    conn.close()
+    assert store.summary()["totals"]["calls"] == len(sample)
+
+
+def test_empty_store_summary(paths):
+    usage, db = paths
+    summary = UsageStore(db, usage).summary()
+    assert summary["totals"]["calls"] == 0
+    assert summary["series"] == [] and summary["by_model"] == []
+
+
+# ── Percentiles ──────────────────────────────────────────────────────────────
+
+def test_bucket_percentiles_are_exact(paths):
+    latencies = list(range(1, 1001))   # one bucket, uniform 1..1000 ms
+    store = store_with(paths, [record(T0 + i % HOUR, elapsed=v) for i, v in enumerate(latencies)])
+    (bucket,) = store.summary()["series"]
+    expected = np.percentile(latencies, [50, 95, 99])
+    assert [bucket["latency_p50"], bucket["latency_p95"], bucket["latency_p99"]] == pytest.approx(expected)
+    assert bucket["latency_avg"] == pytest.approx(500.5)
+
+
+def test_total_percentiles_within_one_histogram_bin(paths, sample):
+    totals = store_with(paths, sample).summary()["totals"]
+    exact = np.percentile([r["elapsed_ms"] for r in sample], [50, 95, 99])
+    for key, value in zip(("latency_p50", "latency_p95", "latency_p99"), exact):
+        assert value / BIN <= totals[key] <= value * BIN
+
+
+def test_constant_latency_percentiles(paths):
+    records = [record(T0 + h * HOUR, elapsed=250) for h in range(5)]
+    totals = store_with(paths, records).summary()["totals"]
+    for key in ("latency_p50", "latency_p95", "latency_p99"):
+        assert 250 / BIN <= totals[key] <= 250 * BIN
+
+
+def test_histogram_edges():
+    bins = usage_store._latency_bins(np.array([0.0, 0.5, 1.0, 9.99, 10.0, 1e12]))
+    assert list(bins[:2]) == [0, 0]
+    assert bins[2] == 1
+    assert bins[4] == usage_store._HIST_PER_DECADE + 1
+    assert bins[5] == usage_store._HIST_BINS - 1
+    hist = usage_store._sum_hists([usage_store._encode_hist(np.array([0]), np.array([3])), None, b""])
+    assert usage_store._hist_percentiles(hist) == [0.0, 0.0, 0.0]
+    assert usage_store._hist_percentiles(np.zeros(usage_store._HIST_BINS)) == [0.0, 0.0, 0.0]
+
+
+def test_old_rollups_gain_histograms(paths, sample):
+    store = store_with(paths, sample)
+    expected = store.summary()["totals"]
+    conn = sqlite3.connect(paths[1])
+    conn.executescript(
+        "CREATE TABLE old AS SELECT granularity, bucket, provider, model, calls, errors, input_tokens, "
+        "output_tokens, total_tokens, latency_avg, latency_p50, latency_p95, latency_p99 FROM rollup;"
+        "DROP TABLE rollup; ALTER TABLE old RENAME TO rollup;")
+    conn.close()
+    assert UsageStore(paths[1], paths[0]).summary()["totals"] == pytest.approx(expected)
+
+
+# ── Incremental ingestion ────────────────────────────────────────────────────
+
+def test_ingest_is_incremental(paths):
+    usage, db = paths
+    store = UsageStore(db, usage)
+    append(usage, [record(T0 + i) for i in range(10)])
+    assert store.ingest() == 10
+    assert store.ingest() == 0
+    append(usage, [record(T0 + 100 + i) for i in range(5)])
+    assert store.ingest() == 5
+    assert store.records(limit=1000)["total"] == 15
+
+
+def test_partial_line_waits_for_its_newline(paths):
+    usage, db = paths
+    store = UsageStore(db, usage)
+    append(usage, [record(T0), record(T0 + 1)], newline=False)
+    assert store.ingest() == 1
+    with open(usage, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert store.ingest() == 1
+    assert store.records()["total"] == 2
+
+
+def test_reingest_after_rotation(paths):
+    usage, db = paths
+    store = UsageStore(db, usage)
+    append(usage, [record(T0 + i) for i in range(10)])
+    assert store.ingest() == 10
+    # Rotation: more lines land in the active file, which is then renamed (same inode)
+    append(usage, [record(T0 + 10 + i) for i in range(3)])
+    os.replace(usage, usage.replace("usage.jsonl", "usage-20240101-000000.jsonl"))
+    append(usage, [record(T0 + 20 + i) for i in range(4)])
+    assert store.ingest() == 7   # the sealed tail and the new file, nothing twice
+    assert store.records(limit=1000)["total"] == 17
+    assert store.summary()["totals"]["calls"] == 17
+
+
+def test_pruned_segments_keep_their_records(paths):
+    usage, db = paths
+    store = UsageStore(db, usage)
+    sealed = usage.replace("usage.jsonl", "usage-20240101-000000.jsonl")
+    append(sealed, [record(T0 + i) for i in range(4)])
+    append(usage, [record(T0 + 10)])
+    assert store.ingest() == 5
+    os.remove(sealed)
+    assert store.ingest() == 0
+    assert store.records()["total"] == 5
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT COUNT(*) FROM ingest_state").fetchone()[0] == 1
+    conn.close()
+
+
+def test_bad_lines_are_skipped(paths):
+    usage, db = paths
+    with open(usage, "w", encoding="utf-8") as f:
+        f.write('not json\n{"no_timestamp": 1}\n' + json.dumps(record(T0)) + "\n")
+    assert UsageStore(db, usage).ingest() == 1
@@ -4,7 +4,7 @@ import { ComfyWidgets } from "../../../scripts/widgets.js";
 app.registerExtension({
     name: "ComfyUI-LLMs-Toolkit.displayTokens",
     async beforeRegisterNodeDef(nodeType, nodeData, app) {
-        if (nodeData.name !== "OpenAICompatibleLoader") return;
+        if (!["OpenAICompatibleLoader", "OpenAICompatibleBatch"].includes(nodeData.name)) return;
 
         // Remove any old logic regarding widget creation.
         // We will directly draw the token usage on the right side of the node onto the canvas.
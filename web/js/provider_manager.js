@@ -60,6 +60,8 @@ const I18N_DICT = {
         tokens_in_out: "Tokens (In/Out)",
         latency: "Latency",
         usage_load_err: "Failed to load usage data. Check logs.",
+        load_more: "Load more",
+        p95_latency: "P95 Latency",
         select_edit: "Select a provider from the sidebar to edit.",
         provider_name: "Provider Name",
         enable_nodes: "Enable in Nodes",
@@ -124,6 +126,8 @@ const I18N_DICT = {
         tokens_in_out: "Tokens (入/出)",
         latency: "延迟",
         usage_load_err: "加载用量数据失败，请检查日志。",
+        load_more: "加载更多",
+        p95_latency: "P95 延迟",
         select_edit: "请从左侧选择一个供应商进行编辑。",
         provider_name: "供应商名称",
         enable_nodes: "在节点中启用",
@@ -640,7 +644,11 @@ class ProviderManager {
             this.contentContainer.appendChild(loading);
 
             try {
-                const res = await api.fetchApi("/llm_toolkit/usage");
+                const PAGE_SIZE = 100;
+                const [res, summaryRes] = await Promise.all([
+                    api.fetchApi(`/llm_toolkit/usage/records?limit=${PAGE_SIZE}`),
+                    api.fetchApi("/llm_toolkit/usage/summary?granularity=hour"),
+                ]);
                 if (!res.ok) {
                     this.contentContainer.innerHTML = "";
                     if (res.status === 404) {
@@ -655,18 +663,19 @@ class ProviderManager {
                 this.contentContainer.innerHTML = "";
                 this.contentContainer.appendChild($el("h2", { textContent: t("usage_dashboard"), style: { margin: "0 0 12px 0" } }));
 
-                if (!data.usage || data.usage.length === 0) {
+                if (!data.records || data.records.length === 0) {
                     this.contentContainer.appendChild($el("div.llm-pm-empty", t("usage_empty")));
                     return;
                 }
 
-                // ── Summary Cards ──────────────────────────────────────
-                const rows = data.usage;
-                const totalCalls = rows.length;
-                const okCalls = rows.filter(r => r.status !== "error").length;
-                const errorCalls = totalCalls - okCalls;
-                const totalTokens = rows.reduce((s, r) => s + (r.total_tokens || 0), 0);
-                const avgLatency = Math.round(rows.reduce((s, r) => s + (r.elapsed_ms || 0), 0) / totalCalls);
+                // ── Summary Cards (pre-aggregated over the full history) ──
+                const totals = summaryRes.ok ? (await summaryRes.json()).totals : {};
+                const totalCalls = totals.calls ?? data.total;
+                const errorCalls = totals.errors ?? 0;
+                const okCalls = totalCalls - errorCalls;
+                const totalTokens = totals.total_tokens ?? 0;
+                const avgLatency = Math.round(totals.latency_avg ?? 0);
+                const p95Latency = Math.round(totals.latency_p95 ?? 0);
 
                 const cardStyle = { flex: "1", padding: "12px 16px", background: "var(--comfy-input-bg)", borderRadius: "8px", border: "1px solid var(--border-color)", textAlign: "center" };
                 const cardLabel = { fontSize: "0.75em", color: "var(--descrip-text)", marginBottom: "4px" };
@@ -691,6 +700,10 @@ class ProviderManager {
                         $el("div", { style: cardLabel, textContent: t("avg_latency") }),
                         $el("div", { style: cardValue, textContent: `${avgLatency} ms` })
                     ]),
+                    $el("div", { style: cardStyle }, [
+                        $el("div", { style: cardLabel, textContent: t("p95_latency") }),
+                        $el("div", { style: cardValue, textContent: `${p95Latency} ms` })
+                    ]),
                 ]);
                 this.contentContainer.appendChild(summaryRow);
 
@@ -702,8 +715,8 @@ class ProviderManager {
                 });
                 table.appendChild(thead);
 
-                // Show newest first
-                rows.reverse().forEach(row => {
+                // Records arrive newest first, one page at a time
+                const appendRows = (rows) => rows.forEach(row => {
                     const isError = row.status === "error";
                     const tr = $el("tr", { style: { borderBottom: "1px solid var(--border-color)", background: isError ? "rgba(244,67,54,0.08)" : "transparent" } });
                     const date = new Date(row.timestamp * 1000).toLocaleString();
@@ -716,8 +729,29 @@ class ProviderManager {
                     tr.appendChild($el("td", { style: { padding: "8px", color: "var(--descrip-text)" }, textContent: `${row.elapsed_ms} ms` }));
                     table.appendChild(tr);
                 });
+                appendRows(data.records);
+
+                let loaded = data.records.length;
+                const loadMoreBtn = $el("button.llm-pm-add-btn", {
+                    textContent: t("load_more"),
+                    style: { margin: "12px auto", width: "200px", display: loaded < data.total ? "block" : "none" },
+                    onclick: async () => {
+                        loadMoreBtn.disabled = true;
+                        try {
+                            const more = await api.fetchApi(`/llm_toolkit/usage/records?limit=${PAGE_SIZE}&offset=${loaded}`);
+                            if (more.ok) {
+                                const page = await more.json();
+                                appendRows(page.records);
+                                loaded += page.records.length;
+                                if (loaded >= page.total || page.records.length === 0) loadMoreBtn.style.display = "none";
+                            }
+                        } finally {
+                            loadMoreBtn.disabled = false;
+                        }
+                    }
+                });
 
-                const tableContainer = $el("div", { style: { overflowY: "auto", flex: "1" } }, [table]);
+                const tableContainer = $el("div", { style: { overflowY: "auto", flex: "1" } }, [table, loadMoreBtn]);
                 this.contentContainer.appendChild(tableContainer);
 
             } catch (e) {
@@ -1018,7 +1052,7 @@ app.registerExtension({
 
     // Node Interception for Dynamic Model Dropdowns
     async nodeCreated(node) {
-        const LINKED_NODES = ["OpenAICompatibleLoader", "LLMTranslator"];
+        const LINKED_NODES = ["OpenAICompatibleLoader", "OpenAICompatibleBatch", "LLMTranslator"];
         if (!LINKED_NODES.includes(node.comfyClass)) return;
 
         const providerWidget = node.widgets.find(w => w.name === "provider");
@@ -1028,13 +1062,16 @@ app.registerExtension({
 
         // Fetch current providers to have the mapping of Provider -> Models
         let providersCache = [];
-        try {
-            const res = await api.fetchApi("/llm_toolkit/providers");
-            const data = await res.json();
-            providersCache = data.providers || [];
-        } catch (e) {
-            console.error("[LLMs_Toolkit] Failed to fetch providers for node", e);
-        }
+        const loadProviders = async () => {
+            try {
+                const res = await api.fetchApi("/llm_toolkit/providers");
+                const data = await res.json();
+                providersCache = data.providers || [];
+            } catch (e) {
+                console.error("[LLMs_Toolkit] Failed to fetch providers for node", e);
+            }
+        };
+        await loadProviders();
 
         const updateModelOptions = (selectedProviderLabel) => {
             if (selectedProviderLabel === "LLM_CONFIG (from input)") {
@@ -1072,5 +1109,19 @@ app.registerExtension({
                 originalCallback.apply(this, arguments);
             }
         };
+
+        // Refresh the model mapping when providers are edited (server-side registry change)
+        const onProvidersChanged = async () => {
+            await loadProviders();
+            if (providerWidget.value) {
+                updateModelOptions(providerWidget.value);
+            }
+        };
+        api.addEventListener("llm_toolkit.providers_changed", onProvidersChanged);
+        const originalOnRemoved = node.onRemoved;
+        node.onRemoved = function () {
+            api.removeEventListener("llm_toolkit.providers_changed", onProvidersChanged);
+            originalOnRemoved?.apply(this, arguments);
+        };
     }
 });
@@ -0,0 +1,52 @@
+import { app } from "../../../scripts/app.js";
+import { api } from "../../../scripts/api.js";
+import { ComfyWidgets } from "../../../scripts/widgets.js";
+
+// Live preview of streamed LLM output.
+// The backend sends throttled "llm_toolkit.stream" events ({node, seq, text,
+// reasoning, done}); seq 0 starts a new run, later events carry deltas.
+
+const STREAM_NODES = ["OpenAICompatibleLoader", "LLMTranslator"];
+const WIDGET_NAME = "stream_preview";
+
+function getPreviewWidget(node) {
+    let widget = node.widgets?.find(w => w.name === WIDGET_NAME);
+    if (widget) return widget;
+
+    widget = ComfyWidgets["STRING"](node, WIDGET_NAME, ["STRING", { multiline: true }], app).widget;
+    widget.options.serialize = false;   // display only, never sent with the prompt
+    widget.inputEl.readOnly = true;
+    widget.inputEl.style.opacity = 0.75;
+    node.setSize([node.size[0], Math.max(node.size[1], node.computeSize()[1])]);
+    return widget;
+}
+
+function render(node) {
+    const widget = getPreviewWidget(node);
+    const state = node._llm_stream;
+    widget.value = state.reasoning
+        ? `💭 ${state.reasoning}\n\n${state.text}`
+        : state.text;
+    // Keep the newest tokens in view
+    widget.inputEl.scrollTop = widget.inputEl.scrollHeight;
+}
+
+app.registerExtension({
+    name: "ComfyUI-LLMs-Toolkit.streamPreview",
+
+    async setup() {
+        api.addEventListener("llm_toolkit.stream", ({ detail }) => {
+            if (!detail) return;
+            const node = app.graph.getNodeById(detail.node);
+            if (!node || !STREAM_NODES.includes(node.comfyClass)) return;
+
+            if (detail.seq === 0 || !node._llm_stream) {
+                node._llm_stream = { text: "", reasoning: "" };
+            }
+            node._llm_stream.text += detail.text || "";
+            node._llm_stream.reasoning += detail.reasoning || "";
+            render(node);
+            app.graph.setDirtyCanvas(true, false);
+        });
+    },
+});